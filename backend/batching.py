@@ -0,0 +1,116 @@
+"""
+Regroupement des appels d'encodage : les requêtes concurrentes sont fusionnées
+en un seul lot envoyé au modèle (micro-batching dynamique)
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Taille max d'un lot (en textes) et attente max des requêtes suivantes (millisecondes)
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "64"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+# Attente max du résultat d'un lot par un appelant (secondes, chargement du modèle compris)
+EMBED_BATCH_TIMEOUT = float(os.getenv("EMBED_BATCH_TIMEOUT", "300"))
+
+
+class BatchError(RuntimeError):
+    """Sortie du modèle incompatible avec le lot envoyé"""
+
+
+class MicroBatcher:
+    """
+    Planificateur d'inférence partagé entre les requêtes : le premier appel en attente
+    ouvre une fenêtre de `max_wait` secondes pendant laquelle les appels concurrents
+    rejoignent le même lot, jusqu'à `max_batch_size` textes. `encode(texts)` est
+    appelé une fois par lot et chaque appelant reçoit ses propres lignes.
+    """
+
+    def __init__(self, encode, max_batch_size=None, max_wait=None, timeout=None):
+        self.encode_batch = encode
+        self.max_batch_size = max_batch_size or EMBED_BATCH_MAX_SIZE
+        self.max_wait = EMBED_BATCH_MAX_WAIT_MS / 1000 if max_wait is None else max_wait
+        self.timeout = EMBED_BATCH_TIMEOUT if timeout is None else timeout
+        self._pending = []
+        self._condition = threading.Condition()
+        self._worker = None
+        self._stats = {"requests": 0, "texts": 0, "batches": 0, "largest_batch": 0}
+
+    def submit(self, texts):
+        """Ajoute des textes au prochain lot ; retourne un Future du tableau d'embeddings"""
+        future = Future()
+        texts = list(texts)
+        if not texts:
+            future.set_result(np.empty((0, 0), dtype=np.float32))
+            return future
+        with self._condition:
+            self._pending.append((texts, future))
+            self._stats["requests"] += 1
+            self._condition.notify()
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                self._worker.start()
+        return future
+
+    def encode(self, texts, timeout=None):
+        """Encode des textes via le lot partagé et attend le résultat (au plus `timeout` secondes)"""
+        return self.submit(texts).result(self.timeout if timeout is None else timeout)
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+            deadline = time.monotonic() + self.max_wait
+            # Attendre d'autres requêtes tant que le lot n'est pas plein
+            while sum(len(t) for t, _ in self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch, size = [], 0
+            while self._pending:
+                texts, future = self._pending[0]
+                # Une requête n'est jamais découpée ; une requête trop grande forme son propre lot
+                if batch and size + len(texts) > self.max_batch_size:
+                    break
+                batch.append(self._pending.pop(0))
+                size += len(texts)
+            self._stats["batches"] += 1
+            self._stats["texts"] += size
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], size)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._deliver(batch)
+            except Exception as e:
+                # Toute erreur est transmise aux appelants du lot ; le worker continue
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _deliver(self, batch):
+        texts = [text for request, _ in batch for text in request]
+        embeddings = np.asarray(self.encode_batch(texts))
+        if embeddings.ndim != 2 or len(embeddings) != len(texts):
+            raise BatchError(
+                f"Embeddings inattendus : forme {embeddings.shape} pour {len(texts)} textes"
+            )
+        offset = 0
+        for request, future in batch:
+            future.set_result(embeddings[offset:offset + len(request)])
+            offset += len(request)
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        stats["mean_batch"] = round(stats["texts"] / stats["batches"], 2) if stats["batches"] else 0
+        stats["max_batch_size"] = self.max_batch_size
+        stats["max_wait_ms"] = round(self.max_wait * 1000, 2)
+        return stats
@@ -0,0 +1,263 @@
+"""
+Caches en mémoire (LRU borné en octets, avec expiration) et stockage disque optionnel
+"""
+import hashlib
+import os
+import pickle
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+# Configuration du cache des pages et embeddings (en mémoire, à côté des modèles :
+# à dimensionner avec MODEL_MEMORY_BUDGET_MB sur les petites instances)
+PAGE_CACHE_MAX_MB = float(os.getenv("PAGE_CACHE_MAX_MB", "64"))
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "86400"))
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR", "")
+
+# Cache des reformulations avec graine (résultats reproductibles, donc réutilisables)
+REFORMULATION_CACHE_MAX_MB = float(os.getenv("REFORMULATION_CACHE_MAX_MB", "8"))
+
+# Configuration du cache des recherches SerpAPI
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "604800"))
+SEARCH_CACHE_DIR = os.getenv("SEARCH_CACHE_DIR", PAGE_CACHE_DIR)
+
+
+def content_hash(text):
+    """Empreinte SHA-256 d'un texte"""
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def normalize_query(query):
+    """Normalise une requête : casse, ponctuation et espaces repliés"""
+    query = re.sub(r'[^\w\s]', ' ', query.casefold())
+    return re.sub(r'\s+', ' ', query).strip()
+
+
+def estimate_size(value):
+    """Estimation de l'empreinte mémoire d'une valeur mise en cache"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class DiskStore:
+    """Stockage clé/valeur persistant (SQLite) avec date d'expiration"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires REAL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires) VALUES (?, ?, ?)",
+                (key, blob, time.time() + ttl)
+            )
+            self._conn.commit()
+
+
+class LRUCache:
+    """
+    Cache LRU thread-safe borné par sa taille en octets, avec expiration (TTL)
+    et stockage disque optionnel pour survivre aux redémarrages
+    """
+
+    def __init__(self, max_bytes, ttl, disk=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk = disk
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, size, expires = entry
+                if expires >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+        value = self.disk.get(key) if self.disk else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._store(key, value)
+        return value
+
+    def set(self, key, value):
+        self._store(key, value)
+        if self.disk:
+            self.disk.set(key, value, self.ttl)
+
+    def _store(self, key, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.time() + self.ttl)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+class PageCache:
+    """
+    Cache des pages sources : texte extrait par URL (avec son empreinte de contenu)
+    et embeddings adressés par contenu, partagés entre URLs au contenu identique
+    """
+
+    def __init__(self, max_bytes, ttl, directory=""):
+        text_disk = DiskStore(os.path.join(directory, "texts.sqlite")) if directory else None
+        embedding_disk = DiskStore(os.path.join(directory, "embeddings.sqlite")) if directory else None
+        # La moitié du budget pour les textes, l'autre pour les embeddings
+        self.texts = LRUCache(max_bytes // 2, ttl, text_disk)
+        self.embeddings = LRUCache(max_bytes // 2, ttl, embedding_disk)
+
+    def get_text(self, url, loader):
+        """Texte extrait de `url`, téléchargé via `loader(url)` en cas d'absence"""
+        cached = self.texts.get(url)
+        if cached is not None:
+            return cached[1]
+        text = loader(url)
+        if text:
+            self.texts.set(url, (content_hash(text), text))
+        return text
+
+    def get_embeddings(self, texts, encode, namespace=""):
+        """
+        Embeddings des `texts` (un tableau numpy, une ligne par texte).
+        Seuls les textes absents du cache sont encodés, en un seul appel `encode(liste)`.
+        """
+        keys = [content_hash(namespace + "\x00" + t) for t in texts]
+        rows = [self.embeddings.get(key) for key in keys]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if missing:
+            # Dédupliquer les textes identiques avant l'encodage
+            unique = list(dict.fromkeys(keys[i] for i in missing))
+            index = {key: n for n, key in enumerate(unique)}
+            first_text = {}
+            for i in missing:
+                first_text.setdefault(keys[i], texts[i])
+            encoded = np.asarray(encode([first_text[key] for key in unique]))
+            for key, n in index.items():
+                # Copie : une vue garderait tout le lot en mémoire pour une seule ligne
+                self.embeddings.set(key, encoded[n].copy())
+            for i in missing:
+                rows[i] = encoded[index[keys[i]]]
+        return np.vstack(rows) if rows else np.empty((0, 0), dtype=np.float32)
+
+    def stats(self):
+        return {"texts": self.texts.stats(), "embeddings": self.embeddings.stats()}
+
+
+class SearchCache:
+    """
+    Cache des résultats de recherche indexé par requête normalisée.
+    Les recherches identiques simultanées sont regroupées en un seul appel.
+    """
+
+    def __init__(self, ttl, directory="", max_bytes=16 * 1024 * 1024):
+        disk = DiskStore(os.path.join(directory, "searches.sqlite")) if directory else None
+        self.results = LRUCache(max_bytes, ttl, disk)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def get_or_search(self, query, search):
+        """Résultats de `search(query)`, depuis le cache ou une recherche déjà en cours"""
+        key = normalize_query(query)
+        cached = self.results.get(key)
+        if cached is not None:
+            return list(cached)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+        if not leader:
+            return list(future.result())
+
+        try:
+            results = search(query)
+            # Les réponses vides (erreurs, quota) ne sont pas mises en cache
+            if results:
+                self.results.set(key, list(results))
+            future.set_result(results)
+            return results
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def stats(self):
+        stats = self.results.stats()
+        stats["coalesced"] = self.coalesced
+        return stats
+
+
+search_cache = SearchCache(SEARCH_CACHE_TTL, SEARCH_CACHE_DIR)
+page_cache = PageCache(int(PAGE_CACHE_MAX_MB * 1024 * 1024), PAGE_CACHE_TTL, PAGE_CACHE_DIR)
+reformulation_cache = LRUCache(int(REFORMULATION_CACHE_MAX_MB * 1024 * 1024), PAGE_CACHE_TTL)
@@ -0,0 +1,188 @@
+"""
+Analyse groupée des devoirs d'une classe : extraction parallèle, matrice de
+similarité entre toutes les copies et recherches web mutualisées
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from cache import normalize_query
+from fetcher import fetch_pages
+from workers import cpu_pool, extract_text
+from query_planner import plan_queries, query_budget, merge_results
+from text_utils import split_paragraphs
+import plagiat
+
+# Nombre max de fichiers par lot, extractions simultanées et recherches web par lot
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "200"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "50"))
+# Taille totale max d'un lot (tous fichiers confondus, en mémoire)
+BATCH_MAX_MB = float(os.getenv("BATCH_MAX_MB", "100"))
+# Paragraphes par bloc du calcul de la matrice (bloc x paragraphes de la classe en float32)
+BATCH_BLOCK_ROWS = 512
+# Nombre de paires les plus proches retournées
+BATCH_TOP_PAIRS = 10
+
+
+def extract_all(files, workers=None):
+    """Extrait en parallèle le texte de [(nom, flux)] ; retourne [(nom, texte, erreur)]"""
+    def extract(item):
+        name, stream = item
+        try:
+            # Avec CPU_WORKERS, l'analyse des PDF tourne dans les processus de calcul
+            return name, cpu_pool.call(extract_text, name, stream.getvalue()), None
+        except Exception as e:
+            return name, "", str(e)
+
+    with ThreadPoolExecutor(max_workers=workers or BATCH_WORKERS, thread_name_prefix="batch-extract") as executor:
+        return list(executor.map(extract, files))
+
+
+def _normalized(embeddings):
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+
+def similarity_matrix(paragraph_embeddings, owners, count, block_rows=None):
+    """
+    Matrice N x N entre documents à partir des embeddings de tous leurs paragraphes.
+    Pour chaque paragraphe de A, meilleure similarité avec un paragraphe de B ;
+    moyenne sur les paragraphes de A, puis symétrisation. Les similarités sont
+    calculées par blocs de `block_rows` paragraphes : la mémoire reste bornée
+    (bloc x paragraphes) au lieu de paragraphes x paragraphes pour toute la classe.
+    """
+    block_rows = block_rows or BATCH_BLOCK_ROWS
+    matrix = np.zeros((count, count), dtype=np.float32)
+    if not len(owners):
+        return matrix
+    owners = np.asarray(owners)
+    order = np.argsort(owners, kind="stable")
+    owners = owners[order]
+    embeddings = _normalized(paragraph_embeddings)[order]
+    present, starts = np.unique(owners, return_index=True)
+    rows_document = np.searchsorted(present, owners)
+
+    totals = np.zeros((len(present), len(present)), dtype=np.float64)
+    for start in range(0, len(owners), block_rows):
+        similarities = embeddings[start:start + block_rows] @ embeddings.T
+        # Meilleur paragraphe de chaque document (colonnes regroupées par document)
+        best = np.maximum.reduceat(similarities, starts, axis=1)
+        # Somme par document des lignes du bloc
+        np.add.at(totals, rows_document[start:start + block_rows], best)
+    counts = np.diff(np.append(starts, len(owners)))
+    mean = (totals / counts[:, None]).astype(np.float32)
+    matrix[np.ix_(present, present)] = (mean + mean.T) / 2
+    np.fill_diagonal(matrix, 1.0)
+    return matrix
+
+
+def top_pairs(matrix, names, limit=BATCH_TOP_PAIRS):
+    """Paires de documents les plus similaires : [{a, b, score}]"""
+    upper = np.triu_indices(len(names), k=1)
+    scores = matrix[upper]
+    order = np.argsort(-scores)[:limit]
+    return [
+        {"a": names[upper[0][k]], "b": names[upper[1][k]], "score": round(float(scores[k]) * 100, 2)}
+        for k in order
+    ]
+
+
+def plan_batch_queries(texts, max_queries=None):
+    """
+    Requêtes de chaque document, dédupliquées sur toute la classe : un passage
+    partagé par plusieurs copies n'est recherché qu'une fois. Le budget est réparti
+    entre les documents (au moins max(1, budget // N) requêtes chacun, attribuées
+    tour à tour) : aucune copie n'est laissée sans recherche, même si la classe
+    compte plus de documents que le budget. Retourne (requêtes uniques, requêtes
+    de chaque document).
+    """
+    max_queries = max_queries or BATCH_MAX_QUERIES
+    usable = [bool(text) and len(text.strip()) >= 10 for text in texts]
+    count = max(1, sum(usable))
+    share = max(1, max_queries // count)
+    planned = [
+        plan_queries(text, min(query_budget(text), share)) if ok else []
+        for text, ok in zip(texts, usable)
+    ]
+    # Une requête par document au minimum : le plafond s'élargit pour les grandes classes
+    limit = max(max_queries, sum(usable))
+    per_document = [[] for _ in texts]
+    unique = {}
+    for rank in range(max((len(queries) for queries in planned), default=0)):
+        for index, queries in enumerate(planned):
+            if rank >= len(queries):
+                continue
+            key = normalize_query(queries[rank])
+            if key not in unique and len(unique) < limit:
+                unique[key] = queries[rank]
+            if key in unique and key not in per_document[index]:
+                per_document[index].append(key)
+    return unique, per_document
+
+
+def check_batch(files, api_key, provider=None, progress=None):
+    """
+    Analyse d'une classe : [(nom, flux)] -> scores par document, matrice de similarité
+    entre copies et paires les plus proches
+    """
+    progress = progress or (lambda stage, data=None: None)
+    timings = {}
+    start = time.perf_counter()
+    extracted = extract_all(files)
+    timings["extract"] = time.perf_counter() - start
+    names = [name for name, _, _ in extracted]
+    texts = [text for _, text, _ in extracted]
+    progress("extract", {"documents": len(names)})
+
+    # Matrice entre copies : tous les paragraphes de la classe en un seul encodage
+    start = time.perf_counter()
+    paragraphs, owners = [], []
+    for index, text in enumerate(texts):
+        for paragraph in split_paragraphs(text):
+            paragraphs.append(paragraph)
+            owners.append(index)
+    matrix = similarity_matrix(plagiat.encode_texts(paragraphs), owners, len(names)) if paragraphs \
+        else np.zeros((len(names), len(names)), dtype=np.float32)
+    timings["matrix"] = time.perf_counter() - start
+    progress("matrix", {"paragraphs": len(paragraphs)})
+
+    # Recherches web mutualisées, puis un seul téléchargement de chaque source
+    start = time.perf_counter()
+    provider = provider or plagiat.get_search_provider(api_key)
+    unique, per_document = plan_batch_queries(texts)
+    progress("search", {"queries": len(unique)})
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(unique))), thread_name_prefix="search") as executor:
+        found = dict(zip(unique, executor.map(provider.search, unique.values())))
+    document_urls = [merge_results([found[key] for key in keys]) for keys in per_document]
+    all_urls = list(dict.fromkeys(url for urls in document_urls for url in urls))
+    progress("fetch", {"urls": len(all_urls)})
+    pages = dict(fetch_pages(all_urls, provider.fetch))
+    timings["search_fetch"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    documents = []
+    for index, (name, text, error) in enumerate(extracted):
+        entry = {"name": name, "plagiarism_score": 0, "sources": [], "searched": bool(per_document[index])}
+        if error:
+            entry["error"] = error
+        document_pages = [(url, pages[url]) for url in document_urls[index] if url in pages]
+        if text and document_pages:
+            for url, score in plagiat.score_pages(text, document_pages):
+                if score > 0.3:
+                    entry["sources"].append({"url": url, "score": round(score * 100, 2)})
+            entry["plagiarism_score"] = max((s["score"] for s in entry["sources"]), default=0)
+        documents.append(entry)
+        progress("score", {"name": name, "score": entry["plagiarism_score"]})
+    timings["score"] = time.perf_counter() - start
+
+    return {
+        "documents": documents,
+        "names": names,
+        "matrix": np.round(matrix * 100, 2).tolist(),
+        "top_pairs": top_pairs(matrix, names),
+        "queries": len(unique),
+        "timings": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+    }
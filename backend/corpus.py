@@ -0,0 +1,287 @@
+"""
+Corpus de référence local (supports de cours, mémoires...) : index MinHash/LSH
+des passages pour détecter les quasi-copies sans recherche web.
+
+Ingestion en ligne de commande :
+    python corpus.py ingest --index ./corpus_index documents/ memoire.pdf
+    python corpus.py query --index ./corpus_index devoir.docx
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+# Répertoire de l'index persistant (vide = pas de corpus local)
+CORPUS_DIR = os.getenv("CORPUS_DIR", "")
+# Jaccard estimé minimal pour signaler un passage du corpus
+CORPUS_MIN_JACCARD = float(os.getenv("CORPUS_MIN_JACCARD", "0.2"))
+
+# Paramètres MinHash/LSH : 32 bandes de 4 lignes, seuil de détection ≈ (1/32)^(1/4) ≈ 0.42
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+LSH_BANDS = 32
+# Passages indexés : fenêtres de mots qui se chevauchent de moitié
+PASSAGE_WORDS = 100
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.iinfo(np.uint64).max
+_HASH_CHUNK = 4096
+
+SIGNATURES_FILE = "signatures.npy"
+INDEX_FILE = "index.json"
+TEXT_EXTENSIONS = (".txt", ".md")
+
+
+def tokenize(text):
+    """Mots normalisés d'un texte (casse repliée, ponctuation ignorée)"""
+    return re.findall(r"\w+", text.casefold())
+
+
+def shingle_hashes(words, k=SHINGLE_SIZE):
+    """Empreintes 32 bits des k-grammes de mots distincts"""
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    if len(words) < k:
+        grams = [" ".join(words)]
+    else:
+        grams = (" ".join(words[i:i + k]) for i in range(len(words) - k + 1))
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64))
+
+
+def passage_spans(count, size=PASSAGE_WORDS):
+    """Fenêtres [début, fin) de `size` mots, avec un pas de `size // 2`"""
+    if count <= size:
+        return [(0, count)] if count else []
+    step = max(1, size // 2)
+    spans = [(start, start + size) for start in range(0, count - size + 1, step)]
+    if spans[-1][1] < count:
+        spans.append((count - size, count))
+    return spans
+
+
+class MinHasher:
+    """Signatures MinHash par permutations universelles (a·x + b) mod (2^61 - 1)"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, int(_MERSENNE), size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, int(_MERSENNE), size=num_perm, dtype=np.uint64)
+
+    def signature(self, hashes):
+        """Signature d'un ensemble d'empreintes (vectorisée, par blocs pour borner la mémoire)"""
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for start in range(0, len(hashes), _HASH_CHUNK):
+                chunk = hashes[start:start + _HASH_CHUNK]
+                values = (np.outer(chunk, self.a) + self.b) % _MERSENNE
+                np.minimum(signature, values.min(axis=0), out=signature)
+        return signature
+
+
+def estimate_jaccard(first, second):
+    """Similarité de Jaccard estimée entre deux signatures"""
+    return float(np.mean(first == second))
+
+
+class CorpusIndex:
+    """
+    Index LSH des passages d'un corpus de référence. Chaque document est découpé
+    en passages chevauchants dont la signature MinHash est rangée dans `bands`
+    tables de hachage : une requête ne compare que les passages qui partagent
+    au moins une bande, sans parcourir le corpus.
+    """
+
+    def __init__(self, directory="", num_perm=NUM_PERM, bands=LSH_BANDS, passage_words=PASSAGE_WORDS):
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple de bands")
+        self.directory = directory
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.passage_words = passage_words
+        self.documents = {}
+        self.passages = []
+        self._signatures = []
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+        self._lock = threading.Lock()
+        if directory and os.path.exists(os.path.join(directory, INDEX_FILE)):
+            self._load()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _insert(self, passage_id, signature):
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band][key].append(passage_id)
+
+    def _signatures_for(self, words):
+        spans = passage_spans(len(words), self.passage_words)
+        return spans, [self.hasher.signature(shingle_hashes(words[start:end])) for start, end in spans]
+
+    def add(self, doc_id, text, source=None):
+        """
+        Indexe un document ; retourne le nombre de passages ajoutés.
+        Un document déjà indexé avec le même contenu est ignoré.
+        """
+        words = tokenize(text)
+        digest = format(zlib.crc32(" ".join(words).encode("utf-8")), "08x")
+        with self._lock:
+            known = self.documents.get(doc_id)
+            if known is not None:
+                if known["hash"] != digest:
+                    print(f"Document {doc_id} modifié : reconstruire l'index pour le mettre à jour")
+                return 0
+        spans, signatures = self._signatures_for(words)
+        with self._lock:
+            self.documents[doc_id] = {"source": source or doc_id, "hash": digest, "passages": len(spans)}
+            for (start, end), signature in zip(spans, signatures):
+                passage_id = len(self.passages)
+                self.passages.append({"doc_id": doc_id, "text": " ".join(words[start:end])})
+                self._signatures.append(signature)
+                self._insert(passage_id, signature)
+        return len(spans)
+
+    def query(self, text, min_jaccard=None, limit=10):
+        """
+        Documents du corpus proches du texte : [{doc_id, source, jaccard, coverage, passage}]
+        où `jaccard` est la meilleure similarité estimée d'un passage et `coverage`
+        la part des passages du texte retrouvés dans ce document.
+        """
+        min_jaccard = CORPUS_MIN_JACCARD if min_jaccard is None else min_jaccard
+        words = tokenize(text)
+        if not words or not self.passages:
+            return []
+        spans, signatures = self._signatures_for(words)
+
+        best = {}
+        covered = defaultdict(set)
+        with self._lock:
+            for index, signature in enumerate(signatures):
+                candidates = set()
+                for band, key in enumerate(self._band_keys(signature)):
+                    candidates.update(self._buckets[band].get(key, ()))
+                for passage_id in candidates:
+                    score = estimate_jaccard(signature, self._signatures[passage_id])
+                    if score < min_jaccard:
+                        continue
+                    doc_id = self.passages[passage_id]["doc_id"]
+                    covered[doc_id].add(index)
+                    if doc_id not in best or score > best[doc_id][0]:
+                        best[doc_id] = (score, passage_id)
+
+            results = [
+                {
+                    "doc_id": doc_id,
+                    "source": self.documents[doc_id]["source"],
+                    "jaccard": round(score, 3),
+                    "coverage": round(len(covered[doc_id]) / len(spans), 3),
+                    "passage": self.passages[passage_id]["text"],
+                }
+                for doc_id, (score, passage_id) in best.items()
+            ]
+        results.sort(key=lambda r: (r["jaccard"], r["coverage"]), reverse=True)
+        return results[:limit]
+
+    def save(self, directory=None):
+        """Écrit l'index sur disque (signatures numpy + métadonnées JSON)"""
+        directory = directory or self.directory
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            signatures = (np.vstack(self._signatures) if self._signatures
+                          else np.empty((0, self.hasher.num_perm), dtype=np.uint64))
+            meta = {
+                "num_perm": self.hasher.num_perm,
+                "bands": self.bands,
+                "passage_words": self.passage_words,
+                "documents": self.documents,
+                "passages": self.passages,
+            }
+        # Écriture atomique : un index à moitié écrit ne doit jamais être relu
+        np.save(os.path.join(directory, SIGNATURES_FILE + ".tmp.npy"), signatures)
+        os.replace(os.path.join(directory, SIGNATURES_FILE + ".tmp.npy"), os.path.join(directory, SIGNATURES_FILE))
+        with open(os.path.join(directory, INDEX_FILE + ".tmp"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(os.path.join(directory, INDEX_FILE + ".tmp"), os.path.join(directory, INDEX_FILE))
+
+    def _load(self):
+        with open(os.path.join(self.directory, INDEX_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["num_perm"] != self.hasher.num_perm or meta["bands"] != self.bands:
+            raise ValueError("Index du corpus construit avec d'autres paramètres MinHash")
+        self.passage_words = meta["passage_words"]
+        self.documents = meta["documents"]
+        self.passages = meta["passages"]
+        signatures = np.load(os.path.join(self.directory, SIGNATURES_FILE))
+        self._signatures = list(signatures)
+        for passage_id, signature in enumerate(self._signatures):
+            self._insert(passage_id, signature)
+
+    def stats(self):
+        with self._lock:
+            return {"documents": len(self.documents), "passages": len(self.passages)}
+
+
+def read_file(path):
+    """Texte d'un fichier du corpus (texte brut, PDF ou DOCX)"""
+    if path.lower().endswith(TEXT_EXTENSIONS):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return f.read()
+    from ingestion import extract_document
+    with open(path, "rb") as f:
+        return extract_document(path, f)
+
+
+def iter_files(paths):
+    """Fichiers à ingérer : chemins donnés et contenu des répertoires (récursif)"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith(TEXT_EXTENSIONS + (".pdf", ".docx")):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Corpus de référence local (index MinHash/LSH)")
+    parser.add_argument("command", choices=["ingest", "query"])
+    parser.add_argument("paths", nargs="+", help="Fichiers ou répertoires")
+    parser.add_argument("--index", default=CORPUS_DIR or "corpus_index", help="Répertoire de l'index")
+    parser.add_argument("--rebuild", action="store_true", help="Repartir d'un index vide")
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        index = CorpusIndex("" if args.rebuild else args.index)
+        for path in iter_files(args.paths):
+            try:
+                added = index.add(os.path.relpath(path), read_file(path), source=os.path.basename(path))
+            except Exception as e:
+                print(f"Erreur d'ingestion {path}: {e}")
+                continue
+            print(f"{path}: {added} passages")
+        index.save(args.index)
+        print(f"Index enregistré dans {args.index} : {index.stats()}")
+        return 0
+
+    index = CorpusIndex(args.index)
+    for path in iter_files(args.paths):
+        for match in index.query(read_file(path)):
+            print(f"{path} ~ {match['source']} : jaccard {match['jaccard']}, couverture {match['coverage']}")
+    return 0
+
+
+corpus_index = CorpusIndex(CORPUS_DIR) if CORPUS_DIR else None
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
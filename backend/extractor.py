@@ -0,0 +1,148 @@
+"""
+Extraction du texte des pages sources : téléchargement en flux borné, filtrage
+par Content-Type et suppression du balisage hors contenu (scripts, menus, pieds de page)
+"""
+import codecs
+import os
+import re
+import time
+
+# Taille max lue par page : au-delà, le reste de la réponse n'est pas téléchargé
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(1024 * 1024)))
+FETCH_CHUNK_SIZE = 64 * 1024
+
+# Types de contenu analysés (les autres, PDF, images, archives..., sont ignorés)
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+TEXT_CONTENT_TYPES = HTML_CONTENT_TYPES + ("text/plain",)
+
+# Éléments sans contenu éditorial, retirés avant l'extraction
+BOILERPLATE_TAGS = ("script", "style", "noscript", "template", "svg", "iframe", "nav", "footer", "aside", "form")
+BOILERPLATE_ROLES = ("navigation", "contentinfo", "search")
+# Éléments de bloc : un retour à la ligne les sépare du texte voisin
+BLOCK_TAGS = (
+    "p", "div", "br", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "td", "th",
+    "table", "section", "article", "main", "header", "blockquote", "pre", "dd", "dt", "figcaption",
+)
+
+
+def parse_content_type(header):
+    """'text/html; charset=UTF-8' -> ('text/html', 'UTF-8')"""
+    mime, _, params = (header or "").partition(";")
+    charset = None
+    for param in params.split(";"):
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset" and value.strip():
+            charset = value.strip().strip('"\'')
+    if charset:
+        try:
+            codecs.lookup(charset)
+        except LookupError:
+            charset = None  # Encodage inconnu : détection par le parseur
+    return mime.strip().lower(), charset
+
+
+def read_capped(response, max_bytes, deadline_at=None):
+    """
+    Lit le corps d'une réponse en flux, sans dépasser `max_bytes`. Le délai de
+    lecture ne borne qu'un morceau : `deadline_at` (time.monotonic()) borne la
+    durée totale, face à un serveur qui envoie quelques octets à la fois.
+    """
+    chunks = []
+    size = 0
+    for chunk in response.iter_content(FETCH_CHUNK_SIZE):
+        if deadline_at is not None and time.monotonic() > deadline_at:
+            raise TimeoutError("échéance du téléchargement dépassée")
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= max_bytes:
+            break
+    return b"".join(chunks)[:max_bytes]
+
+
+_META_CHARSET = re.compile(rb"<meta[^>]+charset", re.IGNORECASE)
+
+
+def guess_encoding(html):
+    """
+    Encodage d'une page sans charset dans l'en-tête HTTP : celui de la balise
+    <meta> (None, laissé au parseur), sinon UTF-8 s'il est valide, sinon Windows-1252
+    """
+    if _META_CHARSET.search(html[:4096]):
+        return None
+    try:
+        html.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "windows-1252"
+
+
+def _clean_lines(text):
+    """Espaces normalisés, une ligne par bloc, lignes vides retirées"""
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _lxml_to_text(html, encoding):
+    import lxml.html
+    from lxml import etree
+
+    parser = lxml.html.HTMLParser(encoding=encoding, remove_comments=True)
+    try:
+        root = lxml.html.document_fromstring(html, parser=parser)
+    except (etree.ParserError, ValueError):
+        # Document vide ou sans élément
+        return ""
+    roles = " or ".join(f"@role='{role}'" for role in BOILERPLATE_ROLES)
+    for element in root.xpath(" | ".join(f"//{tag}" for tag in BOILERPLATE_TAGS) + f" | //*[{roles}]"):
+        if element.getparent() is not None:
+            element.drop_tree()
+    for element in root.iter(*BLOCK_TAGS):
+        element.text = "\n" + (element.text or "")
+        element.tail = "\n" + (element.tail or "")
+    return "".join(root.itertext())
+
+
+def _soup_to_text(html, encoding):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser", from_encoding=encoding)
+    for element in soup(list(BOILERPLATE_TAGS)):
+        element.decompose()
+    for element in soup.find_all(attrs={"role": list(BOILERPLATE_ROLES)}):
+        element.decompose()
+    for element in soup.find_all(list(BLOCK_TAGS)):
+        element.insert_before("\n")
+        element.insert_after("\n")
+    return soup.get_text()
+
+
+def html_to_text(html, encoding=None):
+    """
+    Texte éditorial d'une page HTML (octets) : analyse par lxml (C), ou par
+    html.parser si lxml n'est pas installé
+    """
+    encoding = encoding or guess_encoding(html)
+    try:
+        text = _lxml_to_text(html, encoding)
+    except ImportError:
+        text = _soup_to_text(html, encoding)
+    return _clean_lines(text)
+
+
+def download_text(url, session, timeout, max_bytes=None, deadline=None):
+    """
+    Télécharge et extrait le texte d'une page. Le Content-Type est vérifié avant
+    de lire le corps : les contenus binaires ne sont pas téléchargés. Avec
+    `deadline` (secondes), un téléchargement plus long lève TimeoutError.
+    """
+    max_bytes = max_bytes or FETCH_MAX_BYTES
+    deadline_at = time.monotonic() + deadline if deadline else None
+    with session.get(url, timeout=timeout, stream=True) as response:
+        mime, charset = parse_content_type(response.headers.get("Content-Type"))
+        if mime and mime not in TEXT_CONTENT_TYPES:
+            print(f"Skipping {url}: unsupported content type {mime}")
+            return ""
+        body = read_capped(response, max_bytes, deadline_at)
+    if mime == "text/plain":
+        return _clean_lines(body.decode(charset or "utf-8", errors="replace"))
+    return html_to_text(body, charset)
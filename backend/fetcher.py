@@ -0,0 +1,125 @@
+"""
+Récupération concurrente des pages sources pour la détection de plagiat
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Paramètres de la phase de récupération (surchargeables par variables d'environnement)
+FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "8"))
+FETCH_PER_HOST_LIMIT = int(os.getenv("FETCH_PER_HOST_LIMIT", "2"))
+FETCH_DEADLINE = float(os.getenv("FETCH_DEADLINE", "8"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "5"))
+
+USER_AGENT = "Mozilla/5.0 (compatible; PlagiatDetect/1.0)"
+
+_session = None
+_executor = None
+# (hôte, limite) -> [sémaphore, téléchargements qui l'utilisent] ; retiré dès qu'il ne sert plus
+_host_semaphores = {}
+_lock = threading.Lock()
+
+
+def get_session():
+    """Retourne la session HTTP partagée (keep-alive et pool de connexions)"""
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=FETCH_MAX_WORKERS, pool_maxsize=FETCH_MAX_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = USER_AGENT
+            _session = session
+    return _session
+
+
+def _get_executor():
+    """Pool de threads borné partagé par toutes les requêtes"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix="fetch")
+    return _executor
+
+
+def _host_semaphore(key, limit):
+    """
+    Sémaphore limitant le nombre de téléchargements simultanés vers un même hôte.
+    Chaque appel doit être suivi de _release_host(key) : l'entrée est retirée quand
+    plus aucun téléchargement ne l'utilise, la table ne grossit pas avec les hôtes vus.
+    """
+    with _lock:
+        entry = _host_semaphores.setdefault(key, [threading.BoundedSemaphore(limit), 0])
+        entry[1] += 1
+        return entry[0]
+
+
+def _release_host(key):
+    with _lock:
+        entry = _host_semaphores[key]
+        entry[1] -= 1
+        if not entry[1]:
+            del _host_semaphores[key]
+
+
+def _fetch_one(url, extract, limit, deadline_at):
+    key = (urlparse(url).netloc.lower(), limit)
+    semaphore = _host_semaphore(key, limit)
+    try:
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0 or not semaphore.acquire(timeout=remaining):
+            return ""
+        try:
+            return extract(url)
+        finally:
+            semaphore.release()
+    finally:
+        _release_host(key)
+
+
+def fetch_pages(urls, extract, deadline=None, per_host_limit=None, on_page=None):
+    """
+    Récupère les pages en parallèle et retourne [(url, texte)] dans l'ordre des URLs,
+    pour les pages non vides terminées avant l'échéance globale.
+    `on_page(url, texte)` est appelé pour chaque page dès son arrivée.
+    """
+    urls = list(dict.fromkeys(u for u in urls if u))
+    if not urls:
+        return []
+
+    deadline = FETCH_DEADLINE if deadline is None else deadline
+    limit = per_host_limit or FETCH_PER_HOST_LIMIT
+    deadline_at = time.monotonic() + deadline
+
+    executor = _get_executor()
+    futures = {executor.submit(_fetch_one, url, extract, limit, deadline_at): url for url in urls}
+    pending = set(futures)
+    texts = {}
+
+    while pending:
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            url = futures[future]
+            try:
+                texts[url] = future.result()
+            except Exception as e:
+                print(f"Error fetching {url}: {e}")
+                continue
+            if on_page and texts[url]:
+                on_page(url, texts[url])
+
+    for future in pending:
+        # Les pages trop lentes sont abandonnées, leur résultat sera ignoré
+        future.cancel()
+        print(f"Deadline exceeded, skipping: {futures[future]}")
+
+    return [(url, texts[url]) for url in urls if texts.get(url)]
@@ -0,0 +1,152 @@
+"""
+Empreintes par winnowing (à la MOSS) : détection rapide des passages recopiés
+mot pour mot, ou presque, entre un texte soumis et une page source
+"""
+import os
+import re
+import zlib
+
+# k-grammes de mots hachés, et fenêtre de winnowing (garantit la détection
+# de toute copie d'au moins FINGERPRINT_K + FINGERPRINT_WINDOW - 1 mots)
+FINGERPRINT_K = int(os.getenv("FINGERPRINT_K", "5"))
+FINGERPRINT_WINDOW = int(os.getenv("FINGERPRINT_WINDOW", "4"))
+# Écart max (en mots) entre deux passages copiés fusionnés en un seul
+FINGERPRINT_MAX_GAP = 3
+
+_WORD = re.compile(r"\w+")
+
+
+class Tokens:
+    """Mots normalisés d'un texte et leurs positions dans le texte original"""
+
+    __slots__ = ("words", "spans")
+
+    def __init__(self, text):
+        self.words = []
+        self.spans = []
+        for match in _WORD.finditer(text):
+            self.words.append(match.group().casefold())
+            self.spans.append(match.span())
+
+    def __len__(self):
+        return len(self.words)
+
+
+def kgram_hashes(words, k=FINGERPRINT_K):
+    """Empreinte 32 bits de chaque k-gramme de mots (indexée par son premier mot)"""
+    return [zlib.crc32(" ".join(words[i:i + k]).encode("utf-8")) for i in range(len(words) - k + 1)]
+
+
+def winnow(hashes, window=FINGERPRINT_WINDOW):
+    """
+    Sélection par winnowing : le minimum de chaque fenêtre de `window` empreintes
+    (le plus à droite en cas d'égalité), sans doublon. Retourne [(empreinte, position)].
+    """
+    if len(hashes) <= window:
+        return [(h, i) for i, h in enumerate(hashes)] if hashes else []
+    selected = []
+    last = -1
+    for start in range(len(hashes) - window + 1):
+        best = start
+        for i in range(start + 1, start + window):
+            if hashes[i] <= hashes[best]:
+                best = i
+        if best != last:
+            selected.append((hashes[best], best))
+            last = best
+    return selected
+
+
+def fingerprints(tokens, k=FINGERPRINT_K, window=FINGERPRINT_WINDOW):
+    return winnow(kgram_hashes(tokens.words, k), window)
+
+
+def _extend(source, target, i, j):
+    """Étend une correspondance de mots (i, j) à gauche et à droite : (début_s, fin_s, début_t, fin_t)"""
+    start_i, start_j = i, j
+    while start_i > 0 and start_j > 0 and source[start_i - 1] == target[start_j - 1]:
+        start_i -= 1
+        start_j -= 1
+    end_i, end_j = i, j
+    while end_i < len(source) and end_j < len(target) and source[end_i] == target[end_j]:
+        end_i += 1
+        end_j += 1
+    return start_i, end_i, start_j, end_j
+
+
+def match_tokens(source, target, k=FINGERPRINT_K, window=FINGERPRINT_WINDOW):
+    """
+    Passages communs entre deux textes tokenisés : [(début, fin, début_source, fin_source)]
+    en indices de mots. Les empreintes partagées servent de graines, étendues
+    ensuite mot à mot ; chaque mot du texte n'est étendu qu'une fois.
+    """
+    if len(source) < k or len(target) < k:
+        return []
+    target_index = {}
+    for h, position in fingerprints(target, k, window):
+        target_index.setdefault(h, []).append(position)
+
+    matches = []
+    covered_until = 0
+    for h, position in fingerprints(source, k, window):
+        if position < covered_until or h not in target_index:
+            continue
+        best = None
+        for target_position in target_index[h]:
+            if source.words[position:position + k] != target.words[target_position:target_position + k]:
+                continue  # Collision d'empreinte
+            candidate = _extend(source.words, target.words, position, target_position)
+            if best is None or candidate[1] - candidate[0] > best[1] - best[0]:
+                best = candidate
+        if best is not None:
+            matches.append(best)
+            covered_until = best[1]
+    return _merge(matches)
+
+
+def _merge(matches, max_gap=FINGERPRINT_MAX_GAP):
+    """Fusionne les passages séparés par quelques mots modifiés (copie quasi exacte)"""
+    merged = []
+    for match in sorted(matches):
+        if merged:
+            start, end, source_start, source_end = merged[-1]
+            if (match[0] - end <= max_gap and 0 <= match[2] - source_end <= max_gap) or match[0] < end:
+                merged[-1] = (start, max(end, match[1]), source_start, max(source_end, match[3]))
+                continue
+        merged.append(match)
+    return merged
+
+
+def copied_spans(text, page_text, tokens=None):
+    """
+    Passages de `text` recopiés depuis `page_text`, en positions de caractères :
+    {"copied_percent", "spans": [{start, end, source_start, source_end, text}]}
+    """
+    tokens = tokens or Tokens(text)
+    page_tokens = Tokens(page_text)
+    spans = []
+    copied_words = 0
+    for start, end, source_start, source_end in match_tokens(tokens, page_tokens):
+        copied_words += end - start
+        char_start, char_end = tokens.spans[start][0], tokens.spans[end - 1][1]
+        spans.append({
+            "start": char_start,
+            "end": char_end,
+            "source_start": page_tokens.spans[source_start][0],
+            "source_end": page_tokens.spans[source_end - 1][1],
+            "text": text[char_start:char_end],
+        })
+    percent = 100 * copied_words / len(tokens) if len(tokens) else 0.0
+    return {"copied_percent": round(percent, 2), "spans": spans}
+
+
+def unmatched_text(text, spans, min_length=40):
+    """Texte restant une fois les passages copiés retirés (passages trop courts ignorés)"""
+    parts = []
+    position = 0
+    for start, end in sorted((s["start"], s["end"]) for s in spans):
+        if start > position:
+            parts.append(text[position:start])
+        position = max(position, end)
+    parts.append(text[position:])
+    return " ".join(part.strip() for part in parts if len(part.strip()) >= min_length)
@@ -0,0 +1,206 @@
+"""
+Historique des soumissions : embeddings MiniLM des paragraphes de chaque texte analysé,
+pour détecter les copies entre étudiants (index incrémental persistant).
+
+Stockage (append-only) dans HISTORY_INDEX_DIR :
+    embeddings.f16  matrice N x dim en float16, lue en mémoire mappée
+    codes.u16       codes SimHash N x tables (uint16), pour reconstruire l'index au démarrage
+    rows.jsonl      une ligne de métadonnées par paragraphe
+"""
+import json
+import os
+import threading
+import time
+from array import array
+from collections import defaultdict
+
+import numpy as np
+
+# Répertoire de l'historique (vide = historique désactivé)
+HISTORY_INDEX_DIR = os.getenv("HISTORY_INDEX_DIR", "")
+# Similarité cosinus minimale entre deux paragraphes pour signaler une copie
+HISTORY_MIN_SIMILARITY = float(os.getenv("HISTORY_MIN_SIMILARITY", "0.85"))
+
+# LSH par hyperplans aléatoires (SimHash), réglé pour HISTORY_MIN_SIMILARITY : deux
+# vecteurs de cosinus c partagent un code de b bits avec la probabilité p^b, où
+# p = 1 - arccos(c) / pi. Avec 24 tables de 10 bits, un paragraphe à c = 0,85 est
+# candidat dans ~97 % des cas (~30 % avec 8 x 16 bits) ; un paragraphe sans rapport
+# ne l'est que dans ~2 % des cas.
+HISTORY_TABLES = 24
+HISTORY_BITS = 10
+
+EMBEDDINGS_FILE = "embeddings.f16"
+CODES_FILE = "codes.u16"
+ROWS_FILE = "rows.jsonl"
+
+
+class HistoryIndex:
+    """
+    Index ANN des paragraphes déjà soumis. Chaque paragraphe est rangé dans
+    `tables` tables de hachage selon le signe de sa projection sur `bits`
+    hyperplans aléatoires : une requête ne compare exactement (cosinus) que
+    les paragraphes qui partagent un code, pas tout l'historique.
+    """
+
+    def __init__(self, directory, dim=384, tables=HISTORY_TABLES, bits=HISTORY_BITS, seed=0):
+        self.directory = directory
+        self.dim = dim
+        self.tables = tables
+        self.bits = bits
+        rng = np.random.RandomState(seed)
+        self.planes = rng.standard_normal((dim, tables * bits)).astype(np.float32)
+        self._weights = (1 << np.arange(bits)).astype(np.uint32)
+        self.rows = []
+        self.submissions = set()
+        # Un seau (tableau compact d'indices de lignes) par code et par table
+        self._buckets = [[array("i") for _ in range(1 << bits)] for _ in range(tables)]
+        self._view = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def __len__(self):
+        return len(self.submissions)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _codes(self, embeddings):
+        """Codes SimHash (n x tables) d'embeddings (n x dim)"""
+        signs = (np.asarray(embeddings, dtype=np.float32) @ self.planes) > 0
+        signs = signs.reshape(len(signs), self.tables, self.bits)
+        return (signs * self._weights).sum(axis=2).astype(np.uint16)
+
+    def _load(self):
+        if not os.path.exists(self._path(ROWS_FILE)):
+            return
+        with open(self._path(ROWS_FILE), encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        # Une écriture interrompue peut laisser des fichiers de longueurs différentes
+        count = min(len(rows), os.path.getsize(self._path(EMBEDDINGS_FILE)) // (2 * self.dim))
+        codes_size = os.path.getsize(self._path(CODES_FILE)) if os.path.exists(self._path(CODES_FILE)) else 0
+        if codes_size % (2 * self.tables) or codes_size // (2 * self.tables) < count:
+            # Codes d'un autre réglage (tables, bits) ou incomplets : recalculés depuis les embeddings
+            codes = self._rebuild_codes(count)
+        else:
+            codes = np.fromfile(self._path(CODES_FILE), dtype=np.uint16).reshape(-1, self.tables)
+        if count < len(rows) or count < len(codes):
+            self._truncate(rows, count)
+        self.rows = rows[:count]
+        self.submissions = {row["submission"] for row in self.rows}
+        self._index(codes[:count], 0)
+
+    def _rebuild_codes(self, count, block=4096):
+        """Recalcule et réécrit les codes des `count` premiers paragraphes, par blocs"""
+        print(f"Historique : recalcul des codes LSH ({count} paragraphes)")
+        embeddings = np.memmap(self._path(EMBEDDINGS_FILE), dtype=np.float16, mode="r", shape=(count, self.dim)) \
+            if count else np.empty((0, self.dim), dtype=np.float16)
+        codes = np.vstack([self._codes(embeddings[start:start + block].astype(np.float32))
+                           for start in range(0, count, block)] or [np.empty((0, self.tables), dtype=np.uint16)])
+        codes.tofile(self._path(CODES_FILE))
+        return codes
+
+    def _truncate(self, rows, count):
+        """Ramène les trois fichiers à `count` paragraphes complets"""
+        print(f"Historique incomplet : reprise à {count} paragraphes")
+        for name, row_bytes in ((EMBEDDINGS_FILE, 2 * self.dim), (CODES_FILE, 2 * self.tables)):
+            with open(self._path(name), "r+b") as f:
+                f.truncate(count * row_bytes)
+        with open(self._path(ROWS_FILE), "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows[:count])
+
+    def _index(self, codes, first_row):
+        # Regroupement vectorisé par code : le rechargement d'un gros historique reste rapide
+        for table in range(self.tables):
+            order = np.argsort(codes[:, table], kind="stable")
+            values, starts = np.unique(codes[order, table], return_index=True)
+            for code, rows in zip(values.tolist(), np.split((order + first_row).astype(np.int32), starts[1:])):
+                self._buckets[table][code].frombytes(rows.tobytes())
+
+    def _embeddings(self):
+        """Vue mappée des embeddings, rouverte quand l'historique a grandi"""
+        if self._view is None or len(self._view) != len(self.rows):
+            self._view = np.memmap(self._path(EMBEDDINGS_FILE), dtype=np.float16, mode="r",
+                                   shape=(len(self.rows), self.dim)) if self.rows else None
+        return self._view
+
+    def add(self, submission_id, paragraphs, embeddings):
+        """Ajoute les paragraphes d'une soumission (ignorée si déjà présente)"""
+        if not len(paragraphs):
+            return 0
+        embeddings = _normalize(embeddings)
+        now = time.time()
+        rows = [{"submission": submission_id, "paragraph": number, "created": now, "text": paragraph[:200]}
+                for number, paragraph in enumerate(paragraphs)]
+        with self._lock:
+            if submission_id in self.submissions:
+                return 0
+            codes = self._codes(embeddings)
+            with open(self._path(EMBEDDINGS_FILE), "ab") as f:
+                f.write(embeddings.astype(np.float16).tobytes())
+            with open(self._path(CODES_FILE), "ab") as f:
+                f.write(codes.tobytes())
+            with open(self._path(ROWS_FILE), "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+            first_row = len(self.rows)
+            self.rows.extend(rows)
+            self.submissions.add(submission_id)
+            self._index(codes, first_row)
+            return len(rows)
+
+    def query(self, embeddings, exclude=None, min_similarity=None, limit=10):
+        """
+        Soumissions passées proches : [{submission, score, matches}] où `score` est la
+        meilleure similarité d'un paragraphe et `matches` la liste des paragraphes copiés
+        """
+        min_similarity = HISTORY_MIN_SIMILARITY if min_similarity is None else min_similarity
+        if not len(embeddings):
+            return []
+        embeddings = _normalize(embeddings)
+        with self._lock:
+            stored = self._embeddings()
+            if stored is None:
+                return []
+            codes = self._codes(embeddings)
+            found = defaultdict(list)
+            for paragraph, row_codes in enumerate(codes):
+                candidates = self._candidates(row_codes)
+                candidates = [row for row in candidates.tolist() if self.rows[row]["submission"] != exclude]
+                if not candidates:
+                    continue
+                scores = stored[candidates].astype(np.float32) @ embeddings[paragraph]
+                for row, score in zip(candidates, scores.tolist()):
+                    if score >= min_similarity:
+                        meta = self.rows[row]
+                        found[meta["submission"]].append({
+                            "paragraph": paragraph,
+                            "source_paragraph": meta["paragraph"],
+                            "source_text": meta["text"],
+                            "score": round(score * 100, 2),
+                        })
+
+        results = [
+            {"submission": submission, "score": max(m["score"] for m in matches), "matches": matches}
+            for submission, matches in found.items()
+        ]
+        results.sort(key=lambda r: r["score"], reverse=True)
+        return results[:limit]
+
+    def _candidates(self, row_codes):
+        """Lignes qui partagent au moins un code avec la requête (triées, sans doublon)"""
+        buckets = [np.frombuffer(self._buckets[table][int(code)], dtype=np.int32)
+                   for table, code in enumerate(row_codes)]
+        return np.unique(np.concatenate(buckets))
+
+    def stats(self):
+        with self._lock:
+            return {"submissions": len(self.submissions), "paragraphs": len(self.rows)}
+
+
+def _normalize(embeddings):
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+history_index = HistoryIndex(HISTORY_INDEX_DIR) if HISTORY_INDEX_DIR else None
@@ -0,0 +1,186 @@
+"""
+Backends d'inférence CPU : PyTorch fp32, quantification dynamique int8 ou graphes ONNX
+"""
+import gc
+import os
+import tempfile
+
+import numpy as np
+
+# Backend d'inférence : "torch" (fp32), "int8" (quantification dynamique) ou "onnx"
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+# Écart maximal toléré sur les scores de similarité par rapport au modèle fp32
+INFERENCE_TOLERANCE = float(os.getenv("INFERENCE_TOLERANCE", "0.02"))
+
+# Graphes ONNX exportés une seule fois puis rechargés depuis ce répertoire
+INFERENCE_CACHE_DIR = os.getenv("INFERENCE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "plagiat-onnx"))
+
+BACKENDS = ("torch", "int8", "onnx")
+
+# Phrases de calibration utilisées pour comparer un backend optimisé au modèle fp32
+CALIBRATION_SENTENCES = [
+    "Le plagiat consiste à présenter le travail d'autrui comme le sien.",
+    "La photosynthèse transforme l'énergie lumineuse en énergie chimique.",
+    "Les réseaux de neurones apprennent des représentations à partir des données.",
+    "Plagiarism means presenting someone else's work as your own.",
+    "The committee approved the new budget after a long debate.",
+    "Cette méthode permet d'améliorer les performances du système.",
+]
+
+# Backend effectivement utilisé pour chaque modèle, et écart mesuré.
+# Sert aussi de mémoire de calibration : un modèle rechargé après éviction
+# reprend directement le backend retenu, sans nouvelle calibration.
+inference_status = {}
+
+
+def similarity_scores(embeddings):
+    """Matrice des similarités cosinus entre les lignes de `embeddings`"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    normalized = embeddings / np.maximum(norms, 1e-12)
+    return normalized @ normalized.T
+
+
+def score_error(baseline, candidate):
+    """Écart maximal entre les scores de similarité de deux séries d'embeddings"""
+    return float(np.max(np.abs(similarity_scores(baseline) - similarity_scores(candidate))))
+
+
+def quantize_int8(module):
+    """Quantification dynamique int8 des couches linéaires d'un modèle torch (en place)"""
+    import torch
+
+    return torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def _record(name, requested, backend, error=None, reason=None):
+    inference_status[name] = {
+        "requested": requested,
+        "backend": backend,
+        "max_error": round(error, 5) if error is not None else None,
+        "reason": reason,
+    }
+    message = f"Backend d'inférence {name}: {backend}"
+    if error is not None:
+        message += f" (écart max {error:.4f})"
+    if reason:
+        message += f" - {reason}"
+    print(message)
+
+
+def select_backend(name, load, embed, optimize, backend, tolerance=None):
+    """
+    Charge un modèle sur le backend demandé en vérifiant que les scores de similarité
+    restent à moins de `tolerance` de ceux du modèle fp32 ; sinon le modèle fp32 est retourné.
+
+    `load()` charge le modèle fp32 ; `embed(model)` calcule les embeddings de calibration ;
+    `optimize(model)` retourne le modèle optimisé à partir du modèle fp32 (int8, quantifié
+    en place) ou de None (onnx). Une seule copie du modèle est gardée à la fois : le modèle
+    fp32 est libéré dès que ses embeddings de référence sont calculés.
+    """
+    tolerance = INFERENCE_TOLERANCE if tolerance is None else tolerance
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend d'inférence inconnu : {backend}")
+    if backend == "torch":
+        _record(name, backend, "torch")
+        return load()
+
+    previous = inference_status.get(name)
+    if previous and previous["requested"] == backend:
+        # Rechargement après éviction : backend déjà validé (ou déjà refusé)
+        if previous["backend"] == "torch":
+            return load()
+        return optimize(load() if backend == "int8" else None)
+
+    model = load()
+    baseline = np.asarray(embed(model))
+    if backend != "int8":
+        # Le graphe ONNX remplace le modèle fp32 : le libérer avant de charger le graphe
+        model = None
+        gc.collect()
+    try:
+        candidate = optimize(model)
+        model = None
+        error = score_error(baseline, embed(candidate))
+    except Exception as e:
+        _record(name, backend, "torch", reason=f"{backend} indisponible : {e}")
+        model = candidate = None
+        gc.collect()
+        return load()
+    if error > tolerance:
+        _record(name, backend, "torch", error, reason=f"{backend} hors tolérance ({tolerance})")
+        # Libérer le modèle refusé avant de recharger la version fp32
+        candidate = None
+        gc.collect()
+        return load()
+    _record(name, backend, backend, error)
+    return candidate
+
+
+def _onnx_path(model_name):
+    return os.path.join(INFERENCE_CACHE_DIR, model_name.replace("/", "--"))
+
+
+def load_sentence_model(model_name, backend=None):
+    """Charge un SentenceTransformer sur le backend d'inférence configuré"""
+    from sentence_transformers import SentenceTransformer
+
+    backend = backend or INFERENCE_BACKEND
+
+    def load():
+        return SentenceTransformer(model_name, device="cpu")
+
+    def embed(m):
+        return m.encode(CALIBRATION_SENTENCES, convert_to_numpy=True)
+
+    def optimize(m):
+        if backend == "onnx":
+            # Nécessite les extras sentence-transformers[onnx] (optimum, onnxruntime)
+            path = _onnx_path(model_name)
+            if os.path.isdir(path):
+                return SentenceTransformer(path, device="cpu", backend="onnx")
+            onnx_model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+            onnx_model.save(path)
+            return onnx_model
+        return quantize_int8(m)
+
+    return select_backend("sentence", load, embed, optimize, backend)
+
+
+def _encoder_embeddings(model, tokenizer):
+    """Représentations moyennes de l'encodeur T5 pour les phrases de calibration"""
+    import torch
+
+    inputs = tokenizer([f"paraphrase: {s}" for s in CALIBRATION_SENTENCES], padding="longest", return_tensors="pt")
+    encoder = model.get_encoder() if hasattr(model, "get_encoder") else model.encoder
+    with torch.no_grad():
+        states = encoder(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"]).last_hidden_state
+    states = torch.as_tensor(states)
+    mask = inputs["attention_mask"].unsqueeze(-1).to(states.dtype)
+    return ((states * mask).sum(dim=1) / mask.sum(dim=1)).numpy()
+
+
+def load_seq2seq_model(model_name, backend=None):
+    """Charge un modèle seq2seq (T5) et son tokenizer sur le backend d'inférence configuré"""
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+    backend = backend or INFERENCE_BACKEND
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    def load():
+        return AutoModelForSeq2SeqLM.from_pretrained(model_name).eval()
+
+    def optimize(m):
+        if backend == "onnx":
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            # Export ONNX coûteux : réalisé une seule fois, puis rechargé depuis le disque
+            path = _onnx_path(model_name)
+            if os.path.isdir(path):
+                return ORTModelForSeq2SeqLM.from_pretrained(path)
+            onnx_model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+            onnx_model.save_pretrained(path)
+            return onnx_model
+        return quantize_int8(m)
+
+    model = select_backend("paraphrase", load, lambda m: _encoder_embeddings(m, tokenizer), optimize, backend)
+    return tokenizer, model
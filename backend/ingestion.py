@@ -0,0 +1,74 @@
+"""
+Ingestion des documents envoyés : lecture bornée en mémoire et extraction page par page
+"""
+import io
+import os
+
+import docx2txt
+import pypdf
+
+# Taille maximale d'un fichier envoyé et taille des blocs lus
+UPLOAD_MAX_MB = float(os.getenv("UPLOAD_MAX_MB", "20"))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+
+
+class DocumentError(ValueError):
+    """Document illisible ou format non supporté"""
+
+
+class UploadTooLarge(ValueError):
+    """Fichier dépassant la taille maximale autorisée"""
+
+
+async def read_upload(file, max_bytes=None):
+    """
+    Lit un UploadFile par blocs dans un tampon mémoire, sans fichier temporaire.
+    La lecture s'arrête dès que la taille maximale est dépassée.
+    """
+    max_bytes = max_bytes or int(UPLOAD_MAX_MB * 1024 * 1024)
+    buffer = io.BytesIO()
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        if buffer.tell() + len(chunk) > max_bytes:
+            raise UploadTooLarge(f"Fichier trop volumineux (max {max_bytes // (1024 * 1024)} Mo)")
+        buffer.write(chunk)
+    buffer.seek(0)
+    return buffer
+
+
+def _iter_pdf_pages(reader):
+    for number, page in enumerate(reader.pages, start=1):
+        try:
+            yield page.extract_text() or ""
+        except Exception as e:
+            raise DocumentError(f"Erreur PDF (page {number}) : {e}")
+
+
+def iter_document(filename, stream):
+    """
+    Itérateur sur le texte d'un document, page par page pour les PDF.
+    Le format et l'en-tête sont vérifiés immédiatement, l'extraction des pages
+    se fait à la demande pour que l'analyse puisse commencer au plus tôt.
+    """
+    name = (filename or "").lower()
+    if name.endswith(".pdf"):
+        try:
+            reader = pypdf.PdfReader(stream)
+        except Exception as e:
+            raise DocumentError("Erreur PDF : " + str(e))
+        return _iter_pdf_pages(reader)
+    if name.endswith(".docx"):
+        try:
+            return iter([docx2txt.process(stream)])
+        except Exception as e:
+            raise DocumentError("Erreur DOCX : " + str(e))
+    raise DocumentError("Format non supporté")
+
+
+def extract_document(filename, stream):
+    """Texte complet d'un document PDF ou DOCX"""
+    return "".join(iter_document(filename, stream))
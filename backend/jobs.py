@@ -0,0 +1,170 @@
+"""
+Exécution asynchrone des analyses longues : file de jobs et suivi de progression
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Nombre d'analyses exécutées simultanément ; les suivantes attendent dans la file
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Durée de conservation des jobs terminés (secondes)
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "3600"))
+
+
+class Job:
+    """Un job d'analyse : statut, étape courante, journal d'événements et résultat"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.stage = None
+        self.events = []
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._condition = threading.Condition()
+        # Abonnés asynchrones (boucle, événement) réveillés à chaque nouvel événement
+        self._waiters = set()
+
+    def emit(self, stage, data=None):
+        """Enregistre un événement de progression et réveille les abonnés"""
+        with self._condition:
+            self.stage = stage
+            self.events.append({"stage": stage, "data": data, "time": time.time()})
+            self._notify()
+
+    def _finish(self, status, result=None, error=None):
+        with self._condition:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished = time.time()
+            self.events.append({"stage": status, "data": result if error is None else {"error": error},
+                                "time": self.finished})
+            self._notify()
+
+    def _notify(self):
+        """Réveille les abonnés (appelé avec le verrou détenu)"""
+        self._condition.notify_all()
+        for loop, event in self._waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Boucle fermée : l'abonné a disparu
+                pass
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "events": len(self.events),
+                "result": self.result,
+                "error": self.error,
+            }
+
+    def wait_events(self, start, timeout):
+        """Événements à partir de l'indice `start`, en attendant au plus `timeout` secondes"""
+        with self._condition:
+            if len(self.events) <= start and not self.done:
+                self._condition.wait(timeout)
+            return self.events[start:]
+
+    async def wait_events_async(self, start, timeout):
+        """Comme `wait_events`, sans bloquer de thread : attente sur la boucle asyncio"""
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._condition:
+            if len(self.events) > start or self.done:
+                return self.events[start:]
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                self._waiters.discard(waiter)
+        with self._condition:
+            return self.events[start:]
+
+
+class JobManager:
+    """File de jobs exécutée par un pool de threads borné"""
+
+    def __init__(self, max_workers):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Crée un job exécutant `fn(*args, progress=job.emit, **kwargs)`.
+        Le job attend dans la file si tous les workers sont occupés.
+        """
+        self._cleanup()
+        job = Job()
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = "running"
+        job.emit("start")
+        try:
+            result = fn(*args, progress=job.emit, **kwargs)
+            job._finish("done", result=result)
+        except Exception as e:
+            print(f"Job {job.id} failed: {e}")
+            job._finish("failed", error=str(e))
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def queue_depth(self):
+        """Jobs en attente d'un thread d'exécution (rapporté par /ready)"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == "queued")
+
+    def _cleanup(self):
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and now - job.finished > JOB_RETENTION]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+async def sse_events(job, heartbeat=15.0):
+    """
+    Flux server-sent events des étapes d'un job, jusqu'à sa fin.
+    Générateur asynchrone : un abonné en attente n'occupe aucun thread du serveur.
+    """
+    index = 0
+    while True:
+        events = await job.wait_events_async(index, heartbeat)
+        if not events:
+            if job.done:
+                return
+            yield ": keep-alive\n\n"
+            continue
+        for event in events:
+            yield f"event: {event['stage']}\ndata: {json.dumps(event['data'])}\n\n"
+        index += len(events)
+        if job.done and index >= len(job.events):
+            return
+
+
+job_manager = JobManager(JOB_WORKERS)
@@ -1,20 +1,50 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
-from plagiat import check_similarity, reformulate_text
-import os
-import io
-import docx2txt
-import pypdf
+from typing import List, Literal, Optional
 from dotenv import load_dotenv
 
+# Charger .env avant plagiat : ses modules lisent leur configuration à l'import
 load_dotenv()
+
+from plagiat import (
+    check_similarity, check_similarity_stream, REFORMULATE_CHUNK_CHARS,
+    loaded_models, start_warm_up, warmup_status, paraphrase_stats,
+    embedding_batcher
+)
+from cache import page_cache, search_cache, reformulation_cache, content_hash
+from jobs import job_manager, sse_events
+from models import model_registry
+from inference import inference_status
+from corpus import corpus_index
+from history import history_index
+from ingestion import read_upload, iter_document, DocumentError, UploadTooLarge, UPLOAD_MAX_MB
+from classroom import check_batch, BATCH_MAX_FILES, BATCH_MAX_MB
+from text_utils import split_chunks
+from workers import cpu_pool
+import workers
+import json
+import os
+
 API_KEY = os.getenv("SERPAPI_KEY")
+# Modèles à précharger en arrière-plan après le démarrage (ex. "sentence,paraphrase")
+WARMUP_MODELS = [name.strip() for name in os.getenv("WARMUP_MODELS", "").split(",") if name.strip()]
+
+@asynccontextmanager
+async def lifespan(app):
+    # Le serveur répond immédiatement, les modèles se chargent en parallèle
+    start_warm_up(WARMUP_MODELS)
+    yield
+    cpu_pool.shutdown()
 
 app = FastAPI(
     title="Plagiat Detection API",
     description="API pour la détection de plagiat et la reformulation de texte",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configuration CORS plus sécurisée pour la production
@@ -35,10 +65,12 @@ app.add_middleware(
 
 class TextRequest(BaseModel):
     text: str
+    mode: Literal["document", "sentences"] = "document"  # "sentences" : correspondances phrase par phrase
 
 class ReformulateRequest(BaseModel):
     text: str
     use_ai: bool = False  # Désactiver l'IA par défaut pour économiser la RAM
+    seed: Optional[int] = None  # Graine : résultat reproductible et mis en cache (méthode basique uniquement)
 
 @app.get("/")
 def read_root():
@@ -50,56 +82,224 @@ def health_check():
     """Endpoint de santé pour les vérifications de déploiement"""
     return {"status": "healthy", "service": "plagiat-api"}
 
+@app.get("/ready")
+def readiness_check():
+    """
+    Endpoint de disponibilité : 503 tant que le préchargement n'est pas terminé.
+    Un modèle déchargé ensuite (inactivité, budget) est rechargé à la demande :
+    le service reste disponible.
+    """
+    state = warmup_status["state"]
+    ready = state in ("idle", "done")
+    content = {
+        "status": "ready" if ready else ("warmup_failed" if state == "failed" else "warming_up"),
+        "models": loaded_models(),
+        "warmup": warmup_status,
+        "memory": model_registry.stats(),
+        "inference": inference_status,
+        "paraphrase": paraphrase_stats,
+        "embedding_batches": embedding_batcher.stats(),
+        "corpus": corpus_index.stats() if corpus_index is not None else None,
+        "history": history_index.stats() if history_index is not None else None,
+        "cpu_pool": cpu_pool.stats(),
+        "jobs_queued": job_manager.queue_depth(),
+    }
+    return JSONResponse(content, status_code=200 if ready else 503)
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Compteurs des caches de pages, embeddings et recherches (pour les dimensionner)"""
+    return {
+        "pages": page_cache.stats(),
+        "searches": search_cache.stats(),
+        "reformulations": reformulation_cache.stats(),
+    }
+
 @app.post("/check")
-def check_text(data: TextRequest):
+async def check_text(data: TextRequest):
     print(f"Received text analysis request. Text length: {len(data.text)}")
-    score, sources = check_similarity(data.text, API_KEY)
+    score, sources = await run_in_threadpool(check_similarity, data.text, API_KEY, mode=data.mode)
     print(f"Returning score: {score}, sources: {len(sources)}")
     return {"plagiarism_score": score, "sources": sources}
 
+async def read_document(file):
+    """
+    Lit un fichier envoyé en mémoire et prépare l'extraction page par page.
+    Avec CPU_WORKERS, le document est extrait en entier dans un processus de calcul.
+    """
+    try:
+        buffer = await read_upload(file)
+        if cpu_pool.enabled:
+            return await cpu_pool.run(workers.extract_pages, file.filename, buffer.getvalue())
+        return iter_document(file.filename, buffer)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except DocumentError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
     print(f"Received file upload: {file.filename}")
-    contents = await file.read()
-    
-    if file.filename.endswith(".pdf"):
-        try:
-            reader = pypdf.PdfReader(io.BytesIO(contents))
-            text = "".join(page.extract_text() or "" for page in reader.pages)
-            print(f"Extracted PDF text length: {len(text)}")
-        except Exception as e:
-            raise HTTPException(status_code=400, detail="Erreur PDF : " + str(e))
+    pages = await read_document(file)
+
+    try:
+        # Les recherches démarrent pendant l'extraction des pages suivantes ;
+        # extraction, recherches et encodage tournent hors de la boucle d'événements
+        score, sources = await run_in_threadpool(check_similarity_stream, pages, API_KEY)
+    except DocumentError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"plagiarism_score": score, "sources": sources}
+
+@app.post("/batch")
+async def batch_upload(files: List[UploadFile] = File(...)):
+    """
+    Analyse groupée des devoirs d'une classe : score de chaque copie, matrice
+    de similarité entre copies et paires les plus proches
+    """
+    print(f"Received batch upload: {len(files)} files")
+    documents = await read_batch(files)
+    return await run_in_threadpool(check_batch, documents, API_KEY)
 
-    elif file.filename.endswith(".docx"):
+async def read_batch(files):
+    """Lit en mémoire les fichiers d'un lot (nombre et taille bornés)"""
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"Trop de fichiers (max {BATCH_MAX_FILES})")
+    total_too_large = HTTPException(status_code=413, detail=f"Lot trop volumineux (max {BATCH_MAX_MB:g} Mo au total)")
+    file_max = int(UPLOAD_MAX_MB * 1024 * 1024)
+    remaining = int(BATCH_MAX_MB * 1024 * 1024)
+    documents = []
+    for file in files:
+        if remaining <= 0:
+            raise total_too_large
+        limit = min(file_max, remaining)
         try:
-            temp_file = f"temp_{file.filename}"
-            with open(temp_file, "wb") as f:
-                f.write(contents)
-            text = docx2txt.process(temp_file)
-            os.remove(temp_file)  # Nettoyer le fichier temporaire
-        except Exception as e:
-            raise HTTPException(status_code=400, detail="Erreur DOCX : " + str(e))
-    else:
-        raise HTTPException(status_code=400, detail="Format non supporté")
-
-    score, sources = check_similarity(text, API_KEY)
+            buffer = await read_upload(file, limit)
+        except UploadTooLarge as e:
+            if limit < file_max:
+                raise total_too_large
+            raise HTTPException(status_code=413, detail=f"{file.filename} : {e}")
+        remaining -= buffer.getbuffer().nbytes
+        documents.append((file.filename, buffer))
+    return documents
+
+def run_check_job(text, mode="document", progress=None):
+    """Analyse exécutée dans un job"""
+    score, sources = check_similarity(text, API_KEY, mode=mode, progress=progress)
     return {"plagiarism_score": score, "sources": sources}
 
+def run_upload_job(filename, pages, progress=None):
+    """Extraction page par page puis analyse d'un document, exécutées dans un job"""
+    progress("extract", {"filename": filename})
+    score, sources = check_similarity_stream(pages, API_KEY, progress=progress)
+    return {"plagiarism_score": score, "sources": sources}
+
+@app.post("/jobs/check")
+def submit_check_job(data: TextRequest):
+    """Soumet une analyse de texte en arrière-plan et retourne l'identifiant du job"""
+    job = job_manager.submit(run_check_job, data.text, mode=data.mode)
+    return {"job_id": job.id, "status": job.status}
+
+@app.post("/jobs/upload")
+async def submit_upload_job(file: UploadFile = File(...)):
+    """Soumet l'analyse d'un document en arrière-plan et retourne l'identifiant du job"""
+    pages = await read_document(file)
+    job = job_manager.submit(run_upload_job, file.filename, pages)
+    return {"job_id": job.id, "status": job.status}
+
+@app.post("/jobs/batch")
+async def submit_batch_job(files: List[UploadFile] = File(...)):
+    """Soumet l'analyse d'une classe en arrière-plan et retourne l'identifiant du job"""
+    documents = await read_batch(files)
+    job = job_manager.submit(check_batch, documents, API_KEY)
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Statut, étape courante et résultat (une fois terminé) d'un job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job introuvable")
+    return job.snapshot()
+
+@app.get("/jobs/{job_id}/events")
+def stream_job_events(job_id: str):
+    """Flux server-sent events des étapes et résultats partiels d'un job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job introuvable")
+    return StreamingResponse(sse_events(job), media_type="text/event-stream")
+
+def reformulation_mode(requested_ai):
+    """(use_ai, méthode) : en production, l'IA n'est autorisée que si un budget mémoire encadre les modèles"""
+    is_production = os.getenv("ENVIRONMENT") == "production"
+    ai_restricted = is_production and not model_registry.budget_bytes
+    if ai_restricted and requested_ai:
+        print("Mode production sans MODEL_MEMORY_BUDGET_MB: IA désactivée pour économiser la RAM")
+        return False, "Basic (Production Mode)"
+    return requested_ai, "AI" if requested_ai else "Basic"
+
+def reformulation_seed(use_ai, seed):
+    """
+    (graine appliquée, graine ignorée) : l'échantillonnage du modèle T5 n'est pas
+    reproductible, la graine ne vaut que pour la reformulation basique
+    """
+    if use_ai and seed is not None:
+        print("Reformulation IA : graine ignorée (résultat non reproductible)")
+        return None, True
+    return seed, False
+
+async def cached_reformulation(stage, text, use_ai, seed, *index):
+    """
+    Exécute `stage(text, use_ai, seed, *index)`, servi depuis le cache quand une graine
+    est fournie : clé (empreinte du texte, méthode, graine, morceau). Sans graine, chaque
+    appel est un nouveau tirage et rien n'est mis en cache. Retourne (résultat, depuis le cache).
+    """
+    args = (text, use_ai, seed) + index
+    if seed is None:
+        return await cpu_pool.run(stage, *args), False
+    key = content_hash(f"{'ai' if use_ai else 'basic'}\x00{seed}\x00{index}\x00{text}")
+    cached = reformulation_cache.get(key)
+    if cached is not None:
+        return cached, True
+    result = await cpu_pool.run(stage, *args)
+    reformulation_cache.set(key, result)
+    return result, False
+
 @app.post("/reformulate")
-def reformulate_text_endpoint(data: ReformulateRequest):
+async def reformulate_text_endpoint(data: ReformulateRequest):
     print(f"Received reformulation request. Text length: {len(data.text)}, AI: {data.use_ai}")
+    use_ai, method = reformulation_mode(data.use_ai)
+    seed, seed_ignored = reformulation_seed(use_ai, data.seed)
     
-    # En production, privilégier la reformulation basique pour économiser la RAM
-    is_production = os.getenv("ENVIRONMENT") == "production"
-    use_ai = data.use_ai and not is_production
-    
-    if is_production and data.use_ai:
-        print("Mode production: IA désactivée pour économiser la RAM")
-    
-    reformulated = reformulate_text(data.text, use_ai=use_ai)
+    reformulated, cached = await cached_reformulation(workers.reformulate, data.text, use_ai, seed)
     print(f"Reformulated text length: {len(reformulated)}")
-    method = "AI" if use_ai else "Basic"
-    if is_production and data.use_ai:
-        method = "Basic (Production Mode)"
     
-    return {"original": data.text, "reformulated": reformulated, "method": method}
+    return {"original": data.text, "reformulated": reformulated, "method": method,
+            "seed": seed, "seed_ignored": seed_ignored, "cached": cached}
+
+@app.post("/reformulate/stream")
+async def reformulate_stream_endpoint(data: ReformulateRequest):
+    """
+    Reformulation des longs documents en flux NDJSON : une ligne par morceau
+    (index, total, séparateur, original, reformulé) dès qu'il est prêt, puis
+    une ligne finale {"done": true}. Le texte complet s'obtient en concaténant
+    séparateur + reformulé de chaque morceau.
+    """
+    print(f"Received streaming reformulation request. Text length: {len(data.text)}, AI: {data.use_ai}")
+    use_ai, method = reformulation_mode(data.use_ai)
+    seed, seed_ignored = reformulation_seed(use_ai, data.seed)
+    return StreamingResponse(
+        reformulation_events(data.text, use_ai, method, seed, seed_ignored), media_type="application/x-ndjson"
+    )
+
+async def reformulation_events(text, use_ai, method, seed=None, seed_ignored=False):
+    chunks = list(split_chunks(text, REFORMULATE_CHUNK_CHARS))
+    for index, (separator, chunk) in enumerate(chunks):
+        # Un seul morceau à la fois en mémoire du modèle ; la boucle d'événements reste libre
+        reformulated, cached = await cached_reformulation(workers.reformulate_chunk, chunk, use_ai, seed, index)
+        yield json.dumps({
+            "index": index, "total": len(chunks), "separator": separator,
+            "original": chunk, "reformulated": reformulated, "cached": cached
+        }, ensure_ascii=False) + "\n"
+    yield json.dumps({"done": True, "chunks": len(chunks), "method": method,
+                      "seed": seed, "seed_ignored": seed_ignored}) + "\n"
@@ -0,0 +1,211 @@
+"""
+Gestionnaire des modèles en mémoire : budget, compteurs d'utilisation et éviction
+"""
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Budget mémoire total des modèles (Mo, 0 = illimité)
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+# Déchargement des modèles inutilisés depuis ce délai (secondes, 0 = jamais)
+MODEL_IDLE_TIMEOUT = float(os.getenv("MODEL_IDLE_TIMEOUT", "900"))
+# Attente maximale d'une place dans le budget quand tous les modèles sont occupés
+MODEL_WAIT_TIMEOUT = float(os.getenv("MODEL_WAIT_TIMEOUT", "120"))
+
+MB = 1024 * 1024
+
+
+class ModelBudgetExceeded(RuntimeError):
+    """Impossible de charger un modèle sans dépasser le budget mémoire"""
+
+
+def measure_size(value):
+    """Taille en octets des paramètres et buffers d'un modèle torch (ou d'un tuple de modèles)"""
+    if isinstance(value, (tuple, list)):
+        return sum(measure_size(v) for v in value)
+    size = 0
+    for attr in ("parameters", "buffers"):
+        tensors = getattr(value, attr, None)
+        if callable(tensors):
+            try:
+                size += sum(t.numel() * t.element_size() for t in tensors())
+            except Exception:
+                pass
+    return size
+
+
+class _Entry:
+    def __init__(self, name, loader, estimated_bytes):
+        self.name = name
+        self.loader = loader
+        self.estimated_bytes = estimated_bytes
+        self.value = None
+        self.size = 0
+        self.refs = 0
+        self.loading = False
+        self.last_used = 0.0
+
+    @property
+    def loaded(self):
+        return self.value is not None
+
+    @property
+    def footprint(self):
+        return self.size or self.estimated_bytes
+
+
+class ModelRegistry:
+    """
+    Registre des modèles chargés à la demande. Les modèles en cours d'utilisation
+    sont comptés et ne sont jamais déchargés ; les autres sont évincés du moins
+    récemment utilisé au plus récent quand un chargement dépasserait le budget,
+    ou déchargés après une période d'inactivité.
+    """
+
+    def __init__(self, budget_bytes=0, idle_timeout=0, wait_timeout=120):
+        self.budget_bytes = budget_bytes
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+        self._entries = {}
+        self._condition = threading.Condition()
+        self._reaper = None
+
+    def register(self, name, loader, estimated_mb=0):
+        """Déclare un modèle et la fonction qui le charge"""
+        with self._condition:
+            self._entries[name] = _Entry(name, loader, int(estimated_mb * MB))
+
+    def _used_bytes(self, exclude=None):
+        return sum(e.footprint for e in self._entries.values() if (e.loaded or e.loading) and e is not exclude)
+
+    def _make_room(self, entry):
+        """Évince les modèles inactifs (LRU) jusqu'à ce que `entry` tienne dans le budget"""
+        if not self.budget_bytes:
+            return True
+        idle = sorted(
+            (e for e in self._entries.values() if e.loaded and e.refs == 0 and e is not entry),
+            key=lambda e: e.last_used
+        )
+        while self._used_bytes(exclude=entry) + entry.footprint > self.budget_bytes and idle:
+            self._unload(idle.pop(0), reason="budget")
+        others = self._used_bytes(exclude=entry)
+        # Un modèle seul plus gros que le budget est tout de même chargé
+        return others == 0 or others + entry.footprint <= self.budget_bytes
+
+    def _unload(self, entry, reason):
+        print(f"Déchargement du modèle {entry.name} ({reason})")
+        entry.value = None
+        entry.size = 0
+        gc.collect()
+
+    def acquire(self, name):
+        """Retourne le modèle (chargé si besoin) et le marque comme utilisé"""
+        deadline = time.monotonic() + self.wait_timeout
+        with self._condition:
+            entry = self._entries[name]
+            while True:
+                if entry.loaded:
+                    entry.refs += 1
+                    entry.last_used = time.time()
+                    return entry.value
+                if not entry.loading and self._make_room(entry):
+                    entry.loading = True
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ModelBudgetExceeded(f"Budget mémoire insuffisant pour charger {name}")
+                self._condition.wait(remaining)
+
+        try:
+            value = entry.loader()
+        except Exception:
+            with self._condition:
+                entry.loading = False
+                self._condition.notify_all()
+            raise
+
+        with self._condition:
+            entry.value = value
+            entry.size = measure_size(value) or entry.estimated_bytes
+            entry.loading = False
+            entry.refs += 1
+            entry.last_used = time.time()
+            self._condition.notify_all()
+        self._start_reaper()
+        return value
+
+    def release(self, name):
+        """Libère une utilisation du modèle"""
+        with self._condition:
+            entry = self._entries[name]
+            entry.refs = max(0, entry.refs - 1)
+            entry.last_used = time.time()
+            self._condition.notify_all()
+
+    @contextmanager
+    def use(self, name):
+        """Réserve le modèle pendant la durée du bloc `with`"""
+        value = self.acquire(name)
+        try:
+            yield value
+        finally:
+            self.release(name)
+
+    def preload(self, name):
+        """Charge un modèle sans le garder réservé"""
+        with self.use(name):
+            pass
+
+    def evict_idle(self, now=None):
+        """Décharge les modèles inutilisés depuis plus de `idle_timeout` secondes"""
+        if not self.idle_timeout:
+            return []
+        now = now or time.time()
+        evicted = []
+        with self._condition:
+            for entry in self._entries.values():
+                if entry.loaded and entry.refs == 0 and now - entry.last_used > self.idle_timeout:
+                    self._unload(entry, reason="inactivité")
+                    evicted.append(entry.name)
+            if evicted:
+                self._condition.notify_all()
+        return evicted
+
+    def _start_reaper(self):
+        if not self.idle_timeout or self._reaper is not None:
+            return
+        interval = max(1.0, min(60.0, self.idle_timeout / 2))
+
+        def reap():
+            while True:
+                time.sleep(interval)
+                self.evict_idle()
+
+        self._reaper = threading.Thread(target=reap, name="model-reaper", daemon=True)
+        self._reaper.start()
+
+    def loaded(self):
+        """État de chargement de chaque modèle"""
+        with self._condition:
+            return {name: entry.loaded for name, entry in self._entries.items()}
+
+    def stats(self):
+        with self._condition:
+            return {
+                "budget_mb": round(self.budget_bytes / MB, 1),
+                "used_mb": round(self._used_bytes() / MB, 1),
+                "models": {
+                    name: {
+                        "loaded": entry.loaded,
+                        "refs": entry.refs,
+                        "size_mb": round(entry.footprint / MB, 1) if entry.loaded else 0,
+                        "idle_seconds": round(time.time() - entry.last_used) if entry.loaded else None,
+                    }
+                    for name, entry in self._entries.items()
+                },
+            }
+
+
+model_registry = ModelRegistry(int(MODEL_MEMORY_BUDGET_MB * MB), MODEL_IDLE_TIMEOUT, MODEL_WAIT_TIMEOUT)
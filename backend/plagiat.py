@@ -1,43 +1,177 @@
-from sentence_transformers import SentenceTransformer, util
 import requests
-from bs4 import BeautifulSoup
-import re
 import random
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-import torch
-from deep_translator import GoogleTranslator
-from langdetect import detect, DetectorFactory
+import re
 import time
+import os
+import importlib
+import threading
+from fetcher import fetch_pages, get_session, FETCH_DEADLINE, FETCH_TIMEOUT
+from cache import page_cache, search_cache, content_hash
+from text_utils import split_sentences, split_paragraphs, split_chunks
+from query_planner import plan_queries, search_queries, StreamingSearch
+from translation import translation_service
+from reformulation import reformulation_engine
+from models import model_registry
+from batching import MicroBatcher
+from corpus import corpus_index
+from history import history_index
+from fingerprint import Tokens, copied_spans, unmatched_text
+from prefilter import prefilter_pages
+import extractor
+import workers
+from workers import cpu_pool
+from search_index import (
+    WebSearchProvider, BM25SearchProvider, get_bm25_index, SEARCH_PROVIDER
+)
+import inference
+
+class LazyModule:
+    """
+    Module importé au premier accès à l'un de ses attributs : les dépendances lourdes
+    (torch, transformers...) ne sont chargées que lorsqu'un modèle est réellement utilisé
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+util = LazyModule("sentence_transformers.util")
+
+def detect(text):
+    """Détecte la langue d'un texte (langdetect importé à la demande)"""
+    from langdetect import detect as langdetect_detect, DetectorFactory
+    # Pour avoir des résultats de détection de langue cohérents
+    DetectorFactory.seed = 0
+    return langdetect_detect(text)
+
+SENTENCE_MODEL_NAME = 'paraphrase-MiniLM-L6-v2'
+
+# Préréglages de génération pour la paraphrase T5
+PARAPHRASE_PRESETS = {
+    # Rapide : échantillonnage simple, sans recherche en faisceau
+    "fast": {
+        "num_beams": 1,
+        "do_sample": True,
+        "top_p": 0.9,
+        "no_repeat_ngram_size": 3,
+    },
+    # Qualité : recherche en faisceau avec échantillonnage (réglage historique)
+    "quality": {
+        "num_beams": 8,
+        "no_repeat_ngram_size": 3,
+        "early_stopping": True,
+        "do_sample": True,
+        "temperature": 1.2,
+        "top_p": 0.9,
+        "repetition_penalty": 1.2,
+    },
+}
+PARAPHRASE_PRESET = os.getenv("PARAPHRASE_PRESET", "fast")
+PARAPHRASE_BATCH_SIZE = int(os.getenv("PARAPHRASE_BATCH_SIZE", "8"))
 
-# Pour avoir des résultats de détection de langue cohérents
-DetectorFactory.seed = 0
+# Débit cumulé de la paraphrase (phrases traitées, secondes de génération)
+paraphrase_stats = {"sentences": 0, "seconds": 0.0, "last_sentences_per_second": None}
 
-# Chargement différé des modèles pour optimiser la mémoire
-model = None
-paraphrase_tokenizer = None
-paraphrase_model = None
+# Mode de comparaison par phrases : taille max des fenêtres (en phrases)
+# et nombre max de fenêtres encodées par page pour borner la latence
+SENTENCE_WINDOW_SIZE = int(os.getenv("SENTENCE_WINDOW_SIZE", "2"))
+MAX_WINDOWS_PER_PAGE = int(os.getenv("MAX_WINDOWS_PER_PAGE", "200"))
+
+# Taille des morceaux de reformulation (caractères) : au-delà, le texte est traité par morceaux
+REFORMULATE_CHUNK_CHARS = int(os.getenv("REFORMULATE_CHUNK_CHARS", "1500"))
+
+def _load_sentence_model():
+    print("Chargement du modèle SentenceTransformer...")
+    sentence_model = inference.load_sentence_model(SENTENCE_MODEL_NAME)
+    print("Modèle SentenceTransformer chargé !")
+    return sentence_model
+
+def _load_paraphrase_model():
+    print("Chargement du modèle de paraphrase T5 anglais...")
+    # Utiliser un modèle plus léger pour éviter l'OOM
+    tokenizer, paraphrase_model = inference.load_seq2seq_model("t5-small")
+    print("Modèle de paraphrase T5 léger chargé avec succès !")
+    return tokenizer, paraphrase_model
+
+# Chargement différé des modèles, sous le contrôle du budget mémoire du registre
+# (tailles fp32 mesurées : MiniLM ~90 Mo, T5-small ~240 Mo)
+model_registry.register("sentence", _load_sentence_model, estimated_mb=90)
+model_registry.register("paraphrase", _load_paraphrase_model, estimated_mb=240)
 
 def load_sentence_model():
-    """Charge le modèle SentenceTransformer de manière différée"""
-    global model
-    if model is None:
-        print("Chargement du modèle SentenceTransformer...")
-        model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
-        print("Modèle SentenceTransformer chargé !")
-    return model
+    """Réserve le modèle SentenceTransformer (à utiliser avec `with`), chargé si besoin"""
+    return model_registry.use("sentence")
 
 def load_paraphrase_model():
-    """Charge le modèle de paraphrase T5 anglais de manière différée"""
-    global paraphrase_tokenizer, paraphrase_model
-    if paraphrase_tokenizer is None or paraphrase_model is None:
-        print("Chargement du modèle de paraphrase T5 anglais...")
-        # Utiliser un modèle plus léger pour éviter l'OOM
-        paraphrase_tokenizer = AutoTokenizer.from_pretrained("t5-small")
-        paraphrase_model = AutoModelForSeq2SeqLM.from_pretrained("t5-small")
-        print("Modèle de paraphrase T5 léger chargé avec succès !")
-    return paraphrase_tokenizer, paraphrase_model
-
-def paraphrase_text_ai(text, max_sentences=10):
+    """Réserve le modèle de paraphrase T5 anglais (à utiliser avec `with`), chargé si besoin"""
+    return model_registry.use("paraphrase")
+
+def loaded_models():
+    """Modèles actuellement chargés en mémoire"""
+    return model_registry.loaded()
+
+warmup_status = {"state": "idle", "models": [], "error": None}
+
+def warm_up_models(names):
+    """Précharge les modèles demandés (appelé en tâche de fond au démarrage)"""
+    warmup_status.update(state="running", models=list(names), error=None)
+    try:
+        for name in names:
+            model_registry.preload(name)
+        warmup_status["state"] = "done"
+    except Exception as e:
+        print(f"Erreur de préchargement des modèles: {e}")
+        warmup_status.update(state="failed", error=str(e))
+
+def start_warm_up(names):
+    """
+    Lance le préchargement des modèles dans un thread d'arrière-plan ou, si le pool de
+    processus est actif, dans chaque processus de calcul (les modèles y servent, le
+    processus du serveur ne les charge pas)
+    """
+    names = [name for name in names if name in model_registry.loaded()]
+    if not names:
+        return None
+    # Marqué avant le démarrage pour que /ready ne voie jamais un état intermédiaire
+    warmup_status.update(state="running", models=list(names), error=None)
+    if cpu_pool.enabled:
+        futures = cpu_pool.start(names)
+        for future in futures:
+            future.add_done_callback(lambda _: _pool_warm_up_done(futures))
+        return futures
+    thread = threading.Thread(target=warm_up_models, args=(names,), name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+def _pool_warm_up_done(futures):
+    """Termine l'état du préchargement quand tous les processus ont répondu"""
+    if not all(future.done() for future in futures):
+        return
+    errors = []
+    for future in futures:
+        try:
+            state = future.result()
+        except Exception as e:
+            state = {"state": "failed", "error": str(e)}
+        if state["state"] != "done":
+            errors.append(state["error"])
+    warmup_status.update(state="failed" if errors else "done", error=errors[0] if errors else None)
+
+def translate_sentences(sentences, source, target):
+    """
+    Traduit une liste de phrases en un appel groupé (avec cache et limitation de débit).
+    Les fragments très courts sont conservés tels quels.
+    """
+    to_translate = [s for s in sentences if len(s) > 5]
+    translated = iter(translation_service.translate(to_translate, source, target))
+    return [next(translated) if len(s) > 5 else s for s in sentences]
+
+def paraphrase_text_ai(text, max_sentences=None, rng=None):
     """
     Reformule automatiquement un texte en utilisant traduction + paraphrase anglaise + retraduction
     """
@@ -53,9 +187,6 @@ def paraphrase_text_ai(text, max_sentences=10):
             detected_lang = 'fr'  # Par défaut français
             print("Détection de langue échouée, utilisation du français par défaut")
 
-        # Initialiser le traducteur
-        translator = GoogleTranslator(source='fr', target='en')
-        
         # Si le texte est en français, on le traduit en anglais d'abord
         if detected_lang == 'fr':
             print("Traduction français -> anglais...")
@@ -63,15 +194,7 @@ def paraphrase_text_ai(text, max_sentences=10):
                 # Découper en phrases pour une meilleure traduction
                 sentences = re.split(r'[.!?]+', text)
                 sentences = [s.strip() for s in sentences if s.strip()]
-                
-                translated_sentences = []
-                for sentence in sentences:
-                    if len(sentence) > 5:
-                        time.sleep(0.1)  # Éviter les limites de taux
-                        translated = translator.translate(sentence)
-                        translated_sentences.append(translated)
-                    else:
-                        translated_sentences.append(sentence)
+                translated_sentences = translate_sentences(sentences, 'fr', 'en')
                 
                 english_text = '. '.join(translated_sentences)
                 if english_text and not english_text.endswith('.'):
@@ -81,7 +204,7 @@ def paraphrase_text_ai(text, max_sentences=10):
                 
             except Exception as e:
                 print(f"Erreur de traduction fr->en: {e}")
-                return reformulate_text_basic(text)
+                return reformulate_text_basic(text, rng)
         else:
             # Si déjà en anglais, on utilise le texte tel quel
             english_text = text
@@ -93,27 +216,16 @@ def paraphrase_text_ai(text, max_sentences=10):
         
         if not paraphrased_english or paraphrased_english == english_text:
             print("Paraphrase anglaise échouée, fallback")
-            return reformulate_text_basic(text)
+            return reformulate_text_basic(text, rng)
 
         # Si le texte original était en français, retraduire en français
         if detected_lang == 'fr':
             print("Retraduction anglais -> français...")
             try:
-                # Créer un nouveau traducteur pour EN->FR
-                translator_en_fr = GoogleTranslator(source='en', target='fr')
-                
                 # Découper en phrases pour une meilleure retraduction
                 sentences = re.split(r'[.!?]+', paraphrased_english)
                 sentences = [s.strip() for s in sentences if s.strip()]
-                
-                retranslated_sentences = []
-                for sentence in sentences:
-                    if len(sentence) > 5:
-                        time.sleep(0.1)  # Éviter les limites de taux
-                        retranslated = translator_en_fr.translate(sentence)
-                        retranslated_sentences.append(retranslated)
-                    else:
-                        retranslated_sentences.append(sentence)
+                retranslated_sentences = translate_sentences(sentences, 'en', 'fr')
                 
                 final_text = '. '.join(retranslated_sentences)
                 if final_text and not final_text.endswith('.'):
@@ -124,80 +236,92 @@ def paraphrase_text_ai(text, max_sentences=10):
                 
             except Exception as e:
                 print(f"Erreur de retraduction en->fr: {e}")
-                return reformulate_text_basic(text)
+                return reformulate_text_basic(text, rng)
         else:
             # Si le texte était déjà en anglais, retourner la paraphrase anglaise
             return paraphrased_english
         
     except Exception as e:
         print(f"Erreur avec la méthode traduction/paraphrase, fallback: {e}")
-        return reformulate_text_basic(text)
+        return reformulate_text_basic(text, rng)
 
-def paraphrase_english_text(text, max_sentences=10):
+def paraphrase_english_text(text, max_sentences=None, preset=None, batch_size=None):
     """
-    Paraphrase un texte anglais avec le modèle T5
+    Paraphrase un texte anglais avec le modèle T5 (les `max_sentences` premières
+    phrases, toutes par défaut).
+    Les phrases sont traitées par lots, triées par longueur et complétées
+    seulement jusqu'à la plus longue du lot (padding dynamique).
     """
     try:
-        tokenizer, model = load_paraphrase_model()
-        
+        import torch
+        generation = PARAPHRASE_PRESETS[preset or PARAPHRASE_PRESET]
+        batch_size = batch_size or PARAPHRASE_BATCH_SIZE
+
         # Découper le texte en phrases
         sentences = re.split(r'[.!?]+', text)
         sentences = [s.strip() for s in sentences if s.strip() and len(s.strip()) > 10]
-        paraphrased_sentences = []
+        if max_sentences is not None:
+            sentences = sentences[:max_sentences]
+        paraphrased_sentences = list(sentences)
 
         print(f"Paraphrase de {len(sentences)} phrases en anglais")
 
-        for i, sentence in enumerate(sentences[:max_sentences]):
-            if len(sentence) < 15:  # Ignorer les phrases très courtes
-                paraphrased_sentences.append(sentence)
-                continue
-                
-            # Nettoyer et préparer la phrase
-            clean_sentence = sentence.strip()
-            if not clean_sentence.endswith('.'):
-                clean_sentence += '.'
-                
-            input_text = f"paraphrase: {clean_sentence}"
-            
-            try:
-                encoding = tokenizer.encode_plus(
-                    input_text, 
-                    padding="max_length", 
-                    return_tensors="pt", 
-                    max_length=256, 
-                    truncation=True
-                )
-                input_ids, attention_mask = encoding["input_ids"], encoding["attention_mask"]
-
-                with torch.no_grad():
-                    outputs = model.generate(
-                        input_ids=input_ids,
-                        attention_mask=attention_mask,
+        # Les phrases très courtes sont conservées telles quelles
+        clean_sentences = {}
+        for i, sentence in enumerate(sentences):
+            if len(sentence) >= 15:
+                clean_sentence = sentence.strip()
+                if not clean_sentence.endswith('.'):
+                    clean_sentence += '.'
+                clean_sentences[i] = clean_sentence
+
+        # Trier par longueur pour limiter le padding à l'intérieur de chaque lot
+        order = sorted(clean_sentences, key=lambda i: len(clean_sentences[i]))
+        # Le modèle reste réservé (non évictable) pendant la génération
+        with load_paraphrase_model() as (tokenizer, model):
+            start = time.perf_counter()
+            for b in range(0, len(order), batch_size):
+                batch = order[b:b + batch_size]
+                inputs = [f"paraphrase: {clean_sentences[i]}" for i in batch]
+                try:
+                    encoding = tokenizer(
+                        inputs,
+                        padding="longest",
+                        return_tensors="pt",
                         max_length=256,
-                        num_beams=8,
-                        num_return_sequences=1,
-                        no_repeat_ngram_size=3,
-                        early_stopping=True,
-                        do_sample=True,
-                        temperature=1.2,
-                        top_p=0.9,
-                        repetition_penalty=1.2
+                        truncation=True
                     )
 
-                paraphrased = tokenizer.decode(outputs[0], skip_special_tokens=True, clean_up_tokenization_spaces=True)
-                
-                # Vérifier si la paraphrase est différente de l'original
-                if paraphrased.lower().strip() != clean_sentence.lower().strip():
-                    paraphrased_sentences.append(paraphrased)
-                    print(f"Phrase anglaise {i+1} paraphrasée avec succès")
-                else:
-                    # Utiliser l'original si pas de changement
-                    paraphrased_sentences.append(clean_sentence)
-                    print(f"Phrase anglaise {i+1} inchangée (paraphrase identique)")
-                    
-            except Exception as e:
-                print(f"Erreur pour la phrase anglaise {i+1}: {e}")
-                paraphrased_sentences.append(sentence)
+                    with torch.no_grad():
+                        outputs = model.generate(
+                            input_ids=encoding["input_ids"],
+                            attention_mask=encoding["attention_mask"],
+                            max_length=256,
+                            num_return_sequences=1,
+                            **generation
+                        )
+
+                    decoded = tokenizer.batch_decode(outputs, skip_special_tokens=True, clean_up_tokenization_spaces=True)
+                    for i, paraphrased in zip(batch, decoded):
+                        # Vérifier si la paraphrase est différente de l'original
+                        if paraphrased.lower().strip() != clean_sentences[i].lower().strip():
+                            paraphrased_sentences[i] = paraphrased
+                            print(f"Phrase anglaise {i+1} paraphrasée avec succès")
+                        else:
+                            # Utiliser l'original si pas de changement
+                            paraphrased_sentences[i] = clean_sentences[i]
+                            print(f"Phrase anglaise {i+1} inchangée (paraphrase identique)")
+
+                except Exception as e:
+                    print(f"Erreur pour le lot de phrases anglaises {b // batch_size + 1}: {e}")
+
+        elapsed = time.perf_counter() - start
+        if order:
+            paraphrase_stats["sentences"] += len(order)
+            paraphrase_stats["seconds"] += elapsed
+            paraphrase_stats["last_sentences_per_second"] = round(len(order) / elapsed, 2) if elapsed else None
+            print(f"Débit de paraphrase: {len(order)} phrases en {elapsed:.2f}s "
+                  f"({paraphrase_stats['last_sentences_per_second']} phrases/s)")
 
         result = '. '.join(paraphrased_sentences)
         if result and not result.endswith('.'):
@@ -210,66 +334,19 @@ def paraphrase_english_text(text, max_sentences=10):
         print(f"Erreur avec le modèle T5 anglais: {e}")
         return text
 
-def reformulate_sentence_basic(sentence):
+def reformulation_rng(seed=None, index=0):
+    """
+    Générateur aléatoire propre à une requête (jamais le module `random` global).
+    Avec une graine, chaque morceau `index` a son propre générateur dérivé : le
+    résultat est reproductible, que les morceaux soient traités en série ou en parallèle.
+    """
+    return random.Random(None if seed is None else f"{seed}:{index}")
+
+def reformulate_sentence_basic(sentence, rng=None):
     """Reformule une phrase individuelle avec des synonymes et transformations"""
-    if not sentence or len(sentence.strip()) < 10:
-        return sentence
-    
-    # Dictionnaire de synonymes enrichi
-    synonyms = {
-        'très': ['extrêmement', 'particulièrement', 'vraiment', 'fort', 'remarquablement'],
-        'important': ['essentiel', 'crucial', 'primordial', 'capital', 'fondamental'],
-        'permettre': ['autoriser', 'donner la possibilité', 'rendre possible', 'faciliter'],
-        'utiliser': ['employer', 'se servir de', 'exploiter', 'mettre en œuvre', 'recourir à'],
-        'développer': ['élaborer', 'concevoir', 'créer', 'mettre au point', 'établir'],
-        'analyser': ['examiner', 'étudier', 'évaluer', 'décortiquer', 'scruter'],
-        'montrer': ['démontrer', 'révéler', 'illustrer', 'mettre en évidence', 'exhiber'],
-        'différent': ['distinct', 'varié', 'divers', 'autre', 'dissemblable'],
-        'nouveau': ['récent', 'innovant', 'inédit', 'moderne', 'contemporain'],
-        'donner': ['fournir', 'procurer', 'offrir', 'apporter', 'octroyer'],
-        'créer': ['concevoir', 'élaborer', 'générer', 'produire', 'établir'],
-        'améliorer': ['perfectionner', 'optimiser', 'bonifier', 'enrichir', 'raffiner'],
-        'faire': ['effectuer', 'réaliser', 'accomplir', 'exécuter', 'mener'],
-        'voir': ['observer', 'constater', 'remarquer', 'percevoir', 'discerner'],
-        'dire': ['affirmer', 'déclarer', 'énoncer', 'mentionner', 'stipuler'],
-        'avoir': ['posséder', 'détenir', 'disposer de', 'bénéficier de'],
-        'être': ['constituer', 'représenter', 'former', 's\'avérer'],
-        'grand': ['important', 'considérable', 'majeur', 'significatif', 'substantiel'],
-        'bon': ['excellent', 'satisfaisant', 'adéquat', 'approprié', 'convenable'],
-        'simple': ['facile', 'aisé', 'élémentaire', 'basique', 'accessible']
-    }
-    
-    result = sentence
-    
-    # Remplacer des mots par leurs synonymes avec probabilité
-    for word, synonym_list in synonyms.items():
-        if random.random() < 0.7:  # 70% de chance de remplacer
-            pattern = r'\b' + re.escape(word) + r'\b'
-            if re.search(pattern, result, flags=re.IGNORECASE):
-                synonym = random.choice(synonym_list)
-                result = re.sub(pattern, synonym, result, flags=re.IGNORECASE, count=1)
-    
-    # Transformations de structure
-    structure_transforms = [
-        (r'^Il faut (.+)', r'Il convient de \1'),
-        (r'^On peut (.+)', r'Il est possible de \1'),
-        (r'^Cela permet (.+)', r'Cette approche offre la possibilité \1'),
-        (r'^Cette méthode (.+)', r'Ce procédé \1'),
-        (r'^Ce système (.+)', r'Cette architecture \1'),
-        (r'est utilisé', 'trouve son application'),
-        (r'est basé sur', 'repose sur'),
-        (r'est défini comme', 'se caractérise par'),
-        (r'peut être', 'est susceptible d\'être'),
-        (r'doit être', 'se doit d\'être'),
-    ]
-    
-    for pattern, replacement in structure_transforms:
-        if random.random() < 0.5:  # 50% de chance d'appliquer
-            result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
-    
-    return result.strip()
+    return reformulation_engine.reformulate_sentence(sentence, rng or reformulation_rng())
 
-def reformulate_text_basic(text):
+def reformulate_text_basic(text, rng=None):
     """
     Version de base avec synonymes et restructuration améliorée
     """
@@ -277,55 +354,45 @@ def reformulate_text_basic(text):
         return text
     
     print("Utilisation de la reformulation basique améliorée")
-    
-    # Découper en phrases
-    sentences = re.split(r'[.!?]+', text)
-    sentences = [s.strip() for s in sentences if s.strip() and len(s.strip()) > 5]
-    
-    reformulated_sentences = []
-    
-    # Connecteurs pour varier les transitions
-    connectors = [
-        'Par ailleurs,', 'En outre,', 'De plus,', 'Également,', 'Ainsi,', 
-        'En effet,', 'Néanmoins,', 'Cependant,', 'Toutefois,', 'D\'autre part,'
-    ]
-    
-    for i, sentence in enumerate(sentences):
-        if not sentence:
-            continue
-            
-        # Reformuler la phrase
-        reformed = reformulate_sentence_basic(sentence)
-        
-        # Ajouter des connecteurs occasionnellement (pas pour la première phrase)
-        if i > 0 and random.random() < 0.3 and not reformed.lower().startswith(('il', 'on', 'ce', 'cette', 'cela')):
-            connector = random.choice(connectors)
-            reformed = f"{connector} {reformed.lower()}"
-        
-        reformulated_sentences.append(reformed)
-    
-    # Rejoindre les phrases
-    result = '. '.join(reformulated_sentences)
-    
-    # Nettoyer et finaliser
-    result = re.sub(r'\s+', ' ', result.strip())
-    if result and not result.endswith('.'):
-        result += '.'
-    
-    return result
+    return reformulation_engine.reformulate_text(text, rng or reformulation_rng())
 
-def reformulate_text(text, use_ai=True):
+def reformulate_text(text, use_ai=True, seed=None):
     """
-    Fonction principale de reformulation avec choix du niveau
+    Fonction principale de reformulation avec choix du niveau.
+    Les textes longs sont reformulés morceau par morceau (voir iter_reformulate), un
+    texte court comme un morceau unique : avec `seed`, la reformulation basique est
+    reproductible et identique à celle du flux.
     """
     if not text or len(text.strip()) < 10:
         return text
-    
+    if len(text) > REFORMULATE_CHUNK_CHARS:
+        return "".join(separator + reformulated for separator, _, reformulated in iter_reformulate(text, use_ai, seed))
+    return reformulate_chunk(text, use_ai, seed, 0)
+
+def iter_reformulate(text, use_ai=True, seed=None, chunk_chars=None):
+    """
+    Reformulation d'un texte de longueur quelconque par morceaux de paragraphes entiers :
+    génère (séparateur, original, reformulé) dès que chaque morceau est prêt.
+    Mémoire et latence dépendent de la taille des morceaux, pas de celle du document.
+    """
+    for index, (separator, chunk) in enumerate(split_chunks(text, chunk_chars or REFORMULATE_CHUNK_CHARS)):
+        yield separator, chunk, reformulate_chunk(chunk, use_ai, seed, index)
+
+def reformulate_chunk(chunk, use_ai=True, seed=None, index=0):
+    """Reformule le morceau numéro `index` paragraphe par paragraphe (la mise en page est conservée)"""
+    rng = reformulation_rng(seed, index)
+    return "\n\n".join(reformulate_passage(paragraph, use_ai, rng) for paragraph in chunk.split("\n\n"))
+
+def reformulate_passage(text, use_ai=True, rng=None):
+    """Reformulation d'un passage court (un morceau au plus)"""
+    if not text or len(text.strip()) < 10:
+        return text
+
     print(f"Reformulation du texte (longueur: {len(text)}, AI: {use_ai})")
     
-    if use_ai and len(text) < 2000:  # Utiliser l'IA pour les textes pas trop longs
+    if use_ai:
         try:
-            ai_result = paraphrase_text_ai(text)
+            ai_result = paraphrase_text_ai(text, rng=rng)
             # Si l'IA retourne quelque chose de valide, on l'utilise
             if ai_result and len(ai_result) > len(text) * 0.5:
                 print("Reformulation IA réussie")
@@ -335,9 +402,10 @@ def reformulate_text(text, use_ai=True):
         except Exception as e:
             print(f"Erreur IA, fallback vers méthode basique: {e}")
     
-    # Fallback ou texte trop long ou IA désactivée
+    # Fallback ou IA désactivée
     print("Utilisation de la reformulation basique")
-    basic_result = reformulate_text_basic(text)
+    rng = rng or reformulation_rng()
+    basic_result = reformulate_text_basic(text, rng)
     
     # Si la reformulation basique n'est pas assez différente, on fait un second passage
     original_words = set(text.lower().split())
@@ -347,16 +415,19 @@ def reformulate_text(text, use_ai=True):
     if similarity > 0.7:  # Si plus de 70% des mots sont identiques
         print("Reformulation insuffisante, second passage...")
         # Second passage avec transformations plus agressives
-        basic_result = reformulate_text_aggressive(basic_result)
+        basic_result = reformulate_text_aggressive(basic_result, rng)
     
     print(f"Reformulation terminée")
     return basic_result
 
 def google_search_serpapi(query, api_key):
+    """Recherche Google via SerpAPI, servie depuis le cache des recherches si possible"""
     if not api_key:
         print("Warning: No API key provided")
         return []
-    
+    return search_cache.get_or_search(query, lambda q: serpapi_request(q, api_key))
+
+def serpapi_request(query, api_key):
     url = "https://serpapi.com/search"
     params = {
         "q": query,
@@ -380,53 +451,369 @@ def google_search_serpapi(query, api_key):
         print(f"Unexpected error in search: {e}")
         return []
 
+def get_search_provider(api_key, name=None):
+    """
+    Fournisseur de recherche de l'analyse : "serpapi" (Google puis téléchargement
+    des pages) ou "bm25" (index local, textes servis sans réseau)
+    """
+    name = name or SEARCH_PROVIDER
+    if name == "serpapi":
+        return WebSearchProvider(
+            lambda query: google_search_serpapi(query, api_key),
+            lambda url: extract_text(url)
+        )
+    if name == "bm25":
+        return BM25SearchProvider(get_bm25_index())
+    raise ValueError(f"Fournisseur de recherche inconnu : {name}")
+
 def extract_text(url):
+    """Texte d'une page web, servi depuis le cache des pages si possible"""
+    return page_cache.get_text(url, download_text)
+
+def download_text(url):
+    """
+    Texte éditorial d'une page : lecture en flux bornée (taille et durée totale),
+    contenus binaires ignorés. Une page abandonnée à l'échéance n'est pas mise en cache.
+    """
     try:
-        html = requests.get(url, timeout=5).text
-        soup = BeautifulSoup(html, 'html.parser')
-        return soup.get_text()
-    except:
+        return extractor.download_text(url, get_session(), FETCH_TIMEOUT, deadline=FETCH_DEADLINE)
+    except Exception as e:
+        print(f"Error downloading {url}: {e}")
         return ""
 
-def check_similarity(text, api_key):
+def encode_local(texts):
+    """Encode avec le modèle chargé dans le processus courant"""
+    with load_sentence_model() as sentence_model:
+        return sentence_model.encode(texts, convert_to_numpy=True)
+
+def _encode_batch(texts):
+    # Avec CPU_WORKERS, l'inférence de chaque lot tourne dans un processus de calcul
+    return cpu_pool.call(workers.embed, texts)
+
+# Les encodages des requêtes concurrentes sont regroupés en un seul appel au modèle
+embedding_batcher = MicroBatcher(_encode_batch)
+
+def _encode_with_model(texts):
+    return embedding_batcher.encode(texts)
+
+def sentence_backend():
+    """
+    Backend d'inférence effectif de MiniLM (torch, int8, onnx), décidé par la calibration
+    au premier chargement, dans ce processus ou dans un processus de calcul
+    """
+    status = inference.inference_status.get("sentence")
+    if status is None:
+        status = cpu_pool.call(workers.sentence_status)
+        if status is None:
+            return inference.INFERENCE_BACKEND
+        inference.inference_status.setdefault("sentence", status)
+    return status["backend"]
+
+def encode_texts(texts):
+    """
+    Encode une liste de textes en un tableau numpy (une ligne par texte).
+    Les embeddings sont mis en cache par contenu, modèle et backend (un embedding
+    int8 ou ONNX n'est pas servi à la place d'un embedding fp32) : seuls les textes
+    inconnus sont envoyés au modèle, en un seul appel groupé.
+    """
+    namespace = f"{SENTENCE_MODEL_NAME}:{sentence_backend()}"
+    return page_cache.get_embeddings(texts, _encode_with_model, namespace=namespace)
+
+def score_pages(text, pages):
+    """
+    Calcule la similarité entre le texte soumis et chaque page [(url, texte)].
+    Le texte est encodé une seule fois, les pages en un seul appel groupé,
+    et les scores sont obtenus par une seule multiplication matricielle.
+    """
+    if not pages:
+        return []
+    try:
+        text_embedding = encode_texts([text])
+        page_embeddings = encode_texts([page_text[:1000] for _, page_text in pages])
+        scores = util.cos_sim(text_embedding, page_embeddings)[0].tolist()
+    except Exception as e:
+        print(f"Error computing similarity: {e}")
+        return []
+    return [(url, score) for (url, _), score in zip(pages, scores)]
+
+def sentence_windows(text, window_size=None, max_windows=None):
+    """
+    Fenêtres glissantes de 1 à `window_size` phrases consécutives : [(début, fin, texte)].
+    Au-delà de `max_windows`, les fenêtres sont échantillonnées uniformément sur toute la page.
+    """
+    window_size = window_size or SENTENCE_WINDOW_SIZE
+    max_windows = max_windows or MAX_WINDOWS_PER_PAGE
+    sentences = split_sentences(text)
+    windows = []
+    for i in range(len(sentences)):
+        for size in range(1, window_size + 1):
+            if i + size > len(sentences):
+                break
+            start, end = sentences[i][0], sentences[i + size - 1][1]
+            windows.append((start, end, text[start:end]))
+    if len(windows) > max_windows:
+        step = len(windows) / max_windows
+        windows = [windows[int(k * step)] for k in range(max_windows)]
+    return windows
+
+def _covered(start, end, spans, ratio=0.5):
+    """Vrai si au moins `ratio` de [start, end) est couvert par les intervalles `spans`"""
+    overlap = sum(max(0, min(end, span_end) - max(start, span_start)) for span_start, span_end in spans)
+    return overlap >= ratio * (end - start)
+
+def match_sentences(text, pages, threshold=0.6, exclude=None):
+    """
+    Compare chaque phrase du texte soumis aux fenêtres de phrases de chaque page.
+    Retourne [(url, score, correspondances)] où le score est la similarité moyenne
+    des phrases soumises avec leur meilleure fenêtre dans la page, et où chaque
+    correspondance donne le meilleur passage source (avec positions) pour une phrase
+    dont cette page est la meilleure source.
+    Les phrases couvertes par les intervalles `exclude` [(début, fin)] (copies exactes
+    déjà détectées) ne sont pas encodées.
+    """
+    sentences = split_sentences(text, min_length=10)
+    if exclude:
+        sentences = [s for s in sentences if not _covered(s[0], s[1], exclude)]
+    if not sentences or not pages:
+        return []
+
+    page_windows = [(url, sentence_windows(page_text)) for url, page_text in pages]
+    page_windows = [(url, windows) for url, windows in page_windows if windows]
+    if not page_windows:
+        return []
+
+    try:
+        sentence_embeddings = encode_texts([s for _, _, s in sentences])
+        # Toutes les fenêtres de toutes les pages en un seul appel groupé
+        all_windows = [w for _, windows in page_windows for w in windows]
+        window_embeddings = encode_texts([w for _, _, w in all_windows])
+    except Exception as e:
+        print(f"Error computing sentence similarity: {e}")
+        return []
+
+    per_page = []
+    offset = 0
+    for url, windows in page_windows:
+        # Une matrice phrases x fenêtres par source
+        matrix = util.cos_sim(sentence_embeddings, window_embeddings[offset:offset + len(windows)])
+        offset += len(windows)
+        best_scores, best_indices = matrix.max(dim=1)
+        per_page.append((url, windows, best_scores.tolist(), best_indices.tolist()))
+
+    # Affecter chaque phrase soumise à la source qui la couvre le mieux
+    matches = {url: [] for url, _, _, _ in per_page}
+    for i, (start, end, sentence) in enumerate(sentences):
+        url, windows, scores, indices = max(per_page, key=lambda page: page[2][i])
+        if scores[i] < threshold:
+            continue
+        source_start, source_end, source_text = windows[indices[i]]
+        matches[url].append({
+            "sentence": sentence,
+            "start": start,
+            "end": end,
+            "source_text": source_text,
+            "source_start": source_start,
+            "source_end": source_end,
+            "score": round(scores[i] * 100, 2)
+        })
+
+    return [
+        (url, sum(scores) / len(scores), matches[url])
+        for url, _, scores, _ in per_page
+    ]
+
+def search_corpus(text):
+    """
+    Passages du corpus de référence local proches du texte (index MinHash/LSH,
+    sans réseau ni quota) : [{"url", "score", "origin", "source_text", "coverage"}]
+    """
+    if corpus_index is None or not len(corpus_index):
+        return []
+    return [
+        {
+            "url": match["source"],
+            "score": round(match["jaccard"] * 100, 2),
+            "origin": "corpus",
+            "coverage": match["coverage"],
+            "source_text": match["passage"],
+        }
+        for match in corpus_index.query(text)
+    ]
+
+def search_history(text):
+    """
+    Paragraphes proches dans les soumissions précédentes (copie entre étudiants),
+    puis ajout de cette soumission à l'historique. Actif si HISTORY_INDEX_DIR est défini.
+    """
+    if history_index is None:
+        return []
+    paragraphs = split_paragraphs(text)
+    if not paragraphs:
+        return []
+    submission_id = content_hash(text)[:16]
+    try:
+        embeddings = encode_texts(paragraphs)
+        found = history_index.query(embeddings, exclude=submission_id)
+        history_index.add(submission_id, paragraphs, embeddings)
+    except Exception as e:
+        print(f"Error querying submission history: {e}")
+        return []
+    return [
+        {
+            "url": f"submission://{match['submission']}",
+            "score": match["score"],
+            "origin": "history",
+            "matches": [
+                {"sentence": paragraphs[m["paragraph"]], "source_text": m["source_text"], "score": m["score"]}
+                for m in match["matches"]
+            ],
+        }
+        for match in found
+    ]
+
+def check_similarity_stream(chunks, api_key, mode="document", progress=None, provider=None):
+    """
+    Analyse d'un document fourni morceau par morceau (pages d'un PDF) :
+    les recherches démarrent dès les premières pages, pendant l'extraction des suivantes.
+    """
+    provider = provider or get_search_provider(api_key)
+    streaming = StreamingSearch(provider.search)
+    try:
+        for chunk in chunks:
+            streaming.feed(chunk)
+        text = streaming.text
+        if not text or len(text.strip()) < 10:
+            return check_similarity(text, api_key, mode=mode, progress=progress, provider=provider)
+        if progress:
+            progress("search", {"queries": len(streaming.queries)})
+        urls = streaming.finish()
+    finally:
+        # Extraction interrompue (document corrompu...) : ne pas laisser le pool ouvert
+        streaming.close()
+    return check_similarity(text, api_key, mode=mode, progress=progress, urls=urls, provider=provider)
+
+def check_similarity(text, api_key, mode="document", progress=None, urls=None, provider=None):
+    """
+    Analyse de plagiat : corpus local, historique des soumissions, recherche,
+    téléchargement, encodage et score des sources.
+    `progress(stage, data)` est appelé à chaque étape (corpus, search, fetch, embed, score)
+    et pour chaque source dès que son résultat est disponible.
+    Si `urls` est fourni, la phase de recherche est sautée. `provider` remplace le
+    fournisseur de recherche configuré (voir get_search_provider).
+    """
+    progress = progress or (lambda stage, data=None: None)
     if not text or len(text.strip()) < 10:
         print("Warning: Text too short for analysis")
         return 0, []
     
-    query = text[:200]
-    print(f"Searching for: {query[:50]}...")
-    urls = google_search_serpapi(query, api_key)
+    # Corpus local d'abord : réponse immédiate, même sans clé SerpAPI
+    start = time.perf_counter()
+    corpus_results = search_corpus(text)
+    progress("corpus", {"matches": len(corpus_results), "ms": round((time.perf_counter() - start) * 1000, 2)})
+    for result in corpus_results:
+        print(f"Corpus match {result['url']}: {result['score']}")
+        progress("score", result)
+
+    # Soumissions précédentes (copie entre étudiants)
+    history_results = search_history(text)
+    for result in history_results:
+        print(f"History match {result['url']}: {result['score']}")
+        progress("score", result)
+    local_results = corpus_results + history_results
+
+    if urls is None:
+        # Recherches parallèles sur les passages les plus distinctifs du texte
+        queries = plan_queries(text)
+        for query in queries:
+            print(f"Searching for: {query[:50]}...")
+        progress("search", {"queries": len(queries)})
+        provider = provider or get_search_provider(api_key)
+        urls = search_queries(queries, provider.search)
     print(f"Found {len(urls)} URLs to analyze")
     
-    results = []
+    results = list(local_results)
+    provider = provider or get_search_provider(api_key)
+    # Recherche locale (index BM25, corpus) sans résultat : aucun plagiat trouvé,
+    # jamais le score simulé du mode de test SerpAPI
+    if not urls and (local_results or getattr(provider, "local", False) or corpus_index is not None):
+        return max((r["score"] for r in results), default=0), results
     if not urls:
         print("No URLs found - returning mock results for testing")
         # Pour les tests, retournons un score simulé basé sur la longueur du texte
         mock_score = min(80, max(10, len(text) % 50))
         return mock_score, [{"url": "http://example.com", "score": mock_score}]
 
-    for url in urls:
-        print(f"Analyzing: {url}")
-        page_text = extract_text(url)
-        if not page_text:
-            continue
-        try:
-            sentence_model = load_sentence_model()
-            emb1 = sentence_model.encode(text, convert_to_tensor=True)
-            emb2 = sentence_model.encode(page_text[:1000], convert_to_tensor=True)
-            score = util.cos_sim(emb1, emb2).item()
-            print(f"Similarity score for {url}: {score}")
-            if score > 0.3:  # Baissé le seuil pour plus de résultats
-                results.append({"url": url, "score": round(score * 100, 2)})
-        except Exception as e:
-            print(f"Error analyzing {url}: {e}")
-            continue
+    # Téléchargement concurrent : les pages trop lentes sont ignorées
+    progress("fetch", {"urls": len(urls)})
+    pages = fetch_pages(
+        urls, provider.fetch,
+        on_page=lambda url, page_text: progress("fetch", {"url": url, "length": len(page_text)})
+    )
+    print(f"Fetched {len(pages)}/{len(urls)} pages before deadline")
+
+    # Empreintes (winnowing) : copies exactes sur les pages entières, en temps linéaire
+    start = time.perf_counter()
+    tokens = Tokens(text)
+    copies = {url: copied_spans(text, page_text, tokens) for url, page_text in pages}
+    all_spans = [span for copy in copies.values() for span in copy["spans"]]
+    copied = [(span["start"], span["end"]) for span in all_spans]
+    progress("fingerprint", {
+        "pages": len(pages), "spans": len(all_spans),
+        "ms": round((time.perf_counter() - start) * 1000, 2)
+    })
+
+    # Le modèle n'est utilisé que sur les passages sans copie exacte, et seulement
+    # pour les pages qui partagent du vocabulaire avec eux (préfiltre TF-IDF)
+    remaining = unmatched_text(text, all_spans) if all_spans else text
+    start = time.perf_counter()
+    candidates, _ = prefilter_pages(remaining, pages)
+    progress("prefilter", {
+        "pages": len(pages), "pruned": len(pages) - len(candidates),
+        "ms": round((time.perf_counter() - start) * 1000, 2)
+    })
+    print(f"Lexical prefilter kept {len(candidates)}/{len(pages)} pages")
+
+    progress("embed", {"pages": len(candidates)})
+    if mode == "sentences":
+        # Comparaison phrase par phrase sur la page entière
+        semantic = {url: (score, matches) for url, score, matches in match_sentences(text, candidates, exclude=copied)}
+        page_texts = dict(pages)
+        for url, _ in pages:
+            score, matches = semantic.get(url, (0.0, []))
+            copy = copies[url]
+            exact = [
+                {
+                    "sentence": span["text"], "start": span["start"], "end": span["end"],
+                    "source_text": page_texts[url][span["source_start"]:span["source_end"]],
+                    "source_start": span["source_start"], "source_end": span["source_end"],
+                    "score": 100.0, "exact": True
+                }
+                for span in copy["spans"]
+            ]
+            matches = sorted(exact + matches, key=lambda m: m["start"])
+            score = max(score * 100, copy["copied_percent"])
+            print(f"Similarity score for {url}: {score} ({len(matches)} matching sentences)")
+            if score > 30 or matches:
+                results.append({"url": url, "score": round(score, 2),
+                                "copied_percent": copy["copied_percent"], "matches": matches})
+                progress("score", results[-1])
+    else:
+        semantic = dict(score_pages(remaining, candidates)) if remaining else {}
+        for url, _ in pages:
+            copy = copies[url]
+            score = max(semantic.get(url, 0.0) * 100, copy["copied_percent"])
+            print(f"Similarity score for {url}: {score} (copied {copy['copied_percent']}%)")
+            if score > 30 or copy["spans"]:  # Baissé le seuil pour plus de résultats
+                results.append({"url": url, "score": round(score, 2), "copied_percent": copy["copied_percent"]})
+                if copy["spans"]:
+                    results[-1]["spans"] = copy["spans"]
+                progress("score", results[-1])
 
     max_score = max([r["score"] for r in results], default=0)
     print(f"Final max score: {max_score}")
     return max_score, results
 
-def reformulate_text_aggressive(text):
+def reformulate_text_aggressive(text, rng=None):
     """
     Reformulation plus agressive avec transformations de structures complètes
     """
@@ -434,74 +821,4 @@ def reformulate_text_aggressive(text):
         return text
     
     print("Application de la reformulation agressive")
-    
-    # Dictionnaire de transformations de phrases complètes
-    phrase_transforms = {
-        r'Il est important de noter que (.+)': r'Il convient de souligner que \1',
-        r'On peut observer que (.+)': r'Il est possible de constater que \1',
-        r'Cette méthode permet de (.+)': r'Cette approche donne la possibilité de \1',
-        r'Il faut (.+)': r'Il s\'avère nécessaire de \1',
-        r'Cela signifie que (.+)': r'Ceci implique que \1',
-        r'En outre, (.+)': r'Par ailleurs, \1',
-        r'De plus, (.+)': r'En complément, \1',
-        r'Cependant, (.+)': r'Néanmoins, \1',
-        r'Par conséquent, (.+)': r'De ce fait, \1',
-        r'En effet, (.+)': r'Effectivement, \1',
-    }
-    
-    # Synonymes plus complets pour une reformulation agressive
-    aggressive_synonyms = {
-        'utilisation': 'emploi', 'usage': 'utilisation', 'emploi': 'recours',
-        'développement': 'élaboration', 'création': 'conception', 'formation': 'constitution',
-        'application': 'mise en œuvre', 'implémentation': 'déploiement', 'réalisation': 'concrétisation',
-        'analyse': 'examen', 'étude': 'investigation', 'recherche': 'exploration',
-        'résultat': 'aboutissement', 'conséquence': 'résultante', 'effet': 'répercussion',
-        'problème': 'difficulté', 'enjeu': 'défi', 'question': 'problématique',
-        'solution': 'résolution', 'réponse': 'parade', 'remède': 'palliatif',
-        'processus': 'procédure', 'mécanisme': 'dispositif', 'système': 'architecture',
-        'approche': 'démarche', 'stratégie': 'tactique', 'méthode': 'procédé',
-        'objectif': 'finalité', 'but': 'visée', 'cible': 'dessein',
-        'avantage': 'bénéfice', 'intérêt': 'profit', 'gain': 'plus-value',
-        'inconvénient': 'désavantage', 'défaut': 'handicap', 'limite': 'contrainte'
-    }
-    
-    result = text
-    
-    # Appliquer les transformations de phrases
-    for pattern, replacement in phrase_transforms.items():
-        if random.random() < 0.8:  # 80% de chance d'appliquer
-            result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
-    
-    # Appliquer les synonymes agressifs
-    for original, synonym in aggressive_synonyms.items():
-        if random.random() < 0.9:  # 90% de chance de remplacer
-            pattern = r'\b' + re.escape(original) + r'\b'
-            if re.search(pattern, result, flags=re.IGNORECASE):
-                result = re.sub(pattern, synonym, result, flags=re.IGNORECASE, count=1)
-    
-    # Transformations structurelles plus poussées
-    structural_changes = [
-        # Passif vers actif et vice versa
-        (r'est utilisé par (.+)', r'\1 utilise'),
-        (r'est développé par (.+)', r'\1 développe'),
-        (r'est créé par (.+)', r'\1 crée'),
-        # Inversions de structures
-        (r'Grâce à (.+), (.+)', r'\2 du fait de \1'),
-        (r'Malgré (.+), (.+)', r'\2 en dépit de \1'),
-        (r'Avant de (.+), (.+)', r'\2 préalablement à \1'),
-        # Changements de connecteurs
-        (r'Ainsi, (.+)', r'De cette manière, \1'),
-        (r'Donc, (.+)', r'Par voie de conséquence, \1'),
-        (r'Puis, (.+)', r'Ensuite, \1'),
-    ]
-    
-    for pattern, replacement in structural_changes:
-        if random.random() < 0.6:  # 60% de chance d'appliquer
-            result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
-    
-    # Nettoyer et finaliser
-    result = re.sub(r'\s+', ' ', result.strip())
-    if result and not result.endswith('.'):
-        result += '.'
-    
-    return result
+    return reformulation_engine.reformulate_aggressive(text, rng or reformulation_rng())
@@ -0,0 +1,38 @@
+"""
+Préfiltre lexical : écarte, avant le modèle, les pages sans vocabulaire commun
+avec le texte soumis (pages d'index, résultats hors sujet)
+"""
+import os
+
+# Similarité TF-IDF minimale pour qu'une page soit comparée par le modèle (0 = préfiltre désactivé)
+LEXICAL_MIN_SIMILARITY = float(os.getenv("LEXICAL_MIN_SIMILARITY", "0.05"))
+
+
+def lexical_scores(text, page_texts):
+    """
+    Similarité cosinus TF-IDF (mots, tf sous-linéaire) entre le texte et chaque page.
+    Une seule vectorisation pour le texte et toutes les pages, un seul produit creux.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    if not page_texts:
+        return []
+    vectorizer = TfidfVectorizer(sublinear_tf=True, strip_accents="unicode")
+    try:
+        matrix = vectorizer.fit_transform([text] + list(page_texts))
+    except ValueError:
+        # Aucun terme exploitable (ponctuation, nombres seuls...)
+        return [0.0] * len(page_texts)
+    return (matrix[1:] @ matrix[0].T).toarray().ravel().tolist()
+
+
+def prefilter_pages(text, pages, threshold=None):
+    """
+    Pages [(url, texte)] assez proches lexicalement du texte pour passer au modèle.
+    Retourne (pages retenues, {url: score lexical}).
+    """
+    threshold = LEXICAL_MIN_SIMILARITY if threshold is None else threshold
+    if threshold <= 0 or not pages or not text:
+        return list(pages), {}
+    scores = dict(zip((url for url, _ in pages), lexical_scores(text, [page_text for _, page_text in pages])))
+    return [(url, page_text) for url, page_text in pages if scores[url] >= threshold], scores
@@ -0,0 +1,162 @@
+"""
+Planification des requêtes de recherche : sélection des passages les plus distinctifs
+"""
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from text_utils import split_sentences
+
+# Budget de recherche : une requête par tranche de texte, bornée au total
+QUERY_CHARS_PER_SEARCH = int(os.getenv("QUERY_CHARS_PER_SEARCH", "1500"))
+MAX_SEARCH_QUERIES = int(os.getenv("MAX_SEARCH_QUERIES", "5"))
+MAX_SOURCE_URLS = int(os.getenv("MAX_SOURCE_URLS", "10"))
+QUERY_MAX_LENGTH = 200
+
+
+def query_budget(text):
+    """Nombre de requêtes pour un texte : croît avec sa longueur, borné par MAX_SEARCH_QUERIES"""
+    return max(1, min(MAX_SEARCH_QUERIES, math.ceil(len(text) / QUERY_CHARS_PER_SEARCH)))
+
+
+def _truncate(sentence, max_length=QUERY_MAX_LENGTH):
+    """Tronque une requête sur une frontière de mot"""
+    if len(sentence) <= max_length:
+        return sentence
+    return sentence[:max_length].rsplit(" ", 1)[0]
+
+
+def distinctiveness(sentences):
+    """
+    Score de rareté TF-IDF de chaque phrase : IDF moyen de ses termes,
+    pénalisé pour les phrases trop courtes pour faire une bonne requête
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer(sublinear_tf=True)
+    try:
+        matrix = vectorizer.fit_transform(sentences)
+    except ValueError:
+        # Aucun terme exploitable (ponctuation, nombres seuls...)
+        return [0.0] * len(sentences)
+    idf = vectorizer.idf_
+    scores = []
+    for row in range(matrix.shape[0]):
+        terms = matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]
+        if len(terms) == 0:
+            scores.append(0.0)
+            continue
+        scores.append(float(idf[terms].mean()) * min(1.0, len(terms) / 8))
+    return scores
+
+
+def most_distinctive_sentence(text):
+    """Phrase la plus distinctive d'un passage, tronquée pour servir de requête"""
+    sentences = split_sentences(text, min_length=40)
+    if not sentences:
+        return text[:QUERY_MAX_LENGTH]
+    scores = distinctiveness([s for _, _, s in sentences])
+    best = max(range(len(sentences)), key=lambda i: scores[i])
+    return _truncate(sentences[best][2])
+
+
+def plan_queries(text, budget=None):
+    """
+    Choisit les `budget` phrases les plus distinctives du texte comme requêtes.
+    Le texte est découpé en `budget` segments consécutifs et la meilleure phrase
+    de chaque segment est retenue, pour couvrir tout le document.
+    """
+    budget = budget or query_budget(text)
+    sentences = split_sentences(text, min_length=40)
+    if budget <= 1 or len(sentences) <= 1:
+        return [text[:QUERY_MAX_LENGTH]]
+
+    scores = distinctiveness([s for _, _, s in sentences])
+    segment = len(sentences) / min(budget, len(sentences))
+    queries = []
+    for k in range(min(budget, len(sentences))):
+        candidates = range(int(k * segment), max(int((k + 1) * segment), int(k * segment) + 1))
+        best = max(candidates, key=lambda i: scores[i])
+        queries.append(_truncate(sentences[best][2]))
+    return list(dict.fromkeys(queries))
+
+
+def search_queries(queries, search, max_urls=None):
+    """
+    Lance les recherches en parallèle et fusionne les URLs sans doublon,
+    en alternant entre les listes de résultats pour respecter leur rang
+    """
+    if not queries:
+        return []
+    with ThreadPoolExecutor(max_workers=len(queries), thread_name_prefix="search") as executor:
+        result_lists = list(executor.map(search, queries))
+    return merge_results(result_lists, max_urls)
+
+
+def merge_results(result_lists, max_urls=None):
+    """Fusionne des listes de résultats par rang, sans doublon"""
+    max_urls = max_urls or MAX_SOURCE_URLS
+    urls = []
+    for rank in range(max((len(r) for r in result_lists), default=0)):
+        for results in result_lists:
+            if rank < len(results) and results[rank] not in urls:
+                urls.append(results[rank])
+    return urls[:max_urls]
+
+
+class StreamingSearch:
+    """
+    Recherches lancées au fil de l'extraction d'un document : dès qu'un segment
+    de texte est disponible, sa phrase la plus distinctive est recherchée pendant
+    que les pages suivantes sont extraites. La moitié du budget est réservée à la
+    fin du document, planifiée une fois le texte complet connu.
+    """
+
+    def __init__(self, search, segment_chars=None, max_queries=None):
+        self.search = search
+        self.segment_chars = segment_chars or QUERY_CHARS_PER_SEARCH
+        self.max_queries = max_queries or MAX_SEARCH_QUERIES
+        self.early_budget = max(1, self.max_queries // 2)
+        self.queries = []
+        self._parts = []
+        self._length = 0
+        self._segment_start = 0
+        self._futures = []
+        self._executor = ThreadPoolExecutor(max_workers=self.max_queries, thread_name_prefix="search")
+
+    @property
+    def text(self):
+        return "".join(self._parts)
+
+    def feed(self, chunk):
+        """Ajoute un morceau de texte extrait et lance une recherche si un segment est complet"""
+        self._parts.append(chunk)
+        self._length += len(chunk)
+        if (self._length - self._segment_start >= self.segment_chars
+                and len(self._futures) < self.early_budget):
+            segment = self.text[self._segment_start:]
+            self._segment_start = self._length
+            self._launch([most_distinctive_sentence(segment)])
+
+    def _launch(self, queries):
+        for query in queries:
+            if query not in self.queries:
+                self.queries.append(query)
+                self._futures.append(self._executor.submit(self.search, query))
+
+    def finish(self):
+        """Planifie le reste du document, attend les recherches et fusionne les URLs"""
+        text = self.text
+        rest = text[self._segment_start:]
+        budget = min(self.max_queries, math.ceil(len(text) / self.segment_chars))
+        remaining = budget - len(self._futures)
+        if rest.strip() and (remaining > 0 or not self._futures):
+            self._launch(plan_queries(rest, budget=max(1, remaining)))
+        try:
+            return merge_results([future.result() for future in self._futures])
+        finally:
+            self.close()
+
+    def close(self):
+        """Libère le pool de recherche ; les recherches pas encore démarrées sont annulées"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,221 @@
+"""
+Moteur de reformulation basique : tables de synonymes et de transformations
+compilées une seule fois en une expression régulière par mode
+"""
+import random
+import re
+
+# Dictionnaire de synonymes enrichi
+SYNONYMS = {
+    'très': ['extrêmement', 'particulièrement', 'vraiment', 'fort', 'remarquablement'],
+    'important': ['essentiel', 'crucial', 'primordial', 'capital', 'fondamental'],
+    'permettre': ['autoriser', 'donner la possibilité', 'rendre possible', 'faciliter'],
+    'utiliser': ['employer', 'se servir de', 'exploiter', 'mettre en œuvre', 'recourir à'],
+    'développer': ['élaborer', 'concevoir', 'créer', 'mettre au point', 'établir'],
+    'analyser': ['examiner', 'étudier', 'évaluer', 'décortiquer', 'scruter'],
+    'montrer': ['démontrer', 'révéler', 'illustrer', 'mettre en évidence', 'exhiber'],
+    'différent': ['distinct', 'varié', 'divers', 'autre', 'dissemblable'],
+    'nouveau': ['récent', 'innovant', 'inédit', 'moderne', 'contemporain'],
+    'donner': ['fournir', 'procurer', 'offrir', 'apporter', 'octroyer'],
+    'créer': ['concevoir', 'élaborer', 'générer', 'produire', 'établir'],
+    'améliorer': ['perfectionner', 'optimiser', 'bonifier', 'enrichir', 'raffiner'],
+    'faire': ['effectuer', 'réaliser', 'accomplir', 'exécuter', 'mener'],
+    'voir': ['observer', 'constater', 'remarquer', 'percevoir', 'discerner'],
+    'dire': ['affirmer', 'déclarer', 'énoncer', 'mentionner', 'stipuler'],
+    'avoir': ['posséder', 'détenir', 'disposer de', 'bénéficier de'],
+    'être': ['constituer', 'représenter', 'former', 's\'avérer'],
+    'grand': ['important', 'considérable', 'majeur', 'significatif', 'substantiel'],
+    'bon': ['excellent', 'satisfaisant', 'adéquat', 'approprié', 'convenable'],
+    'simple': ['facile', 'aisé', 'élémentaire', 'basique', 'accessible']
+}
+
+# Transformations de structure : (expression, remplacement, en début de phrase uniquement)
+STRUCTURE_TRANSFORMS = [
+    ('Il faut ', 'Il convient de ', True),
+    ('On peut ', 'Il est possible de ', True),
+    ('Cela permet ', 'Cette approche offre la possibilité ', True),
+    ('Cette méthode ', 'Ce procédé ', True),
+    ('Ce système ', 'Cette architecture ', True),
+    ('est utilisé', 'trouve son application', False),
+    ('est basé sur', 'repose sur', False),
+    ('est défini comme', 'se caractérise par', False),
+    ('peut être', 'est susceptible d\'être', False),
+    ('doit être', 'se doit d\'être', False),
+]
+
+# Connecteurs pour varier les transitions
+CONNECTORS = [
+    'Par ailleurs,', 'En outre,', 'De plus,', 'Également,', 'Ainsi,',
+    'En effet,', 'Néanmoins,', 'Cependant,', 'Toutefois,', 'D\'autre part,'
+]
+
+# Transformations de phrases complètes (mode agressif)
+PHRASE_TRANSFORMS = {
+    'Il est important de noter que ': 'Il convient de souligner que ',
+    'On peut observer que ': 'Il est possible de constater que ',
+    'Cette méthode permet de ': 'Cette approche donne la possibilité de ',
+    'Il faut ': 'Il s\'avère nécessaire de ',
+    'Cela signifie que ': 'Ceci implique que ',
+    'En outre, ': 'Par ailleurs, ',
+    'De plus, ': 'En complément, ',
+    'Cependant, ': 'Néanmoins, ',
+    'Par conséquent, ': 'De ce fait, ',
+    'En effet, ': 'Effectivement, ',
+}
+
+# Synonymes plus complets pour une reformulation agressive
+AGGRESSIVE_SYNONYMS = {
+    'utilisation': 'emploi', 'usage': 'utilisation', 'emploi': 'recours',
+    'développement': 'élaboration', 'création': 'conception', 'formation': 'constitution',
+    'application': 'mise en œuvre', 'implémentation': 'déploiement', 'réalisation': 'concrétisation',
+    'analyse': 'examen', 'étude': 'investigation', 'recherche': 'exploration',
+    'résultat': 'aboutissement', 'conséquence': 'résultante', 'effet': 'répercussion',
+    'problème': 'difficulté', 'enjeu': 'défi', 'question': 'problématique',
+    'solution': 'résolution', 'réponse': 'parade', 'remède': 'palliatif',
+    'processus': 'procédure', 'mécanisme': 'dispositif', 'système': 'architecture',
+    'approche': 'démarche', 'stratégie': 'tactique', 'méthode': 'procédé',
+    'objectif': 'finalité', 'but': 'visée', 'cible': 'dessein',
+    'avantage': 'bénéfice', 'intérêt': 'profit', 'gain': 'plus-value',
+    'inconvénient': 'désavantage', 'défaut': 'handicap', 'limite': 'contrainte'
+}
+
+# Changements de connecteurs (mode agressif)
+CONNECTOR_CHANGES = {
+    'Ainsi, ': 'De cette manière, ',
+    'Donc, ': 'Par voie de conséquence, ',
+    'Puis, ': 'Ensuite, ',
+}
+
+# Restructurations réelles (passif/actif, inversions) qui ne se réduisent pas à un remplacement
+STRUCTURAL_CHANGES = [
+    (r'est utilisé par (.+)', r'\1 utilise'),
+    (r'est développé par (.+)', r'\1 développe'),
+    (r'est créé par (.+)', r'\1 crée'),
+    (r'Grâce à (.+), (.+)', r'\2 du fait de \1'),
+    (r'Malgré (.+), (.+)', r'\2 en dépit de \1'),
+    (r'Avant de (.+), (.+)', r'\2 préalablement à \1'),
+]
+
+
+class _Rule:
+    """Une entrée de table : remplacement(s), probabilité et nombre max d'applications"""
+
+    __slots__ = ("replacements", "probability", "first_only")
+
+    def __init__(self, replacements, probability, first_only):
+        self.replacements = replacements
+        self.probability = probability
+        self.first_only = first_only
+
+
+class _Table:
+    """
+    Table de règles compilée en une seule alternance : chaque règle a son groupe
+    de capture, ce qui identifie la règle déclenchée en O(1) à chaque correspondance
+    """
+
+    def __init__(self, entries):
+        # Les motifs les plus longs d'abord pour que les expressions priment sur les mots
+        entries = sorted(entries, key=lambda e: -len(e[0]))
+        self.rules = [rule for _, rule in entries]
+        self.regex = re.compile('|'.join(f'({pattern})' for pattern, _ in entries), re.IGNORECASE)
+
+    def apply(self, text, rng):
+        active = {}
+        used = set()
+
+        def replace(match):
+            index = match.lastindex - 1
+            rule = self.rules[index]
+            if index not in active:
+                # Tirage une seule fois par règle et par passage
+                active[index] = rng.random() < rule.probability
+            if not active[index] or (rule.first_only and index in used):
+                return match.group(0)
+            used.add(index)
+            replacements = rule.replacements
+            return replacements if isinstance(replacements, str) else rng.choice(replacements)
+
+        return self.regex.sub(replace, text)
+
+
+def _literal(phrase, anchored=False, word=True):
+    pattern = re.escape(phrase.rstrip())
+    if phrase.endswith(' '):
+        # Le remplacement n'a lieu que si la phrase continue après l'expression
+        pattern += r' (?=\S)'
+    elif word:
+        pattern += r'\b'
+    return ('^' if anchored else r'\b') + pattern
+
+
+class ReformulationEngine:
+    """
+    Reformulation basique et agressive par tables précompilées :
+    un seul passage d'expression régulière par phrase et par mode
+    """
+
+    def __init__(self):
+        basic = [(_literal(word), _Rule(choices, 0.7, True)) for word, choices in SYNONYMS.items()]
+        basic += [
+            (_literal(pattern, anchored), _Rule(replacement.rstrip() + (' ' if pattern.endswith(' ') else ''), 0.5, False))
+            for pattern, replacement, anchored in STRUCTURE_TRANSFORMS
+        ]
+        self.basic = _Table(basic)
+
+        aggressive = [(_literal(p), _Rule(r, 0.8, False)) for p, r in PHRASE_TRANSFORMS.items()]
+        aggressive += [(_literal(w), _Rule(s, 0.9, True)) for w, s in AGGRESSIVE_SYNONYMS.items()]
+        aggressive += [(_literal(p), _Rule(r, 0.6, False)) for p, r in CONNECTOR_CHANGES.items()]
+        self.aggressive = _Table(aggressive)
+        self.structural = [(re.compile(p, re.IGNORECASE), r) for p, r in STRUCTURAL_CHANGES]
+
+    def reformulate_sentence(self, sentence, rng=None):
+        """Reformule une phrase individuelle avec des synonymes et transformations"""
+        if not sentence or len(sentence.strip()) < 10:
+            return sentence
+        return self.basic.apply(sentence, rng or random.Random()).strip()
+
+    def reformulate_text(self, text, rng=None):
+        """Reformule un texte phrase par phrase en variant les connecteurs"""
+        if not text or len(text.strip()) < 10:
+            return text
+
+        rng = rng or random.Random()
+        sentences = re.split(r'[.!?]+', text)
+        sentences = [s.strip() for s in sentences if s.strip() and len(s.strip()) > 5]
+
+        reformulated_sentences = []
+        for i, sentence in enumerate(sentences):
+            reformed = self.reformulate_sentence(sentence, rng)
+
+            # Ajouter des connecteurs occasionnellement (pas pour la première phrase)
+            if i > 0 and rng.random() < 0.3 and not reformed.lower().startswith(('il', 'on', 'ce', 'cette', 'cela')):
+                connector = rng.choice(CONNECTORS)
+                reformed = f"{connector} {reformed.lower()}"
+
+            reformulated_sentences.append(reformed)
+
+        return _finalize('. '.join(reformulated_sentences))
+
+    def reformulate_aggressive(self, text, rng=None):
+        """Reformulation plus agressive avec transformations de structures complètes"""
+        if not text or len(text.strip()) < 10:
+            return text
+
+        rng = rng or random.Random()
+        result = self.aggressive.apply(text, rng)
+        for regex, replacement in self.structural:
+            if rng.random() < 0.6:  # 60% de chance d'appliquer
+                result = regex.sub(replacement, result)
+        return _finalize(result)
+
+
+def _finalize(text):
+    """Nettoie les espaces et termine le texte par un point"""
+    result = re.sub(r'\s+', ' ', text.strip())
+    if result and not result.endswith('.'):
+        result += '.'
+    return result
+
+
+reformulation_engine = ReformulationEngine()
@@ -0,0 +1,291 @@
+"""
+Fournisseurs de recherche : recherche web (SerpAPI) ou index BM25 local.
+
+L'index BM25 est construit par segments immuables (ajouts incrémentaux) dont
+les listes de postings et les textes sont lus en mémoire mappée (numpy memmap).
+
+Construction en ligne de commande :
+    python search_index.py index --index ./bm25_index documents/
+    python search_index.py query --index ./bm25_index "la photosynthèse des plantes"
+"""
+import argparse
+import json
+import math
+import os
+import threading
+import uuid
+from collections import Counter
+
+import numpy as np
+
+from corpus import tokenize, iter_files, read_file
+
+# Fournisseur utilisé par l'analyse : "serpapi" (web) ou "bm25" (index local)
+SEARCH_PROVIDER = os.getenv("SEARCH_PROVIDER", "serpapi")
+BM25_INDEX_DIR = os.getenv("BM25_INDEX_DIR", "")
+# Documents retournés par requête (comme les 5 résultats demandés à SerpAPI)
+BM25_TOP_K = int(os.getenv("BM25_TOP_K", "5"))
+# Au-delà de ce nombre de segments, l'index est compacté en un seul
+BM25_MAX_SEGMENTS = int(os.getenv("BM25_MAX_SEGMENTS", "8"))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+LOCAL_SCHEME = "bm25://"
+MANIFEST_FILE = "manifest.json"
+
+
+class Segment:
+    """Segment immuable de l'index : vocabulaire, postings et textes en mémoire mappée"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "segment.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.doc_ids = meta["doc_ids"]
+        # Terme -> (début, longueur) dans les tableaux de postings
+        self.terms = meta["terms"]
+        self.postings_docs = np.load(os.path.join(directory, "postings_docs.npy"), mmap_mode="r")
+        self.postings_tf = np.load(os.path.join(directory, "postings_tf.npy"), mmap_mode="r")
+        self.doc_lengths = np.load(os.path.join(directory, "doc_lengths.npy"), mmap_mode="r")
+        self.text_offsets = np.load(os.path.join(directory, "text_offsets.npy"), mmap_mode="r")
+        self.texts = np.memmap(os.path.join(directory, "texts.bin"), dtype=np.uint8, mode="r") \
+            if self.text_offsets[-1] else np.empty(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def document_frequency(self, term):
+        entry = self.terms.get(term)
+        return entry[1] if entry else 0
+
+    def postings(self, term):
+        start, length = self.terms[term]
+        return self.postings_docs[start:start + length], self.postings_tf[start:start + length]
+
+    def text(self, local_id):
+        start, end = self.text_offsets[local_id], self.text_offsets[local_id + 1]
+        return bytes(self.texts[start:end]).decode("utf-8")
+
+    @staticmethod
+    def build(directory, documents):
+        """Écrit un segment pour une liste de (doc_id, texte)"""
+        os.makedirs(directory, exist_ok=True)
+        postings = {}
+        lengths = []
+        encoded = []
+        for local_id, (_, text) in enumerate(documents):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((local_id, tf))
+            encoded.append(text.encode("utf-8"))
+
+        terms = {}
+        docs, tfs = [], []
+        for term in sorted(postings):
+            entries = postings[term]
+            terms[term] = (len(docs), len(entries))
+            docs.extend(local_id for local_id, _ in entries)
+            tfs.extend(tf for _, tf in entries)
+
+        np.save(os.path.join(directory, "postings_docs.npy"), np.asarray(docs, dtype=np.int32))
+        np.save(os.path.join(directory, "postings_tf.npy"), np.asarray(tfs, dtype=np.float32))
+        np.save(os.path.join(directory, "doc_lengths.npy"), np.asarray(lengths, dtype=np.float32))
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        np.save(os.path.join(directory, "text_offsets.npy"), offsets)
+        with open(os.path.join(directory, "texts.bin"), "wb") as f:
+            for data in encoded:
+                f.write(data)
+        with open(os.path.join(directory, "segment.json"), "w", encoding="utf-8") as f:
+            json.dump({"doc_ids": [doc_id for doc_id, _ in documents], "terms": terms}, f, ensure_ascii=False)
+
+
+class BM25Index:
+    """
+    Index inversé BM25 persistant. Chaque appel à `add` écrit un nouveau segment ;
+    les statistiques (nombre de documents, longueur moyenne, fréquences) sont
+    agrégées sur tous les segments au moment de la requête.
+    """
+
+    def __init__(self, directory, max_segments=None):
+        self.directory = directory
+        self.max_segments = max_segments or BM25_MAX_SEGMENTS
+        self.segments = []
+        self._locations = {}
+        self._lock = threading.Lock()
+        manifest = os.path.join(directory, MANIFEST_FILE)
+        if os.path.exists(manifest):
+            with open(manifest, encoding="utf-8") as f:
+                for name in json.load(f)["segments"]:
+                    self._attach(Segment(os.path.join(directory, name)))
+
+    def __len__(self):
+        return len(self._locations)
+
+    def _attach(self, segment):
+        index = len(self.segments)
+        self.segments.append(segment)
+        for local_id, doc_id in enumerate(segment.doc_ids):
+            self._locations[doc_id] = (index, local_id)
+
+    def _write_manifest(self):
+        names = [os.path.basename(segment.directory) for segment in self.segments]
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"segments": names}, f)
+        os.replace(path + ".tmp", path)
+
+    def add(self, documents):
+        """
+        Ajoute des documents [(doc_id, texte)] dans un nouveau segment.
+        Les identifiants déjà indexés sont ignorés. Retourne le nombre de documents ajoutés.
+        """
+        with self._lock:
+            documents = [(doc_id, text) for doc_id, text in dict(documents).items()
+                         if doc_id not in self._locations and text]
+            if not documents:
+                return 0
+            directory = os.path.join(self.directory, f"segment-{uuid.uuid4().hex[:12]}")
+            Segment.build(directory, documents)
+            self._attach(Segment(directory))
+            if len(self.segments) > self.max_segments:
+                self._compact()
+            self._write_manifest()
+            return len(documents)
+
+    def _compact(self):
+        """Fusionne tous les segments en un seul (appelé avec le verrou détenu)"""
+        documents = [(doc_id, segment.text(local_id))
+                     for segment in self.segments for local_id, doc_id in enumerate(segment.doc_ids)]
+        old = self.segments
+        directory = os.path.join(self.directory, f"segment-{uuid.uuid4().hex[:12]}")
+        Segment.build(directory, documents)
+        self.segments = []
+        self._locations = {}
+        self._attach(Segment(directory))
+        self._write_manifest()
+        for segment in old:
+            for name in os.listdir(segment.directory):
+                os.remove(os.path.join(segment.directory, name))
+            os.rmdir(segment.directory)
+
+    def search(self, query, top_k=None):
+        """Documents les plus pertinents pour la requête : [(doc_id, score)] par score décroissant"""
+        top_k = top_k or BM25_TOP_K
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            segments = list(self.segments)
+        total_docs = sum(len(segment) for segment in segments)
+        if not terms or not total_docs:
+            return []
+        average_length = max(1.0, sum(float(segment.doc_lengths.sum()) for segment in segments) / total_docs)
+
+        results = []
+        for term in terms:
+            df = sum(segment.document_frequency(term) for segment in segments)
+            if df:
+                results.append((term, math.log(1 + (total_docs - df + 0.5) / (df + 0.5))))
+
+        candidates = []
+        for segment in segments:
+            scores = np.zeros(len(segment), dtype=np.float32)
+            norms = BM25_K1 * (1 - BM25_B + BM25_B * np.asarray(segment.doc_lengths) / average_length)
+            for term, idf in results:
+                if not segment.document_frequency(term):
+                    continue
+                docs, tf = segment.postings(term)
+                scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norms[docs])
+            best = np.argsort(-scores)[:top_k] if len(scores) <= top_k else \
+                np.argpartition(-scores, top_k)[:top_k]
+            candidates.extend((float(scores[i]), segment.doc_ids[i]) for i in best if scores[i] > 0)
+
+        candidates.sort(reverse=True)
+        return [(doc_id, score) for score, doc_id in candidates[:top_k]]
+
+    def get_text(self, doc_id):
+        """Texte d'un document indexé ("" s'il est inconnu)"""
+        location = self._locations.get(doc_id)
+        if location is None:
+            return ""
+        segment, local_id = location
+        return self.segments[segment].text(local_id)
+
+    def stats(self):
+        with self._lock:
+            return {"documents": len(self._locations), "segments": len(self.segments)}
+
+
+class WebSearchProvider:
+    """Recherche web : `search(requête)` retourne des URLs, `fetch(url)` le texte de la page"""
+
+    local = False
+
+    def __init__(self, search, fetch):
+        self.search = search
+        self.fetch = fetch
+
+
+class BM25SearchProvider:
+    """
+    Recherche dans l'index BM25 local : les documents sont désignés par des URLs
+    bm25://<doc_id> dont le texte est servi directement par l'index, sans réseau
+    """
+
+    local = True
+
+    def __init__(self, index, top_k=None):
+        self.index = index
+        self.top_k = top_k or BM25_TOP_K
+
+    def search(self, query):
+        return [LOCAL_SCHEME + doc_id for doc_id, _ in self.index.search(query, self.top_k)]
+
+    def fetch(self, url):
+        if not url.startswith(LOCAL_SCHEME):
+            return ""
+        return self.index.get_text(url[len(LOCAL_SCHEME):])
+
+
+_bm25_index = None
+_bm25_lock = threading.Lock()
+
+
+def get_bm25_index():
+    """Index BM25 configuré par BM25_INDEX_DIR, ouvert au premier usage"""
+    global _bm25_index
+    if not BM25_INDEX_DIR:
+        raise ValueError("BM25_INDEX_DIR doit être défini pour le fournisseur bm25")
+    with _bm25_lock:
+        if _bm25_index is None:
+            _bm25_index = BM25Index(BM25_INDEX_DIR)
+        return _bm25_index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index de recherche BM25 local")
+    parser.add_argument("command", choices=["index", "query"])
+    parser.add_argument("arguments", nargs="+", help="Fichiers/répertoires à indexer, ou requête")
+    parser.add_argument("--index", default=BM25_INDEX_DIR or "bm25_index", help="Répertoire de l'index")
+    args = parser.parse_args(argv)
+
+    index = BM25Index(args.index)
+    if args.command == "index":
+        documents = []
+        for path in iter_files(args.arguments):
+            try:
+                documents.append((os.path.relpath(path), read_file(path)))
+            except Exception as e:
+                print(f"Erreur de lecture {path}: {e}")
+        os.makedirs(args.index, exist_ok=True)
+        print(f"{index.add(documents)} documents ajoutés : {index.stats()}")
+        return 0
+
+    for doc_id, score in index.search(" ".join(args.arguments)):
+        print(f"{score:.3f}  {doc_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
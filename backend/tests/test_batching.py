@@ -0,0 +1,106 @@
+"""
+Tests pour le regroupement des encodages entre requêtes
+"""
+import threading
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batching import MicroBatcher, BatchError
+
+
+def fake_encode(calls):
+    """Encodeur factice : une ligne [longueur du texte] par texte, appels enregistrés"""
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t)] for t in texts], dtype=np.float32)
+    return encode
+
+
+class TestMicroBatcher:
+    """Tests pour le micro-batching dynamique"""
+
+    def test_single_request(self):
+        """Une requête seule reçoit ses embeddings dans l'ordre"""
+        calls = []
+        batcher = MicroBatcher(fake_encode(calls), max_batch_size=8, max_wait=0.001)
+        result = batcher.encode(["a", "bb", "ccc"])
+        assert result.tolist() == [[1], [2], [3]]
+        assert calls == [["a", "bb", "ccc"]]
+
+    def test_concurrent_requests_share_a_batch(self):
+        """Les requêtes concurrentes sont encodées en un seul appel et chacune reçoit ses lignes"""
+        calls = []
+        batcher = MicroBatcher(fake_encode(calls), max_batch_size=100, max_wait=0.2)
+        results = {}
+        start = threading.Barrier(4)
+
+        def worker(k):
+            start.wait()
+            results[k] = batcher.encode(["x" * k] * k)
+
+        threads = [threading.Thread(target=worker, args=(k,)) for k in range(1, 5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        assert len(calls) == 1
+        assert sorted(len(t) for t in calls[0]) == sorted(k for k in range(1, 5) for _ in range(k))
+        for k in range(1, 5):
+            assert results[k].tolist() == [[k]] * k
+        assert batcher.stats()["batches"] == 1
+        assert batcher.stats()["requests"] == 4
+
+    def test_full_batch_is_sent_without_waiting(self):
+        """Un lot plein part sans attendre la fin de la fenêtre"""
+        calls = []
+        batcher = MicroBatcher(fake_encode(calls), max_batch_size=2, max_wait=30)
+        result = batcher.submit(["a", "b"]).result(timeout=5)
+        assert result.shape == (2, 1)
+
+    def test_requests_are_not_split(self):
+        """Une requête plus grande que le lot forme son propre lot"""
+        calls = []
+        batcher = MicroBatcher(fake_encode(calls), max_batch_size=2, max_wait=0)
+        result = batcher.encode(["a", "b", "c", "d"])
+        assert result.shape == (4, 1)
+        assert calls == [["a", "b", "c", "d"]]
+
+    def test_errors_reach_every_caller(self):
+        """Une erreur du modèle est transmise aux appelants du lot"""
+        def failing(texts):
+            raise RuntimeError("model down")
+
+        batcher = MicroBatcher(failing, max_batch_size=8, max_wait=0)
+        with pytest.raises(RuntimeError, match="model down"):
+            batcher.encode(["a"])
+        # Le worker continue de servir les lots suivants
+        with pytest.raises(RuntimeError):
+            batcher.encode(["b"])
+
+    def test_empty_request(self):
+        """Une requête vide ne déclenche pas d'appel au modèle"""
+        calls = []
+        batcher = MicroBatcher(fake_encode(calls), max_batch_size=8, max_wait=0)
+        assert len(batcher.encode([])) == 0
+        assert calls == []
+
+    def test_malformed_output_fails_callers_and_keeps_worker(self):
+        """Une sortie du modèle mal formée échoue proprement sans bloquer les lots suivants"""
+        outputs = iter(["x", np.zeros((1, 3))])
+        batcher = MicroBatcher(lambda texts: next(outputs), max_batch_size=8, max_wait=0, timeout=5)
+        with pytest.raises(BatchError):
+            batcher.encode(["a"])
+        assert batcher.encode(["b"]).shape == (1, 3)
+
+    def test_row_count_mismatch(self):
+        """Un nombre de lignes différent du nombre de textes est une erreur"""
+        batcher = MicroBatcher(lambda texts: np.zeros((1, 3)), max_batch_size=8, max_wait=0, timeout=5)
+        with pytest.raises(BatchError):
+            batcher.encode(["a", "b"])
@@ -0,0 +1,144 @@
+"""
+Tests pour les caches de pages et d'embeddings
+"""
+import time
+import sys
+import os
+
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import LRUCache, PageCache, DiskStore, SearchCache, normalize_query, content_hash
+
+
+class TestLRUCache:
+    """Tests pour le cache LRU borné en octets"""
+
+    def test_hit_and_miss_counters(self):
+        """Les accès sont comptabilisés"""
+        cache = LRUCache(max_bytes=1024 * 1024, ttl=60)
+        assert cache.get("a") is None
+        cache.set("a", "valeur")
+        assert cache.get("a") == "valeur"
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_eviction_by_size(self):
+        """Les entrées les moins récemment utilisées sont évincées"""
+        cache = LRUCache(max_bytes=3 * 800, ttl=60)
+        for key in "abc":
+            cache.set(key, np.zeros(100))  # 800 octets chacune
+        cache.get("a")
+        cache.set("d", np.zeros(100))
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiration(self):
+        """Les entrées expirent après leur TTL"""
+        cache = LRUCache(max_bytes=1024 * 1024, ttl=0.05)
+        cache.set("a", "valeur")
+        time.sleep(0.1)
+        assert cache.get("a") is None
+
+    def test_disk_backing_survives_restart(self, tmp_path):
+        """Le stockage disque survit à la recréation du cache"""
+        path = str(tmp_path / "cache.sqlite")
+        LRUCache(1024 * 1024, 60, DiskStore(path)).set("a", "valeur")
+        assert LRUCache(1024 * 1024, 60, DiskStore(path)).get("a") == "valeur"
+
+
+class TestPageCache:
+    """Tests pour le cache des pages et embeddings"""
+
+    def test_get_text_cached(self):
+        """Une page n'est téléchargée qu'une fois"""
+        cache = PageCache(1024 * 1024, 60)
+        calls = []
+
+        def loader(url):
+            calls.append(url)
+            return "contenu"
+
+        assert cache.get_text("http://a.com", loader) == "contenu"
+        assert cache.get_text("http://a.com", loader) == "contenu"
+        assert calls == ["http://a.com"]
+
+    def test_get_text_failure_not_cached(self):
+        """Un échec de téléchargement n'est pas mis en cache"""
+        cache = PageCache(1024 * 1024, 60)
+        assert cache.get_text("http://a.com", lambda url: "") == ""
+        assert cache.get_text("http://a.com", lambda url: "contenu") == "contenu"
+
+    def test_get_embeddings_encodes_only_missing(self):
+        """Seuls les textes absents du cache sont encodés, en un seul appel"""
+        cache = PageCache(1024 * 1024, 60)
+        batches = []
+
+        def encode(texts):
+            batches.append(list(texts))
+            return np.array([[float(len(t)), 1.0] for t in texts])
+
+        first = cache.get_embeddings(["aa", "bbb"], encode)
+        second = cache.get_embeddings(["bbb", "cccc", "cccc"], encode)
+
+        assert batches == [["aa", "bbb"], ["cccc"]]
+        assert first.shape == (2, 2)
+        assert second[:, 0].tolist() == [3.0, 4.0, 4.0]
+        assert cache.stats()["embeddings"]["hits"] == 1
+
+    def test_cached_rows_do_not_keep_batch_alive(self):
+        """Chaque ligne en cache possède ses données : sa taille estimée est sa taille réelle"""
+        cache = PageCache(1024 * 1024, 60)
+        cache.get_embeddings([f"texte {i}" for i in range(50)], lambda texts: np.ones((len(texts), 8)))
+        row = cache.embeddings.get(content_hash("\x00texte 3"))
+        assert row.base is None
+        assert row.nbytes == 8 * 8
+
+
+class TestSearchCache:
+    """Tests pour le cache des recherches SerpAPI"""
+
+    def test_normalize_query(self):
+        """La casse, la ponctuation et les espaces sont repliés"""
+        assert normalize_query("  Le Plagiat,  c'est MAL ! ") == "le plagiat c est mal"
+
+    def test_equivalent_queries_share_entry(self):
+        """Deux requêtes équivalentes ne coûtent qu'un appel"""
+        cache = SearchCache(ttl=60)
+        calls = []
+
+        def search(query):
+            calls.append(query)
+            return ["http://a.com"]
+
+        assert cache.get_or_search("Le plagiat.", search) == ["http://a.com"]
+        assert cache.get_or_search("le   PLAGIAT", search) == ["http://a.com"]
+        assert len(calls) == 1
+
+    def test_empty_results_not_cached(self):
+        """Les réponses vides ne sont pas mises en cache"""
+        cache = SearchCache(ttl=60)
+        assert cache.get_or_search("requête", lambda q: []) == []
+        assert cache.get_or_search("requête", lambda q: ["http://a.com"]) == ["http://a.com"]
+
+    def test_concurrent_searches_coalesced(self):
+        """Les recherches identiques simultanées sont regroupées"""
+        cache = SearchCache(ttl=60)
+        calls = []
+
+        def slow_search(query):
+            calls.append(query)
+            time.sleep(0.2)
+            return ["http://a.com"]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: cache.get_or_search("même requête", slow_search), range(4)))
+
+        assert results == [["http://a.com"]] * 4
+        assert len(calls) == 1
+        assert cache.stats()["coalesced"] == 3
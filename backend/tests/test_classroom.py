@@ -0,0 +1,140 @@
+"""
+Tests pour l'analyse groupée des devoirs d'une classe
+"""
+import io
+import sys
+import os
+import zlib
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classroom import similarity_matrix, top_pairs, plan_batch_queries, check_batch
+from search_index import WebSearchProvider
+
+
+def fake_encode(texts):
+    """Embeddings déterministes : textes identiques -> vecteurs identiques"""
+    return np.vstack([np.random.RandomState(zlib.crc32(t.encode())).standard_normal(16) for t in texts])
+
+
+def docx_bytes(text):
+    import docx
+    document = docx.Document()
+    for paragraph in text.split("\n\n"):
+        document.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+SHARED = "Le changement climatique modifie durablement les écosystèmes marins et terrestres de la planète. " * 4
+OWN = [
+    "La Révolution française bouleverse les institutions politiques et sociales du royaume. " * 4,
+    "Les algorithmes génétiques imitent la sélection naturelle pour explorer un espace de solutions. " * 4,
+]
+
+
+class TestSimilarityMatrix:
+    """Tests pour la matrice de similarité entre copies"""
+
+    def test_identical_and_different_documents(self):
+        """Deux copies identiques ont 1, des copies indépendantes un score faible"""
+        paragraphs = fake_encode(["a", "b", "a", "b", "c"])
+        matrix = similarity_matrix(paragraphs, [0, 0, 1, 1, 2], 3)
+        assert matrix.shape == (3, 3)
+        assert matrix[0, 1] == pytest.approx(1.0, abs=1e-5)
+        assert matrix[0, 2] < 0.6
+        assert np.allclose(matrix, matrix.T)
+
+    def test_partial_copy(self):
+        """Une copie partielle obtient un score intermédiaire"""
+        paragraphs = fake_encode(["a", "b", "a", "z"])
+        matrix = similarity_matrix(paragraphs, [0, 0, 1, 1], 2)
+        assert 0.4 < matrix[0, 1] < 0.9
+
+    def test_empty_document(self):
+        """Un document sans paragraphe reste à zéro"""
+        matrix = similarity_matrix(fake_encode(["a", "a"]), [0, 2], 3)
+        assert matrix[0, 2] == pytest.approx(1.0, abs=1e-5)
+        assert matrix[1].tolist() == [0.0, 1.0, 0.0]
+
+    def test_blocks_match_single_product(self):
+        """Le calcul par blocs donne la même matrice que le produit complet"""
+        paragraphs = np.random.RandomState(0).standard_normal((50, 16))
+        owners = np.random.RandomState(1).randint(0, 6, size=50)
+        whole = similarity_matrix(paragraphs, owners, 7, block_rows=1000)
+        blocked = similarity_matrix(paragraphs, owners, 7, block_rows=7)
+        assert np.allclose(whole, blocked, atol=1e-6)
+
+    def test_top_pairs(self):
+        """Les paires sont triées par similarité décroissante"""
+        matrix = np.array([[1, 0.2, 0.9], [0.2, 1, 0.5], [0.9, 0.5, 1]])
+        pairs = top_pairs(matrix, ["a", "b", "c"], limit=2)
+        assert [(p["a"], p["b"]) for p in pairs] == [("a", "c"), ("b", "c")]
+        assert pairs[0]["score"] == 90.0
+
+
+class TestBatchQueries:
+    """Tests pour la mutualisation des recherches"""
+
+    def test_shared_passages_searched_once(self):
+        """Un passage commun à plusieurs copies n'est recherché qu'une fois"""
+        unique, per_document = plan_batch_queries([SHARED, SHARED, OWN[0]])
+        assert len(unique) == 2
+        assert per_document[0] == per_document[1]
+
+    def test_every_document_searched_in_large_class(self):
+        """Une classe plus grande que le budget : chaque copie a au moins une requête"""
+        essays = [f"Le sujet numéro {n} traite d'une question différente de toutes les autres copies." for n in range(100)]
+        unique, per_document = plan_batch_queries(essays, max_queries=50)
+        assert all(per_document)
+        assert len(unique) == 100
+
+    def test_budget_split_between_documents(self):
+        """Le budget est réparti : un long document ne consomme pas les requêtes des autres"""
+        long_text = " ".join(f"La phrase distinctive numéro {n} parle d'un thème précis et original." for n in range(200))
+        short = ["Une courte copie sur la biologie cellulaire et ses mécanismes fondamentaux.",
+                 "Une autre copie sur la géographie des fleuves européens et leurs bassins."]
+        unique, per_document = plan_batch_queries([long_text] + short, max_queries=4)
+        assert len(per_document[0]) == 1
+        assert all(len(keys) == 1 for keys in per_document[1:])
+
+
+class TestCheckBatch:
+    """Tests pour l'analyse complète d'une classe"""
+
+    def test_batch_report(self):
+        """Scores par copie, matrice et paires les plus proches, avec recherches dédupliquées"""
+        searches = []
+
+        def search(query):
+            searches.append(query)
+            return ["http://source.com"]
+
+        provider = WebSearchProvider(search, lambda url: SHARED)
+        files = [
+            ("alice.docx", docx_bytes(SHARED + "\n\n" + OWN[0])),
+            ("bob.docx", docx_bytes(SHARED + "\n\n" + OWN[0])),
+            ("carol.docx", docx_bytes(OWN[1])),
+            ("broken.pdf", io.BytesIO(b"pas un pdf")),
+        ]
+        with patch('plagiat.encode_texts', side_effect=fake_encode), \
+                patch('plagiat.score_pages', side_effect=lambda text, pages: [(u, 0.8) for u, _ in pages]):
+            report = check_batch(files, None, provider=provider)
+
+        assert report["names"] == ["alice.docx", "bob.docx", "carol.docx", "broken.pdf"]
+        assert len(report["matrix"]) == 4
+        assert report["top_pairs"][0]["a"] == "alice.docx"
+        assert report["top_pairs"][0]["b"] == "bob.docx"
+        assert report["top_pairs"][0]["score"] == pytest.approx(100.0, abs=0.01)
+        assert len(searches) == report["queries"] < 3
+        assert report["documents"][0]["plagiarism_score"] == 80.0
+        assert "error" in report["documents"][3]
+        assert report["documents"][3]["searched"] is False
+        assert all(d["searched"] for d in report["documents"][:3])
@@ -0,0 +1,137 @@
+"""
+Tests pour le corpus de référence local (MinHash/LSH)
+"""
+import sys
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import (
+    CorpusIndex, MinHasher, shingle_hashes, tokenize, passage_spans, estimate_jaccard, main
+)
+
+COURSE = (
+    "La photosynthèse est le processus par lequel les plantes vertes transforment l'énergie lumineuse "
+    "en énergie chimique. Elle se déroule dans les chloroplastes grâce à la chlorophylle qui absorbe "
+    "la lumière bleue et rouge. Le dioxyde de carbone et l'eau sont convertis en glucose et en oxygène, "
+    "libéré dans l'atmosphère par les stomates des feuilles."
+)
+HISTORY = (
+    "La révolution industrielle commence en Angleterre à la fin du dix-huitième siècle avec la machine "
+    "à vapeur, la mécanisation du textile et l'essor des chemins de fer qui transforment durablement "
+    "l'économie, le travail ouvrier et la croissance des villes européennes."
+)
+
+
+class TestMinHash:
+    """Tests pour les signatures MinHash"""
+
+    def test_identical_sets(self):
+        """Deux ensembles identiques ont la même signature"""
+        hasher = MinHasher()
+        hashes = shingle_hashes(tokenize(COURSE))
+        assert estimate_jaccard(hasher.signature(hashes), hasher.signature(hashes)) == 1.0
+
+    def test_estimate_close_to_true_jaccard(self):
+        """L'estimation suit la similarité de Jaccard réelle"""
+        hasher = MinHasher(num_perm=256)
+        first = np.arange(0, 1000, dtype=np.uint64)
+        second = np.arange(500, 1500, dtype=np.uint64)
+        estimate = estimate_jaccard(hasher.signature(first), hasher.signature(second))
+        assert estimate == pytest.approx(1 / 3, abs=0.08)
+
+    def test_passage_spans_cover_text(self):
+        """Les passages se chevauchent et couvrent tout le texte"""
+        spans = passage_spans(250, size=100)
+        assert spans[0] == (0, 100)
+        assert spans[-1][1] == 250
+        assert passage_spans(30, size=100) == [(0, 30)]
+        assert passage_spans(0) == []
+
+
+class TestCorpusIndex:
+    """Tests pour l'index du corpus"""
+
+    def make_index(self, directory=""):
+        index = CorpusIndex(directory, passage_words=30)
+        index.add("cours/bio.txt", COURSE, source="bio.txt")
+        index.add("cours/histoire.txt", HISTORY, source="histoire.txt")
+        return index
+
+    def test_copied_passage_found(self):
+        """Un extrait recopié du cours est retrouvé avec un Jaccard élevé"""
+        index = self.make_index()
+        submission = "Introduction de mon devoir. " + COURSE[:220]
+        results = index.query(submission)
+        assert results[0]["source"] == "bio.txt"
+        assert results[0]["jaccard"] > 0.4
+        assert all(r["source"] != "histoire.txt" for r in results)
+
+    def test_unrelated_text_not_found(self):
+        """Un texte sans rapport ne renvoie rien"""
+        index = self.make_index()
+        assert index.query("Les algorithmes de tri comparent les éléments deux à deux pour les ordonner.") == []
+
+    def test_duplicate_ingestion_ignored(self):
+        """Réingérer un document identique n'ajoute rien"""
+        index = self.make_index()
+        passages = index.stats()["passages"]
+        assert index.add("cours/bio.txt", COURSE) == 0
+        assert index.stats()["passages"] == passages
+
+    def test_persistence(self, tmp_path):
+        """L'index enregistré est relu à l'identique"""
+        index = self.make_index()
+        index.save(str(tmp_path))
+        reloaded = CorpusIndex(str(tmp_path))
+        assert reloaded.stats() == index.stats()
+        assert reloaded.query(COURSE)[0]["source"] == "bio.txt"
+
+    def test_cli_ingest_and_query(self, tmp_path, capsys):
+        """La ligne de commande ingère un répertoire puis l'interroge"""
+        documents = tmp_path / "docs"
+        documents.mkdir()
+        (documents / "bio.txt").write_text(COURSE, encoding="utf-8")
+        (documents / "histoire.md").write_text(HISTORY, encoding="utf-8")
+        index_dir = str(tmp_path / "index")
+        assert main(["ingest", "--index", index_dir, str(documents)]) == 0
+        assert CorpusIndex(index_dir).stats()["documents"] == 2
+
+        submission = tmp_path / "devoir.txt"
+        submission.write_text(COURSE, encoding="utf-8")
+        assert main(["query", "--index", index_dir, str(submission)]) == 0
+        assert "bio.txt" in capsys.readouterr().out
+
+
+class TestLocalFirstCheck:
+    """Tests pour l'intégration du corpus dans l'analyse"""
+
+    @patch('plagiat.google_search_serpapi', return_value=[])
+    def test_corpus_results_replace_mock(self, mock_search):
+        """Sans résultat web, les correspondances du corpus sont renvoyées au lieu du score simulé"""
+        import plagiat
+        index = CorpusIndex(passage_words=30)
+        index.add("bio", COURSE, source="bio.txt")
+        with patch.object(plagiat, 'corpus_index', index):
+            score, sources = plagiat.check_similarity(COURSE, None)
+        assert sources[0]["url"] == "bio.txt"
+        assert sources[0]["origin"] == "corpus"
+        assert score == sources[0]["score"] > 50
+
+    @patch('plagiat.google_search_serpapi', return_value=[])
+    def test_configured_corpus_without_match(self, mock_search):
+        """Corpus configuré mais sans correspondance : score nul, pas de source inventée"""
+        import plagiat
+        index = CorpusIndex(passage_words=30)
+        index.add("bio", COURSE, source="bio.txt")
+        with patch.object(plagiat, 'corpus_index', index):
+            score, sources = plagiat.check_similarity(
+                "La Révolution française bouleverse les institutions politiques du royaume.", None
+            )
+        assert (score, sources) == (0, [])
+
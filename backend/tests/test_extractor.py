@@ -0,0 +1,142 @@
+"""
+Tests pour l'extraction du texte des pages sources
+"""
+import sys
+import os
+from unittest.mock import patch
+
+import pytest
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor import download_text, html_to_text, parse_content_type, _soup_to_text, _clean_lines
+
+PAGE = (
+    "<html><head><title>Photosynthèse</title><script>var tracker = 1;</script>"
+    "<style>p { color: red; }</style></head><body>"
+    "<nav><a href='/'>Accueil</a><a href='/contact'>Contact</a></nav>"
+    "<div role='search'>Rechercher</div>"
+    "<article><h1>La photosynthèse</h1><p>Les plantes <b>vertes</b> captent la lumière.</p>"
+    "<p>Elles rejettent de l'oxygène.</p></article>"
+    "<footer>© 2024 Mentions légales</footer></body></html>"
+)
+
+
+class FakeResponse:
+    """Réponse en flux : compte les octets réellement lus"""
+
+    def __init__(self, body, content_type):
+        self.body = body
+        self.headers = {"Content-Type": content_type} if content_type else {}
+        self.read = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            chunk = self.body[start:start + chunk_size]
+            self.read += len(chunk)
+            yield chunk
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed = True
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.kwargs = None
+
+    def get(self, url, **kwargs):
+        self.kwargs = kwargs
+        return self.response
+
+
+class TestHtmlToText:
+    """Tests pour le nettoyage du HTML"""
+
+    def test_boilerplate_removed(self):
+        """Scripts, styles, menus et pieds de page sont retirés"""
+        text = html_to_text(PAGE.encode("utf-8"))
+        assert text == (
+            "Photosynthèse\nLa photosynthèse\nLes plantes vertes captent la lumière.\n"
+            "Elles rejettent de l'oxygène."
+        )
+
+    def test_fallback_parser_same_text(self):
+        """Le parseur de repli (html.parser) produit le même texte"""
+        assert _clean_lines(_soup_to_text(PAGE.encode("utf-8"), None)) == html_to_text(PAGE.encode("utf-8"))
+
+    def test_encodings(self):
+        """Charset HTTP, balise meta, ou détection UTF-8 / Windows-1252"""
+        assert html_to_text("<p>café</p>".encode("latin-1"), "iso-8859-1") == "café"
+        assert html_to_text('<meta charset="iso-8859-1"><p>café</p>'.encode("latin-1")) == "café"
+        assert html_to_text("<p>café</p>".encode("utf-8")) == "café"
+        assert html_to_text("<p>café</p>".encode("cp1252")) == "café"
+        assert html_to_text(b"") == ""
+
+    def test_parse_content_type(self):
+        assert parse_content_type('text/HTML; charset="UTF-8"') == ("text/html", "UTF-8")
+        assert parse_content_type("text/html; charset=inconnu") == ("text/html", None)
+        assert parse_content_type(None) == ("", None)
+
+
+class TestDownloadText:
+    """Tests pour le téléchargement en flux"""
+
+    def test_binary_content_not_downloaded(self):
+        """Un PDF ou une image est ignoré sans lire le corps"""
+        response = FakeResponse(b"%PDF-1.4" * 1000, "application/pdf")
+        assert download_text("http://a.com/doc.pdf", FakeSession(response), 5) == ""
+        assert response.read == 0
+        assert response.closed
+
+    def test_byte_cap(self):
+        """La lecture s'arrête au plafond d'octets"""
+        body = ("<p>" + "mot " * 100000 + "</p>").encode()
+        response = FakeResponse(body, "text/html; charset=utf-8")
+        session = FakeSession(response)
+        text = download_text("http://a.com", session, 5, max_bytes=100 * 1024)
+        assert session.kwargs["stream"] is True
+        assert response.read < 200 * 1024
+        assert len(text) <= 100 * 1024
+        assert text.startswith("mot mot")
+
+    def test_wall_clock_deadline(self):
+        """Un serveur qui répond au goutte-à-goutte est abandonné à l'échéance"""
+        import time
+
+        class SlowResponse(FakeResponse):
+            def iter_content(self, chunk_size):
+                while True:
+                    time.sleep(0.02)
+                    self.read += 1
+                    yield b"a"
+
+        response = SlowResponse(b"", "text/html")
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            download_text("http://a.com", FakeSession(response), 5, deadline=0.2)
+        assert time.monotonic() - started < 1
+        assert response.closed
+
+    def test_plain_text_and_missing_type(self):
+        """Texte brut décodé tel quel ; sans Content-Type, la page est traitée comme du HTML"""
+        response = FakeResponse("Ligne  un\n\nLigne deux".encode("utf-8"), "text/plain")
+        assert download_text("http://a.com", FakeSession(response), 5) == "Ligne un\nLigne deux"
+        response = FakeResponse(PAGE.encode("utf-8"), None)
+        assert "Accueil" not in download_text("http://a.com", FakeSession(response), 5)
+
+    def test_plagiat_download_errors(self):
+        """Une erreur réseau donne une page vide"""
+        import plagiat
+
+        class BrokenSession:
+            def get(self, url, **kwargs):
+                raise ConnectionError("refused")
+
+        with patch.object(plagiat, 'get_session', return_value=BrokenSession()):
+            assert plagiat.download_text("http://a.com") == ""
@@ -0,0 +1,92 @@
+"""
+Tests pour la récupération concurrente des pages sources
+"""
+import threading
+import time
+import sys
+import os
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetcher import fetch_pages
+
+
+class TestFetchPages:
+    """Tests pour fetch_pages"""
+
+    def test_fetch_pages_empty(self):
+        """Test sans URL"""
+        assert fetch_pages([], lambda url: "texte") == []
+
+    def test_fetch_pages_concurrent(self):
+        """Les pages sont téléchargées en parallèle et l'ordre est conservé"""
+        def slow_extract(url):
+            time.sleep(0.3)
+            return f"contenu {url}"
+
+        urls = [f"http://site{i}.com/page" for i in range(4)]
+        start = time.monotonic()
+        pages = fetch_pages(urls, slow_extract, deadline=5)
+        elapsed = time.monotonic() - start
+
+        assert [url for url, _ in pages] == urls
+        assert elapsed < 1.0
+
+    def test_fetch_pages_deadline(self):
+        """Une page lente ne bloque pas les autres au-delà de l'échéance"""
+        def extract(url):
+            if "slow" in url:
+                time.sleep(2)
+            return "contenu"
+
+        start = time.monotonic()
+        pages = fetch_pages(["http://fast.com", "http://slow.com"], extract, deadline=0.5)
+        elapsed = time.monotonic() - start
+
+        assert pages == [("http://fast.com", "contenu")]
+        assert elapsed < 1.5
+
+    def test_fetch_pages_per_host_limit(self):
+        """Le nombre de requêtes simultanées vers un même hôte est borné"""
+        active = {"current": 0, "max": 0}
+        lock = threading.Lock()
+
+        def extract(url):
+            with lock:
+                active["current"] += 1
+                active["max"] = max(active["max"], active["current"])
+            time.sleep(0.1)
+            with lock:
+                active["current"] -= 1
+            return "contenu"
+
+        urls = [f"http://meme-hote.com/page{i}" for i in range(5)]
+        pages = fetch_pages(urls, extract, deadline=5, per_host_limit=1)
+
+        assert len(pages) == 5
+        assert active["max"] == 1
+
+    def test_host_semaphores_released(self):
+        """Les sémaphores des hôtes ne survivent pas aux téléchargements (pas de fuite)"""
+        import fetcher
+        urls = [f"http://hote{i}.com/page" for i in range(50)] + ["http://error.com"]
+
+        def extract(url):
+            if "error" in url:
+                raise ValueError("boom")
+            return "contenu"
+
+        assert len(fetch_pages(urls, extract, deadline=5)) == 50
+        # (un téléchargement abandonné par un autre test peut encore être en cours)
+        assert not [host for host, _ in fetcher._host_semaphores if host.startswith("hote") or host == "error.com"]
+
+    def test_fetch_pages_skips_empty_and_errors(self):
+        """Les pages vides ou en erreur sont ignorées"""
+        def extract(url):
+            if "error" in url:
+                raise ValueError("boom")
+            return "" if "empty" in url else "contenu"
+
+        pages = fetch_pages(["http://ok.com", "http://empty.com", "http://error.com"], extract, deadline=2)
+        assert pages == [("http://ok.com", "contenu")]
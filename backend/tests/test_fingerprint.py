@@ -0,0 +1,112 @@
+"""
+Tests pour les empreintes par winnowing (copies exactes)
+"""
+import sys
+import os
+from unittest.mock import patch
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fingerprint import Tokens, kgram_hashes, winnow, copied_spans, unmatched_text
+
+SOURCE = (
+    "La photosynthèse est le processus par lequel les plantes vertes transforment "
+    "l'énergie lumineuse en énergie chimique grâce à la chlorophylle contenue dans "
+    "leurs feuilles, en absorbant du dioxyde de carbone et en rejetant de l'oxygène."
+)
+OWN = (
+    "Mon exposé commence par une introduction personnelle sur le jardinage familial "
+    "et les souvenirs de vacances passées chez mes grands-parents à la campagne."
+)
+
+
+class TestWinnowing:
+    """Tests pour la sélection des empreintes"""
+
+    def test_one_fingerprint_per_window(self):
+        """Chaque fenêtre contient au moins une empreinte sélectionnée"""
+        hashes = [7, 3, 9, 3, 8, 1, 6, 5, 4, 2]
+        positions = [position for _, position in winnow(hashes, window=4)]
+        assert positions == sorted(set(positions))
+        for start in range(len(hashes) - 3):
+            assert any(start <= p < start + 4 for p in positions)
+        assert positions == [3, 5, 9]
+
+    def test_short_input(self):
+        """Moins d'une fenêtre : toutes les empreintes sont gardées"""
+        assert winnow([5, 2], window=4) == [(5, 0), (2, 1)]
+        assert winnow([], window=4) == []
+
+    def test_kgrams_are_case_insensitive(self):
+        """Les k-grammes ignorent la casse et la ponctuation"""
+        assert kgram_hashes(Tokens("Le Chat, noir dort ici.").words, k=3) == \
+            kgram_hashes(Tokens("le chat noir ; dort ici").words, k=3)
+
+
+class TestCopiedSpans:
+    """Tests pour la localisation des passages copiés"""
+
+    def test_verbatim_copy_located(self):
+        """Un passage recopié est localisé dans le texte et dans la source"""
+        text = OWN + " " + SOURCE
+        result = copied_spans(text, "Préambule de la page. " + SOURCE)
+        assert len(result["spans"]) == 1
+        span = result["spans"][0]
+        assert span["text"] == SOURCE.rstrip(".")
+        assert text[span["start"]:span["end"]] == span["text"]
+        assert span["source_start"] == len("Préambule de la page. ")
+        assert 50 < result["copied_percent"] < 70
+
+    def test_near_exact_copy_merged(self):
+        """Un mot modifié au milieu d'une copie ne la coupe pas en deux"""
+        text = SOURCE.replace("transforment", "convertissent")
+        result = copied_spans(text, SOURCE)
+        assert len(result["spans"]) == 1
+        assert result["copied_percent"] > 95
+
+    def test_unrelated_text(self):
+        """Aucun passage commun"""
+        assert copied_spans(OWN, SOURCE) == {"copied_percent": 0.0, "spans": []}
+        assert copied_spans("", SOURCE) == {"copied_percent": 0.0, "spans": []}
+
+    def test_unmatched_text(self):
+        """Le texte restant exclut les passages copiés"""
+        text = OWN + " " + SOURCE
+        spans = copied_spans(text, SOURCE)["spans"]
+        assert unmatched_text(text, spans) == OWN
+        assert unmatched_text(text, spans, min_length=1000) == ""
+
+
+class TestFingerprintStage:
+    """Tests pour l'intégration dans l'analyse"""
+
+    @patch('plagiat.extract_text', return_value=SOURCE)
+    @patch('plagiat.google_search_serpapi', return_value=["http://source.com"])
+    def test_model_only_sees_unmatched_text(self, mock_search, mock_extract):
+        """Les copies exactes sont notées sans modèle, qui ne voit que le reste"""
+        import plagiat
+        scored = []
+
+        def score_pages(text, pages):
+            scored.append(text)
+            return [(url, 0.2) for url, _ in pages]
+
+        with patch.object(plagiat, 'score_pages', side_effect=score_pages):
+            score, sources = plagiat.check_similarity(OWN + " " + SOURCE, None, urls=["http://source.com"])
+        assert scored == [OWN]
+        assert sources[0]["copied_percent"] == score
+        assert sources[0]["spans"][0]["source_start"] == 0
+
+    @patch('plagiat.extract_text', return_value=SOURCE)
+    def test_sentence_mode_exact_matches(self, mock_extract):
+        """En mode phrases, les copies exactes sont des correspondances à 100 %"""
+        import plagiat
+        with patch.object(plagiat, 'match_sentences', return_value=[]) as mock_match:
+            score, sources = plagiat.check_similarity(
+                SOURCE, None, mode="sentences", urls=["http://source.com"]
+            )
+        assert mock_match.call_args.kwargs["exclude"] == [(0, len(SOURCE) - 1)]
+        assert sources[0]["matches"][0]["exact"] is True
+        assert sources[0]["matches"][0]["score"] == 100.0
+        assert score == 100.0
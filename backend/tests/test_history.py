@@ -0,0 +1,129 @@
+"""
+Tests pour l'historique des soumissions (copie entre étudiants)
+"""
+import sys
+import zlib
+import os
+from unittest.mock import patch
+
+import numpy as np
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import HistoryIndex, CODES_FILE, EMBEDDINGS_FILE
+from text_utils import split_paragraphs
+
+
+def random_embeddings(count, seed, dim=384):
+    return np.random.RandomState(seed).standard_normal((count, dim)).astype(np.float32)
+
+
+class TestHistoryIndex:
+    """Tests pour l'index des soumissions passées"""
+
+    def test_copied_paragraph_found(self, tmp_path):
+        """Un paragraphe quasi identique d'une autre soumission est retrouvé"""
+        index = HistoryIndex(str(tmp_path))
+        first = random_embeddings(3, seed=1)
+        index.add("alice", ["p0", "p1", "p2"], first)
+
+        noisy = first[1:2] + 0.05 * random_embeddings(1, seed=2)
+        results = index.query(np.vstack([noisy, random_embeddings(1, seed=3)]))
+        assert len(results) == 1
+        assert results[0]["submission"] == "alice"
+        assert [m["paragraph"] for m in results[0]["matches"]] == [0]
+        assert results[0]["matches"][0]["source_paragraph"] == 1
+        assert results[0]["matches"][0]["source_text"] == "p1"
+
+    def test_own_submission_excluded(self, tmp_path):
+        """Une soumission ne se détecte pas elle-même"""
+        index = HistoryIndex(str(tmp_path))
+        embeddings = random_embeddings(2, seed=1)
+        index.add("alice", ["p0", "p1"], embeddings)
+        assert index.query(embeddings, exclude="alice") == []
+        assert index.add("alice", ["p0", "p1"], embeddings) == 0
+
+    def test_candidates_are_a_small_subset(self, tmp_path):
+        """Une requête ne compare qu'une fraction de l'historique"""
+        index = HistoryIndex(str(tmp_path))
+        embeddings = random_embeddings(2000, seed=4)
+        for k in range(0, 2000, 100):
+            index.add(f"s{k}", [str(i) for i in range(100)], embeddings[k:k + 100])
+        candidates = index._candidates(index._codes(embeddings[:1])[0])
+        assert 0 in candidates
+        assert len(candidates) < 200
+
+    def test_recall_at_threshold(self, tmp_path):
+        """Un paragraphe tout juste au-dessus du seuil (cos ~ 0,86) est presque toujours retrouvé"""
+        index = HistoryIndex(str(tmp_path))
+        stored = random_embeddings(200, seed=6)
+        index.add("alice", [str(i) for i in range(200)], stored)
+
+        unit = stored / np.linalg.norm(stored, axis=1, keepdims=True)
+        noise = random_embeddings(200, seed=7)
+        noise -= (noise * unit).sum(axis=1, keepdims=True) * unit
+        noise /= np.linalg.norm(noise, axis=1, keepdims=True)
+        cosine = 0.86
+        queries = cosine * unit + np.sqrt(1 - cosine ** 2) * noise
+
+        results = index.query(queries, min_similarity=0.85)
+        found = {(m["paragraph"], m["source_paragraph"]) for m in results[0]["matches"]}
+        recall = sum((i, i) in found for i in range(200)) / 200
+        assert recall >= 0.9
+
+    def test_persistence_and_recovery(self, tmp_path):
+        """L'historique est relu au démarrage, même après une écriture interrompue"""
+        index = HistoryIndex(str(tmp_path))
+        embeddings = random_embeddings(2, seed=1)
+        index.add("alice", ["p0", "p1"], embeddings)
+        with open(tmp_path / EMBEDDINGS_FILE, "ab") as f:
+            f.write(b"\x00" * 100)
+
+        reloaded = HistoryIndex(str(tmp_path))
+        assert reloaded.stats() == {"submissions": 1, "paragraphs": 2}
+        assert reloaded.query(embeddings[:1])[0]["submission"] == "alice"
+        reloaded.add("bob", ["q0"], random_embeddings(1, seed=5))
+        assert HistoryIndex(str(tmp_path)).stats() == {"submissions": 2, "paragraphs": 3}
+
+    def test_codes_rebuilt_for_other_tables(self, tmp_path):
+        """Un historique indexé avec un autre réglage LSH est recodé au démarrage"""
+        embeddings = random_embeddings(3, seed=1)
+        HistoryIndex(str(tmp_path), tables=8, bits=16).add("alice", ["p0", "p1", "p2"], embeddings)
+
+        reloaded = HistoryIndex(str(tmp_path))
+        assert reloaded.stats() == {"submissions": 1, "paragraphs": 3}
+        assert reloaded.query(embeddings[1:2])[0]["matches"][0]["source_paragraph"] == 1
+        assert os.path.getsize(tmp_path / CODES_FILE) == 3 * 2 * reloaded.tables
+
+
+class TestSplitParagraphs:
+    """Tests pour le découpage en paragraphes"""
+
+    def test_short_blocks_merged_and_long_split(self):
+        """Les blocs courts sont regroupés, les longs découpés"""
+        text = "Titre\n" + "mot " * 40 + "\n\n" + "long " * 320
+        paragraphs = split_paragraphs(text)
+        assert [len(p.split()) for p in paragraphs] == [41, 150, 150, 20]
+
+
+class TestCollusionCheck:
+    """Tests pour l'intégration de l'historique dans l'analyse"""
+
+    @patch('plagiat.google_search_serpapi', return_value=[])
+    def test_second_student_detected(self, mock_search, tmp_path):
+        """Le second étudiant qui rend le même texte voit la soumission du premier"""
+        import plagiat
+        text = "Les réseaux de neurones apprennent des représentations. " * 24
+
+        def fake_encode(texts):
+            return np.vstack([random_embeddings(1, seed=zlib.crc32(t.encode())) for t in texts])
+
+        index = HistoryIndex(str(tmp_path))
+        with patch.object(plagiat, 'history_index', index), \
+                patch.object(plagiat, 'encode_texts', side_effect=fake_encode):
+            plagiat.check_similarity(text, None)
+            score, sources = plagiat.check_similarity(text + " Conclusion.", None)
+        assert sources[0]["origin"] == "history"
+        assert sources[0]["url"].startswith("submission://")
+        assert score >= 99
@@ -0,0 +1,130 @@
+"""
+Tests pour les backends d'inférence CPU
+"""
+import sys
+import os
+
+import numpy as np
+import pytest
+import torch
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference import select_backend, score_error, quantize_int8, inference_status
+
+
+def embed_linear(model):
+    """Embeddings de calibration d'un petit modèle linéaire"""
+    torch.manual_seed(0)
+    inputs = torch.randn(6, 64)
+    with torch.no_grad():
+        return model(inputs).numpy()
+
+
+def make_model():
+    torch.manual_seed(1)
+    return torch.nn.Sequential(torch.nn.Linear(64, 128), torch.nn.ReLU(), torch.nn.Linear(128, 32))
+
+
+class CountingLoader:
+    """Chargeur fp32 qui compte les chargements"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return make_model()
+
+
+@pytest.fixture(autouse=True)
+def reset_status():
+    inference_status.clear()
+    yield
+    inference_status.clear()
+
+
+class TestScoreError:
+    """Tests pour la comparaison des scores de similarité"""
+
+    def test_identical_embeddings(self):
+        """Des embeddings identiques ont un écart nul"""
+        embeddings = np.random.rand(4, 8)
+        assert score_error(embeddings, embeddings) == pytest.approx(0.0, abs=1e-6)
+
+    def test_scale_invariant(self):
+        """L'écart porte sur les scores cosinus, pas sur la norme des vecteurs"""
+        embeddings = np.random.rand(4, 8)
+        assert score_error(embeddings, embeddings * 3) == pytest.approx(0.0, abs=1e-6)
+
+
+class TestSelectBackend:
+    """Tests pour le choix du backend avec vérification de tolérance"""
+
+    def test_torch_backend_unchanged(self):
+        """Le backend fp32 charge le modèle tel quel"""
+        model = make_model()
+        assert select_backend("test", lambda: model, embed_linear, quantize_int8, "torch") is model
+
+    def test_int8_within_tolerance(self):
+        """La quantification int8 est retenue si les scores restent proches, sans seconde copie"""
+        load = CountingLoader()
+        selected = select_backend("test", load, embed_linear, quantize_int8, "int8", tolerance=0.05)
+        assert inference_status["test"]["backend"] == "int8"
+        assert "quantized" in type(selected[0]).__module__
+        assert load.calls == 1
+
+    def test_out_of_tolerance_falls_back(self):
+        """Un backend trop imprécis est refusé et le modèle fp32 est rechargé"""
+        def corrupt(model):
+            with torch.no_grad():
+                for p in model.parameters():
+                    p.add_(torch.randn_like(p))
+            return model
+
+        load = CountingLoader()
+        selected = select_backend("test", load, embed_linear, corrupt, "int8", tolerance=0.01)
+        assert inference_status["test"]["backend"] == "torch"
+        assert np.allclose(embed_linear(selected), embed_linear(make_model()))
+        assert load.calls == 2
+
+    def test_unavailable_backend_falls_back(self):
+        """Un backend indisponible (dépendance manquante) n'empêche pas le chargement"""
+        def missing(model):
+            raise ImportError("optimum non installé")
+
+        selected = select_backend("test", make_model, embed_linear, missing, "onnx")
+        assert isinstance(selected, torch.nn.Sequential)
+        assert "indisponible" in inference_status["test"]["reason"]
+
+    def test_onnx_receives_no_fp32_model(self):
+        """Le modèle fp32 n'est pas transmis (ni gardé) pendant le chargement du graphe ONNX"""
+        received = []
+
+        def onnx(model):
+            received.append(model)
+            return make_model()
+
+        select_backend("test", make_model, embed_linear, onnx, "onnx")
+        assert received == [None]
+
+    def test_reload_skips_calibration(self):
+        """Un rechargement après éviction reprend le backend validé sans recalibrer"""
+        select_backend("test", make_model, embed_linear, quantize_int8, "int8", tolerance=0.05)
+        embedded = []
+
+        def embed(model):
+            embedded.append(model)
+            return embed_linear(model)
+
+        load = CountingLoader()
+        selected = select_backend("test", load, embed, quantize_int8, "int8", tolerance=0.05)
+        assert embedded == []
+        assert load.calls == 1
+        assert "quantized" in type(selected[0]).__module__
+
+    def test_unknown_backend(self):
+        """Un backend inconnu est refusé"""
+        with pytest.raises(ValueError):
+            select_backend("test", make_model, embed_linear, quantize_int8, "tpu")
@@ -0,0 +1,95 @@
+"""
+Tests pour l'ingestion des documents envoyés
+"""
+import asyncio
+import io
+import types
+import sys
+import os
+
+import pytest
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingestion import read_upload, iter_document, extract_document, DocumentError, UploadTooLarge
+
+
+class FakeUpload:
+    """UploadFile minimal lisible par blocs"""
+
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+        self.reads = 0
+
+    async def read(self, size=-1):
+        self.reads += 1
+        return self._stream.read(size)
+
+
+def make_docx(text):
+    """Construit un DOCX en mémoire"""
+    import docx
+    document = docx.Document()
+    document.add_paragraph(text)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def make_pdf(pages):
+    """Construit un PDF vide de `pages` pages en mémoire"""
+    import pypdf
+    writer = pypdf.PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+class TestReadUpload:
+    """Tests pour la lecture bornée des fichiers"""
+
+    def test_read_upload_in_memory(self):
+        """Le contenu est lu par blocs dans un tampon mémoire"""
+        upload = FakeUpload(b"x" * 200000)
+        buffer = asyncio.run(read_upload(upload))
+        assert buffer.read() == b"x" * 200000
+        assert upload.reads > 1
+
+    def test_read_upload_too_large(self):
+        """La lecture s'interrompt dès que la taille maximale est dépassée"""
+        upload = FakeUpload(b"x" * 1000000)
+        with pytest.raises(UploadTooLarge):
+            asyncio.run(read_upload(upload, max_bytes=100000))
+        assert upload.reads < 5
+
+
+class TestIterDocument:
+    """Tests pour l'extraction du texte"""
+
+    def test_docx_without_temp_file(self, tmp_path, monkeypatch):
+        """Un DOCX est extrait sans écrire de fichier sur le disque"""
+        monkeypatch.chdir(tmp_path)
+        text = extract_document("devoir.docx", make_docx("Texte du devoir à analyser."))
+        assert "Texte du devoir" in text
+        assert list(tmp_path.iterdir()) == []
+
+    def test_pdf_pages_are_lazy(self):
+        """Les pages d'un PDF sont extraites à la demande"""
+        pages = iter_document("memoire.PDF", make_pdf(3))
+        assert isinstance(pages, types.GeneratorType)
+        assert len(list(pages)) == 3
+
+    def test_invalid_pdf(self):
+        """Un PDF illisible est signalé immédiatement"""
+        with pytest.raises(DocumentError, match="Erreur PDF"):
+            iter_document("faux.pdf", io.BytesIO(b"pas un pdf"))
+
+    def test_unsupported_format(self):
+        """Un format non supporté est refusé"""
+        with pytest.raises(DocumentError, match="Format non supporté"):
+            iter_document("notes.txt", io.BytesIO(b"texte"))
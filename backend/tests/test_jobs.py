@@ -0,0 +1,104 @@
+"""
+Tests pour l'exécution asynchrone des analyses
+"""
+import asyncio
+import threading
+import sys
+import os
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobs import JobManager, sse_events
+
+
+def wait_done(job, timeout=5):
+    """Attend la fin d'un job"""
+    index = 0
+    while not job.done:
+        index += len(job.wait_events(index, timeout))
+    return job
+
+
+def collect(stream):
+    """Consomme un générateur asynchrone dans une boucle dédiée"""
+    async def run():
+        return [chunk async for chunk in stream]
+    return asyncio.run(run())
+
+
+class TestJobManager:
+    """Tests pour la file de jobs"""
+
+    def test_job_result_and_events(self):
+        """Un job enregistre ses étapes et son résultat"""
+        manager = JobManager(max_workers=1)
+
+        def work(value, progress=None):
+            progress("search", {"queries": 1})
+            progress("score", {"url": "http://a.com", "score": 50.0})
+            return {"value": value}
+
+        job = wait_done(manager.submit(work, 42))
+        snapshot = job.snapshot()
+        assert snapshot["status"] == "done"
+        assert snapshot["result"] == {"value": 42}
+        stages = [event["stage"] for event in job.events]
+        assert stages == ["start", "search", "score", "done"]
+
+    def test_job_failure(self):
+        """Une erreur marque le job comme échoué sans interrompre le worker"""
+        manager = JobManager(max_workers=1)
+
+        def fail(progress=None):
+            raise RuntimeError("boom")
+
+        job = wait_done(manager.submit(fail))
+        assert job.status == "failed"
+        assert job.error == "boom"
+
+    def test_jobs_queue_under_load(self):
+        """Les jobs excédentaires attendent dans la file au lieu d'échouer"""
+        manager = JobManager(max_workers=1)
+        release = threading.Event()
+
+        def blocking(progress=None):
+            release.wait(5)
+            return "ok"
+
+        first = manager.submit(blocking)
+        second = manager.submit(blocking)
+        assert second.status == "queued"
+        assert manager.get(second.id) is second
+        first.wait_events(0, 5)  # Premier job démarré : seul le second attend
+        assert manager.queue_depth() == 1
+        release.set()
+        assert wait_done(first).status == "done"
+        assert wait_done(second).status == "done"
+        assert manager.queue_depth() == 0
+
+    def test_sse_stream(self):
+        """Le flux SSE contient toutes les étapes jusqu'à la fin"""
+        manager = JobManager(max_workers=1)
+        job = wait_done(manager.submit(lambda progress=None: progress("fetch", {"url": "http://a.com"})))
+        stream = "".join(collect(sse_events(job)))
+        assert "event: start" in stream
+        assert "event: fetch" in stream
+        assert "event: done" in stream
+
+    def test_sse_stream_follows_running_job(self):
+        """Un abonné connecté pendant l'exécution reçoit les événements émis depuis un autre thread"""
+        manager = JobManager(max_workers=1)
+        release = threading.Event()
+
+        def work(progress=None):
+            release.wait(5)
+            progress("score", {"score": 42})
+            return "ok"
+
+        job = manager.submit(work)
+        threading.Timer(0.1, release.set).start()
+        stream = "".join(collect(sse_events(job, heartbeat=0.05)))
+        assert ": keep-alive" in stream
+        assert "event: score" in stream
+        assert "event: done" in stream
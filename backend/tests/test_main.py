@@ -1,6 +1,7 @@
 """
 Tests pour l'API principale de PlagiatDetect Pro
 """
+import os
 import pytest
 from fastapi.testclient import TestClient
 from main import app
@@ -28,6 +29,37 @@ class TestMainAPI:
         assert data["status"] == "healthy"
         assert data["service"] == "plagiat-api"
     
+    def test_ready_endpoint(self):
+        """Test de l'endpoint de disponibilité"""
+        response = client.get("/ready")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ready"
+        assert set(data["models"]) == {"sentence", "paraphrase"}
+        assert data["cpu_pool"]["queued"] == 0
+        assert data["jobs_queued"] == 0
+
+    def test_ready_follows_warm_up_not_residency(self, monkeypatch):
+        """Prêt une fois le préchargement terminé, même si un modèle a été déchargé depuis"""
+        import main
+        monkeypatch.setitem(main.warmup_status, "state", "running")
+        assert client.get("/ready").status_code == 503
+        monkeypatch.setitem(main.warmup_status, "state", "done")
+        monkeypatch.setattr(main, "loaded_models", lambda: {"sentence": False, "paraphrase": False})
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+        monkeypatch.setitem(main.warmup_status, "state", "failed")
+        assert client.get("/ready").json()["status"] == "warmup_failed"
+
+    def test_cache_stats_endpoint(self):
+        """Test de l'endpoint des statistiques de cache"""
+        response = client.get("/cache/stats")
+        assert response.status_code == 200
+        data = response.json()
+        assert "hits" in data["pages"]["texts"]
+        assert "misses" in data["pages"]["embeddings"]
+
     def test_docs_endpoint(self):
         """Test de l'endpoint de documentation"""
         response = client.get("/docs")
@@ -100,6 +132,14 @@ class TestReformulation:
         assert "method" in data
         assert data["original"] == test_data["text"]
     
+    def test_reformulate_ai_restricted_in_production_without_budget(self, monkeypatch):
+        """En production sans budget mémoire, l'IA reste désactivée"""
+        import main
+        monkeypatch.setenv("ENVIRONMENT", "production")
+        monkeypatch.setattr(main.model_registry, "budget_bytes", 0)
+        response = client.post("/reformulate", json={"text": "Un texte de test pour la production.", "use_ai": True})
+        assert response.json()["method"] == "Basic (Production Mode)"
+
     def test_reformulate_endpoint_empty_text(self):
         """Test avec du texte vide pour la reformulation"""
         test_data = {"text": "", "use_ai": False}
@@ -107,6 +147,75 @@ class TestReformulation:
         # Devrait retourner le texte vide ou une erreur appropriée
         assert response.status_code in [200, 400]
 
+    def test_reformulate_seed_cached(self):
+        """Avec une graine, la même demande est servie depuis le cache, à l'identique"""
+        payload = {"text": "Cette méthode est très efficace pour améliorer les performances du système.",
+                   "use_ai": False, "seed": 1234}
+        first = client.post("/reformulate", json=payload).json()
+        second = client.post("/reformulate", json=payload).json()
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["reformulated"] == first["reformulated"]
+        assert second["seed"] == 1234
+        unseeded = client.post("/reformulate", json={**payload, "seed": None}).json()
+        assert unseeded["cached"] is False
+        assert client.get("/cache/stats").json()["reformulations"]["hits"] >= 1
+
+    def test_reformulate_stream_matches_seeded_reformulation(self, monkeypatch):
+        """Avec une graine, le flux reconstitue exactement la reformulation complète"""
+        import json
+        import main
+        import plagiat
+        monkeypatch.setattr(main, "REFORMULATE_CHUNK_CHARS", 200)
+        monkeypatch.setattr(plagiat, "REFORMULATE_CHUNK_CHARS", 200)
+        text = "\n\n".join(("Cette méthode est très efficace pour améliorer le système. " * 3).strip() for _ in range(4))
+        payload = {"text": text, "use_ai": False, "seed": 99}
+        with client.stream("POST", "/reformulate/stream", json=payload) as response:
+            lines = [json.loads(line) for line in response.iter_lines() if line]
+        streamed = "".join(c["separator"] + c["reformulated"] for c in lines[:-1])
+        assert streamed == client.post("/reformulate", json=payload).json()["reformulated"]
+
+    def test_short_text_matches_stream(self):
+        """Texte court de plusieurs paragraphes : même résultat (et même mise en page) qu'en flux"""
+        import json
+        text = ("Cette méthode est très efficace pour améliorer le système.\n\n"
+                "Il est important de vérifier les sources. De plus, les résultats sont très utiles.")
+        payload = {"text": text, "use_ai": False, "seed": 7}
+        with client.stream("POST", "/reformulate/stream", json=payload) as response:
+            lines = [json.loads(line) for line in response.iter_lines() if line]
+        assert len(lines) == 2
+        reformulated = client.post("/reformulate", json=payload).json()["reformulated"]
+        assert reformulated == lines[0]["reformulated"]
+        assert reformulated.count("\n\n") == 1
+
+    def test_ai_seed_ignored(self, monkeypatch):
+        """L'échantillonnage IA n'est pas reproductible : la graine est ignorée et rien n'est mis en cache"""
+        import workers
+        monkeypatch.setattr(workers, "reformulate", lambda text, use_ai, seed: f"{use_ai}:{seed}")
+        payload = {"text": "Cette méthode est très efficace pour améliorer le système.", "use_ai": True, "seed": 5}
+        first = client.post("/reformulate", json=payload).json()
+        second = client.post("/reformulate", json=payload).json()
+        assert first["reformulated"] == "True:None"
+        assert first["seed"] is None and first["seed_ignored"] is True
+        assert second["cached"] is False
+
+    def test_reformulate_stream(self, monkeypatch):
+        """Le flux NDJSON donne un morceau par ligne puis une ligne finale"""
+        import json
+        import main
+        monkeypatch.setattr(main, "REFORMULATE_CHUNK_CHARS", 200)
+        text = "\n\n".join(("Cette méthode est très efficace pour améliorer le système. " * 3).strip() for _ in range(4))
+        with client.stream("POST", "/reformulate/stream", json={"text": text, "use_ai": False}) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("application/x-ndjson")
+            lines = [json.loads(line) for line in response.iter_lines() if line]
+        chunks, final = lines[:-1], lines[-1]
+        assert final == {"done": True, "chunks": len(chunks), "method": "Basic", "seed": None, "seed_ignored": False}
+        assert len(chunks) == 4
+        assert [c["index"] for c in chunks] == [0, 1, 2, 3]
+        assert "".join(c["separator"] + c["original"] for c in chunks) == text
+        assert all(c["reformulated"] for c in chunks)
+
 class TestFileUpload:
     """Tests pour l'upload de fichiers"""
     
@@ -122,6 +231,110 @@ class TestFileUpload:
         assert response.status_code == 400
         assert "Format non supporté" in response.json()["detail"]
 
+class TestJobs:
+    """Tests pour le mode asynchrone par jobs"""
+
+    def test_check_job_lifecycle(self):
+        """Un job d'analyse se termine avec le même résultat que /check"""
+        response = client.post("/jobs/check", json={"text": "Ceci est un texte de test pour les jobs."})
+        assert response.status_code == 200
+        job_id = response.json()["job_id"]
+
+        events = client.get(f"/jobs/{job_id}/events")
+        assert events.status_code == 200
+        assert "text/event-stream" in events.headers["content-type"]
+        assert "event: done" in events.text
+
+        data = client.get(f"/jobs/{job_id}").json()
+        assert data["status"] == "done"
+        assert "plagiarism_score" in data["result"]
+
+    def test_upload_job_unsupported_format(self):
+        """Un format non supporté est refusé avant la mise en file"""
+        files = {"file": ("test.txt", b"Contenu de test", "text/plain")}
+        response = client.post("/jobs/upload", files=files)
+        assert response.status_code == 400
+
+    def test_unknown_job(self):
+        """Un job inconnu renvoie 404"""
+        assert client.get("/jobs/inconnu").status_code == 404
+
+class TestDocumentUpload:
+    """Tests pour l'analyse de documents"""
+
+    def test_upload_docx(self):
+        """Un DOCX est analysé sans fichier temporaire"""
+        import io
+        import docx
+        document = docx.Document()
+        document.add_paragraph("Ceci est un devoir de test suffisamment long pour être analysé.")
+        buffer = io.BytesIO()
+        document.save(buffer)
+        files = {"file": ("devoir.docx", buffer.getvalue(), "application/octet-stream")}
+        response = client.post("/upload", files=files)
+        assert response.status_code == 200
+        assert "plagiarism_score" in response.json()
+        assert not any(name.startswith("temp_") for name in os.listdir("."))
+
+    def test_upload_analysis_runs_off_event_loop(self):
+        """L'analyse d'un document ne s'exécute pas sur la boucle d'événements"""
+        import asyncio
+        from unittest.mock import patch
+
+        def fake_check(pages, api_key):
+            list(pages)
+            with pytest.raises(RuntimeError):
+                asyncio.get_running_loop()
+            return 0, []
+
+        files = {"file": ("devoir.txt", b"x", "text/plain")}
+        with patch("main.iter_document", return_value=iter(["texte"])), \
+                patch("main.check_similarity_stream", side_effect=fake_check) as mock_check:
+            response = client.post("/upload", files=files)
+        assert response.status_code == 200
+        mock_check.assert_called_once()
+
+    def test_batch_endpoint(self):
+        """Le lot renvoie un score par copie et la matrice entre copies"""
+        import io
+        import docx
+        import numpy as np
+        from unittest.mock import patch
+
+        def make_docx(text):
+            document = docx.Document()
+            document.add_paragraph(text)
+            buffer = io.BytesIO()
+            document.save(buffer)
+            return buffer.getvalue()
+
+        text = "Un devoir recopié mot pour mot par deux étudiants de la même classe. " * 5
+        files = [("files", ("a.docx", make_docx(text), "application/octet-stream")),
+                 ("files", ("b.docx", make_docx(text), "application/octet-stream"))]
+        with patch("plagiat.encode_texts", side_effect=lambda texts: np.ones((len(texts), 4))), \
+                patch("plagiat.google_search_serpapi", return_value=[]):
+            response = client.post("/batch", files=files)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["names"] == ["a.docx", "b.docx"]
+        assert data["top_pairs"][0]["score"] == 100.0
+
+    def test_batch_total_size_limit(self, monkeypatch):
+        """Un lot dont la taille totale dépasse BATCH_MAX_MB est refusé"""
+        import main
+        monkeypatch.setattr(main, "BATCH_MAX_MB", 0.1)
+        files = [("files", (f"{n}.docx", b"x" * 40 * 1024, "application/octet-stream")) for n in range(3)]
+        response = client.post("/batch", files=files)
+        assert response.status_code == 413
+        assert "Lot trop volumineux" in response.json()["detail"]
+
+    def test_upload_invalid_pdf(self):
+        """Un PDF invalide renvoie une erreur 400"""
+        files = {"file": ("faux.pdf", b"pas un pdf", "application/pdf")}
+        response = client.post("/upload", files=files)
+        assert response.status_code == 400
+        assert "Erreur PDF" in response.json()["detail"]
+
 class TestValidation:
     """Tests de validation des données"""
     
@@ -0,0 +1,85 @@
+"""
+Tests pour le gestionnaire des modèles en mémoire
+"""
+import threading
+import time
+import sys
+import os
+
+import pytest
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import ModelRegistry, ModelBudgetExceeded, MB
+
+
+def make_registry(budget_mb=0, idle_timeout=0, wait_timeout=0.2):
+    registry = ModelRegistry(int(budget_mb * MB), idle_timeout, wait_timeout)
+    loads = []
+    for name in ("a", "b"):
+        registry.register(name, lambda name=name: loads.append(name) or f"model-{name}", estimated_mb=100)
+    return registry, loads
+
+
+class TestModelRegistry:
+    """Tests pour le registre de modèles"""
+
+    def test_loaded_once(self):
+        """Un modèle n'est chargé qu'une fois"""
+        registry, loads = make_registry()
+        with registry.use("a") as model:
+            assert model == "model-a"
+        with registry.use("a"):
+            pass
+        assert loads == ["a"]
+        assert registry.loaded() == {"a": True, "b": False}
+
+    def test_lru_eviction_over_budget(self):
+        """Charger un modèle au-delà du budget évince le modèle inactif"""
+        registry, loads = make_registry(budget_mb=150)
+        registry.preload("a")
+        registry.preload("b")
+        assert registry.loaded() == {"a": False, "b": True}
+
+    def test_model_in_use_is_not_evicted(self):
+        """Un modèle en cours d'utilisation n'est jamais déchargé"""
+        registry, _ = make_registry(budget_mb=150)
+        with registry.use("a"):
+            with pytest.raises(ModelBudgetExceeded):
+                registry.acquire("b")
+            assert registry.loaded()["a"]
+
+    def test_waits_for_release(self):
+        """Un chargement attend la libération d'un modèle occupé"""
+        registry, _ = make_registry(budget_mb=150, wait_timeout=5)
+        registry.acquire("a")
+        threading.Timer(0.2, registry.release, args=("a",)).start()
+        with registry.use("b") as model:
+            assert model == "model-b"
+        assert registry.loaded() == {"a": False, "b": True}
+
+    def test_idle_eviction(self):
+        """Les modèles inactifs sont déchargés après le délai"""
+        registry, _ = make_registry(idle_timeout=60)
+        registry.preload("a")
+        assert registry.evict_idle(now=time.time() + 30) == []
+        assert registry.evict_idle(now=time.time() + 120) == ["a"]
+        assert not registry.loaded()["a"]
+
+    def test_loader_failure(self):
+        """Un échec de chargement n'empêche pas une nouvelle tentative"""
+        registry = ModelRegistry()
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError("téléchargement impossible")
+            return "model"
+
+        registry.register("m", flaky)
+        with pytest.raises(OSError):
+            registry.preload("m")
+        with registry.use("m") as model:
+            assert model == "model"
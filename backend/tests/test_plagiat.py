@@ -13,8 +13,18 @@ from plagiat import (
     reformulate_text_basic,
     reformulate_sentence_basic,
     reformulate_text,
-    check_similarity
+    check_similarity,
+    check_similarity_stream,
+    score_pages,
+    split_sentences,
+    sentence_windows,
+    match_sentences,
+    paraphrase_english_text,
+    iter_reformulate,
+    reformulate_chunk
 )
+from text_utils import split_chunks
+from cache import PageCache
 
 class TestReformulationBasic:
     """Tests pour la reformulation basique"""
@@ -91,7 +101,8 @@ class TestReformulationMain:
         
         result = reformulate_text(text, use_ai=True)
         assert result == "Reformulation IA réussie."
-        mock_ai.assert_called_once_with(text)
+        mock_ai.assert_called_once()
+        assert mock_ai.call_args.args == (text,)
     
     @patch('plagiat.paraphrase_text_ai')
     def test_reformulate_text_ai_mode_fallback(self, mock_ai):
@@ -120,13 +131,14 @@ class TestSimilarityCheck:
     
     @patch('plagiat.google_search_serpapi')
     @patch('plagiat.extract_text')
-    @patch('plagiat.model')
-    def test_check_similarity_with_results(self, mock_model, mock_extract, mock_search):
+    @patch('plagiat.load_sentence_model')
+    def test_check_similarity_with_results(self, mock_load, mock_extract, mock_search):
         """Test avec résultats de recherche"""
         mock_search.return_value = ["http://example.com"]
         mock_extract.return_value = "Contenu de la page web"
         
         # Mock du modèle de similarité
+        mock_model = mock_load.return_value.__enter__.return_value
         mock_emb = MagicMock()
         mock_emb.item.return_value = 0.7
         mock_model.encode.return_value = "fake_embedding"
@@ -136,6 +148,17 @@ class TestSimilarityCheck:
             assert isinstance(score, (int, float))
             assert isinstance(sources, list)
     
+    @patch('plagiat.StreamingSearch')
+    def test_stream_closes_search_pool_on_extraction_error(self, mock_streaming):
+        """Une erreur d'extraction en cours de document libère le pool de recherche"""
+        def pages():
+            yield "Première page du document. " * 10
+            raise ValueError("PDF corrompu")
+
+        with pytest.raises(ValueError):
+            check_similarity_stream(pages(), "fake_api_key")
+        mock_streaming.return_value.close.assert_called_once()
+
     def test_check_similarity_empty_text(self):
         """Test avec texte vide"""
         score, sources = check_similarity("", "fake_api_key")
@@ -190,3 +213,229 @@ class TestErrorHandling:
         # Devrait fallback vers la méthode basique
         assert isinstance(result, str)
         assert len(result) > 0
+
+class TestScorePages:
+    """Tests pour le calcul groupé des scores de similarité"""
+
+    def test_score_pages_empty(self):
+        """Test sans page"""
+        assert score_pages("Texte de test", []) == []
+
+    @patch('plagiat.page_cache', new_callable=lambda: PageCache(10 * 1024 * 1024, 60))
+    @patch('plagiat.load_sentence_model')
+    def test_score_pages_batched(self, mock_load, mock_cache):
+        """Le texte et les pages sont encodés une seule fois chacun"""
+        import torch
+        mock_model = MagicMock()
+        mock_model.encode.side_effect = [
+            torch.tensor([[1.0, 0.0]]),
+            torch.tensor([[1.0, 0.0], [0.0, 1.0]]),
+        ]
+        mock_load.return_value.__enter__.return_value = mock_model
+
+        pages = [("http://a.com", "page a"), ("http://b.com", "page b")]
+        scores = score_pages("Texte de test", pages)
+
+        assert mock_model.encode.call_count == 2
+        assert [url for url, _ in scores] == ["http://a.com", "http://b.com"]
+        assert scores[0][1] == pytest.approx(1.0)
+        assert scores[1][1] == pytest.approx(0.0)
+
+
+    @patch('plagiat.page_cache', new_callable=lambda: PageCache(10 * 1024 * 1024, 60))
+    @patch('plagiat.load_sentence_model')
+    def test_embedding_cache_per_backend(self, mock_load, mock_cache, monkeypatch):
+        """Un embedding calculé sur un backend n'est pas resservi après un changement de backend"""
+        import numpy as np
+        import inference
+        import plagiat
+        mock_model = mock_load.return_value.__enter__.return_value
+        mock_model.encode.side_effect = lambda texts, **kwargs: np.ones((len(texts), 2))
+
+        monkeypatch.setitem(inference.inference_status, "sentence", {"backend": "torch"})
+        plagiat.encode_texts(["page a"])
+        plagiat.encode_texts(["page a"])
+        assert mock_model.encode.call_count == 1
+        monkeypatch.setitem(inference.inference_status, "sentence", {"backend": "int8"})
+        plagiat.encode_texts(["page a"])
+        assert mock_model.encode.call_count == 2
+
+
+class TestSentenceMatching:
+    """Tests pour la comparaison phrase par phrase"""
+
+    def test_split_sentences_offsets(self):
+        """Les positions renvoyées correspondent au texte original"""
+        text = "Première phrase assez longue.  Deuxième phrase assez longue !"
+        spans = split_sentences(text)
+        assert len(spans) == 2
+        for start, end, sentence in spans:
+            assert text[start:end] == sentence
+
+    def test_sentence_windows_capped(self):
+        """Le nombre de fenêtres par page est borné et couvre toute la page"""
+        text = " ".join(f"Ceci est la phrase numéro {i}." for i in range(100))
+        windows = sentence_windows(text, window_size=2, max_windows=20)
+        assert len(windows) == 20
+        assert windows[-1][0] > len(text) // 2
+
+    @patch('plagiat.page_cache', new_callable=lambda: PageCache(10 * 1024 * 1024, 60))
+    @patch('plagiat.load_sentence_model')
+    def test_match_sentences_best_span(self, mock_load, mock_cache):
+        """Chaque phrase soumise est associée à son meilleur passage source"""
+        import torch
+
+        def fake_encode(texts, **kwargs):
+            # Vecteur [1, 0] pour les textes parlant de chats, [0, 1] sinon
+            return torch.tensor([[1.0, 0.0] if "chat" in t else [0.0, 1.0] for t in texts])
+
+        mock_model = MagicMock()
+        mock_model.encode.side_effect = fake_encode
+        mock_load.return_value.__enter__.return_value = mock_model
+
+        text = "Le chat dort sur le canapé du salon."
+        page = "La voiture roule vite sur la route. Un chat dort paisiblement ici."
+        results = match_sentences(text, [("http://a.com", page)])
+
+        url, score, matches = results[0]
+        assert url == "http://a.com"
+        assert len(matches) == 1
+        match = matches[0]
+        assert page[match["source_start"]:match["source_end"]] == match["source_text"]
+        assert "chat" in match["source_text"]
+        assert match["start"] == 0
+
+    @patch('plagiat.google_search_serpapi')
+    @patch('plagiat.extract_text')
+    @patch('plagiat.match_sentences')
+    def test_check_similarity_sentence_mode(self, mock_match, mock_extract, mock_search):
+        """Le mode phrases renvoie les correspondances par source"""
+        mock_search.return_value = ["http://example.com"]
+        mock_extract.return_value = "Contenu de la page web"
+        mock_match.return_value = [("http://example.com", 0.8, [{"sentence": "x", "start": 0, "end": 1, "score": 80.0}])]
+
+        score, sources = check_similarity("Texte de test assez long", "fake_api_key", mode="sentences")
+        assert score == 80.0
+        assert sources[0]["matches"][0]["sentence"] == "x"
+
+
+class TestParaphraseBatching:
+    """Tests pour la paraphrase T5 par lots"""
+
+    @patch('plagiat.load_paraphrase_model')
+    def test_paraphrase_batches_with_dynamic_padding(self, mock_load):
+        """Les phrases sont générées par lots avec un padding au plus long"""
+        import torch
+        tokenizer = MagicMock()
+        tokenizer.side_effect = lambda inputs, **kwargs: {
+            "input_ids": torch.zeros((len(inputs), 4), dtype=torch.long),
+            "attention_mask": torch.ones((len(inputs), 4), dtype=torch.long),
+        }
+        tokenizer.batch_decode.side_effect = lambda outputs, **kwargs: [f"Rewritten {i}" for i in range(len(outputs))]
+        model = MagicMock()
+        model.generate.side_effect = lambda input_ids, **kwargs: input_ids
+        mock_load.return_value.__enter__.return_value = (tokenizer, model)
+
+        text = ". ".join(f"This is test sentence number {i} for batching" for i in range(5)) + "."
+        result = paraphrase_english_text(text, preset="fast", batch_size=2)
+
+        assert model.generate.call_count == 3
+        assert all(call.kwargs["padding"] == "longest" for call in tokenizer.call_args_list)
+        assert model.generate.call_args.kwargs["num_beams"] == 1
+        assert result.count("Rewritten") == 5
+
+    @patch('plagiat.load_paraphrase_model')
+    def test_paraphrase_all_sentences_kept_on_error(self, mock_load):
+        """Une erreur de génération conserve les phrases originales"""
+        tokenizer = MagicMock()
+        model = MagicMock()
+        model.generate.side_effect = RuntimeError("OOM")
+        mock_load.return_value.__enter__.return_value = (tokenizer, model)
+
+        text = "This sentence should be kept as is. Another sentence also kept."
+        result = paraphrase_english_text(text, preset="quality")
+        assert "This sentence should be kept as is" in result
+        assert "Another sentence also kept" in result
+
+    @patch('plagiat.load_paraphrase_model')
+    def test_paraphrase_all_sentences_by_default(self, mock_load):
+        """Sans limite explicite, toutes les phrases sont paraphrasées"""
+        import torch
+        tokenizer = MagicMock()
+        tokenizer.side_effect = lambda inputs, **kwargs: {
+            "input_ids": torch.zeros((len(inputs), 4), dtype=torch.long),
+            "attention_mask": torch.ones((len(inputs), 4), dtype=torch.long),
+        }
+        tokenizer.batch_decode.side_effect = lambda outputs, **kwargs: ["Rewritten"] * len(outputs)
+        model = MagicMock()
+        model.generate.side_effect = lambda input_ids, **kwargs: input_ids
+        mock_load.return_value.__enter__.return_value = (tokenizer, model)
+
+        text = ". ".join(f"This is test sentence number {i} for coverage" for i in range(25)) + "."
+        assert paraphrase_english_text(text, batch_size=8).count("Rewritten") == 25
+        assert paraphrase_english_text(text, max_sentences=3, batch_size=8).count("Rewritten") == 3
+
+class TestChunkedReformulation:
+    """Tests pour la reformulation des longs documents par morceaux"""
+
+    LONG_TEXT = "\n\n".join(
+        (f"Paragraphe {n}. " + "Cette phrase du mémoire décrit la méthode utilisée. " * 12).strip()
+        for n in range(10)
+    )
+
+    def test_chunks_are_bounded_and_cover_text(self):
+        """Morceaux de paragraphes entiers, bornés, qui reconstituent le texte"""
+        text = "Titre\n\n" + self.LONG_TEXT + "\n\n" + "Phrase sans fin " * 200
+        chunks = list(split_chunks(text, 700))
+        assert all(len(chunk) <= 700 for _, chunk in chunks)
+        assert chunks[0][0] == ""
+        assert chunks[0][1].startswith("Titre\n\nParagraphe 0.")
+        assert "".join(separator + chunk for separator, chunk in chunks).split() == text.split()
+        assert {separator for separator, _ in chunks[1:]} == {"\n\n", " "}
+
+    @patch('plagiat.paraphrase_text_ai')
+    def test_long_text_uses_ai_on_every_chunk(self, mock_ai):
+        """Un long texte n'est plus limité à la méthode basique : chaque morceau passe par l'IA"""
+        mock_ai.side_effect = lambda text, rng=None: text.upper()
+        result = reformulate_text(self.LONG_TEXT, use_ai=True)
+        assert result == self.LONG_TEXT.upper()
+        assert mock_ai.call_count == 10
+
+    @patch('plagiat.reformulate_chunk', side_effect=lambda chunk, use_ai, seed, index: chunk.upper())
+    def test_chunks_are_lazy(self, mock_chunk):
+        """Chaque morceau est produit dès qu'il est prêt, sans traiter le reste du document"""
+        chunks = iter_reformulate(self.LONG_TEXT, use_ai=False, chunk_chars=700)
+        separator, original, reformulated = next(chunks)
+        assert mock_chunk.call_count == 1
+        assert reformulated == original.upper()
+
+class TestSeededReformulation:
+    """Tests pour le générateur aléatoire propre à chaque requête"""
+
+    TEXT = ("Cette application moderne utilise des méthodes très avancées pour détecter le plagiat. "
+            "Il est important de vérifier les sources. De plus, les résultats sont souvent très utiles.")
+
+    def test_same_seed_same_result(self):
+        """Une même graine donne toujours la même reformulation"""
+        results = {reformulate_text(self.TEXT, use_ai=False, seed=seed) for seed in range(8)}
+        assert reformulate_text(self.TEXT, use_ai=False, seed=3) == reformulate_text(self.TEXT, use_ai=False, seed=3)
+        assert len(results) > 1
+
+    def test_global_random_untouched(self):
+        """Le module random global n'est pas consommé"""
+        import random
+        random.seed(0)
+        expected = random.random()
+        random.seed(0)
+        reformulate_text(self.TEXT, use_ai=False)
+        reformulate_text(self.TEXT, use_ai=False, seed=1)
+        assert random.random() == expected
+
+    def test_chunks_reproducible_independently(self):
+        """Chaque morceau a son générateur : traitement séparé ou global, même résultat"""
+        text = "\n\n".join([self.TEXT] * 12)
+        whole = reformulate_text(text, use_ai=False, seed=5)
+        chunks = list(enumerate(split_chunks(text, 1500)))
+        by_index = {index: reformulate_chunk(chunk, False, 5, index) for index, (_, chunk) in reversed(chunks)}
+        assert whole == "".join(separator + by_index[index] for index, (separator, _) in chunks)
+
@@ -0,0 +1,76 @@
+"""
+Tests pour le préfiltre lexical des pages
+"""
+import sys
+import os
+from unittest.mock import patch
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prefilter import lexical_scores, prefilter_pages
+
+TEXT = (
+    "Les plantes vertes utilisent la lumière du soleil pour produire de l'énergie chimique : "
+    "c'est la photosynthèse, qui consomme du dioxyde de carbone."
+)
+RELATED = (
+    "La photosynthèse est le processus par lequel les plantes vertes transforment l'énergie "
+    "lumineuse en énergie chimique, en absorbant du dioxyde de carbone."
+)
+INDEX_PAGE = "Accueil | Contact | Mentions légales | Connexion | Panier | Newsletter"
+
+
+class TestLexicalScores:
+    """Tests pour la similarité TF-IDF"""
+
+    def test_related_page_scores_higher(self):
+        """Une page sur le même sujet dépasse nettement une page d'index"""
+        related, index_page = lexical_scores(TEXT, [RELATED, INDEX_PAGE])
+        assert related > 0.3
+        assert index_page == 0.0
+
+    def test_no_usable_terms(self):
+        """Textes sans mots : scores nuls, sans erreur"""
+        assert lexical_scores("!!!", ["???", "..."]) == [0.0, 0.0]
+        assert lexical_scores(TEXT, []) == []
+
+
+class TestPrefilterPages:
+    """Tests pour la sélection des pages envoyées au modèle"""
+
+    def test_unrelated_pages_pruned(self):
+        """Seules les pages au-dessus du seuil sont conservées"""
+        pages = [("http://a.com", RELATED), ("http://b.com", INDEX_PAGE)]
+        kept, scores = prefilter_pages(TEXT, pages, threshold=0.05)
+        assert kept == pages[:1]
+        assert set(scores) == {"http://a.com", "http://b.com"}
+
+    def test_disabled(self):
+        """Un seuil nul désactive le préfiltre"""
+        pages = [("http://b.com", INDEX_PAGE)]
+        assert prefilter_pages(TEXT, pages, threshold=0) == (pages, {})
+
+    @patch('plagiat.google_search_serpapi', return_value=["http://a.com", "http://b.com"])
+    def test_model_skips_pruned_pages(self, mock_search):
+        """L'analyse n'encode pas les pages écartées et signale l'étape"""
+        import plagiat
+        pages = {"http://a.com": RELATED, "http://b.com": INDEX_PAGE}
+        events = []
+        scored = []
+
+        def score_pages(text, candidates):
+            scored.extend(url for url, _ in candidates)
+            return [(url, 0.8) for url, _ in candidates]
+
+        with patch.object(plagiat, 'extract_text', side_effect=pages.get), \
+                patch.object(plagiat, 'score_pages', side_effect=score_pages):
+            score, sources = plagiat.check_similarity(
+                TEXT, None, progress=lambda stage, data=None: events.append((stage, data))
+            )
+        assert scored == ["http://a.com"]
+        assert [s["url"] for s in sources] == ["http://a.com"]
+        prefilter = [data for stage, data in events if stage == "prefilter"][0]
+        assert prefilter["pages"] == 2
+        assert prefilter["pruned"] == 1
+        assert "ms" in prefilter
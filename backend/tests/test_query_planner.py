@@ -0,0 +1,91 @@
+"""
+Tests pour la planification des requêtes de recherche
+"""
+import sys
+import os
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_planner import plan_queries, query_budget, search_queries, StreamingSearch, MAX_SEARCH_QUERIES
+
+
+class TestPlanQueries:
+    """Tests pour le choix des passages à rechercher"""
+
+    def test_short_text_single_query(self):
+        """Un texte court donne une seule requête sur son début"""
+        text = "Un texte court pour tester la planification."
+        assert plan_queries(text) == [text]
+
+    def test_budget_scales_and_is_bounded(self):
+        """Le budget croît avec la longueur du texte sans dépasser le maximum"""
+        assert query_budget("a" * 100) == 1
+        assert query_budget("a" * 4000) > 1
+        assert query_budget("a" * 10 ** 6) == MAX_SEARCH_QUERIES
+
+    def test_picks_distinctive_sentences_across_document(self):
+        """Les phrases rares sont préférées et tout le document est couvert"""
+        filler = "Le texte parle de choses et de choses comme le texte le fait souvent."
+        text = " ".join(
+            [filler] * 5
+            + ["La photosynthèse chlorophyllienne transforme le dioxyde de carbone atmosphérique."]
+            + [filler] * 5
+            + ["Les ostéoclastes résorbent la matrice osseuse minéralisée pendant le remodelage."]
+        )
+        queries = plan_queries(text, budget=2)
+        assert len(queries) == 2
+        assert "photosynthèse" in queries[0]
+        assert "ostéoclastes" in queries[1]
+        assert all(len(q) <= 200 for q in queries)
+
+
+class TestSearchQueries:
+    """Tests pour la fusion des résultats de recherche"""
+
+    def test_merge_and_deduplicate(self):
+        """Les URLs sont fusionnées par rang et dédupliquées"""
+        results = {
+            "q1": ["http://a.com", "http://b.com"],
+            "q2": ["http://a.com", "http://c.com"],
+        }
+        urls = search_queries(["q1", "q2"], lambda q: results[q])
+        assert urls == ["http://a.com", "http://b.com", "http://c.com"]
+
+    def test_max_urls(self):
+        """Le nombre d'URLs à récupérer est borné"""
+        urls = search_queries(["q"], lambda q: [f"http://{i}.com" for i in range(20)], max_urls=3)
+        assert len(urls) == 3
+
+
+class TestStreamingSearch:
+    """Tests pour les recherches lancées pendant l'extraction"""
+
+    def test_searches_start_before_end_of_document(self):
+        """Une recherche part dès qu'un segment est complet"""
+        calls = []
+        streaming = StreamingSearch(lambda q: calls.append(q) or [f"http://{len(calls)}.com"],
+                                    segment_chars=200, max_queries=4)
+        page = "Cette page contient une phrase suffisamment longue pour servir de requête. " * 4
+        streaming.feed(page)
+        assert len(streaming.queries) == 1
+        streaming.feed("Une dernière page avec une autre phrase distinctive et assez longue ici.")
+        urls = streaming.finish()
+        assert streaming.text.startswith(page)
+        assert len(streaming.queries) == 2
+        assert len(urls) == 2
+
+    def test_budget_is_bounded(self):
+        """Le nombre total de recherches reste borné"""
+        streaming = StreamingSearch(lambda q: [], segment_chars=100, max_queries=3)
+        for i in range(20):
+            streaming.feed(f"La page numéro {i} contient une phrase assez longue pour une requête. " * 2)
+        streaming.finish()
+        assert len(streaming.queries) <= 3
+
+    def test_close_cancels_pending_searches(self):
+        """close() libère le pool même si finish() n'est jamais appelé"""
+        streaming = StreamingSearch(lambda q: [], segment_chars=100, max_queries=3)
+        streaming.feed("Une phrase suffisamment longue pour lancer une recherche anticipée. " * 3)
+        streaming.close()
+        assert streaming._executor._shutdown
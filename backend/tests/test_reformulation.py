@@ -0,0 +1,75 @@
+"""
+Tests pour le moteur de reformulation précompilé
+"""
+import random
+import sys
+import os
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reformulation import ReformulationEngine, reformulation_engine, SYNONYMS
+
+
+class AlwaysRandom(random.Random):
+    """Générateur qui active toujours les règles et choisit le premier synonyme"""
+
+    def random(self):
+        return 0.0
+
+    def choice(self, seq):
+        return seq[0]
+
+
+class NeverRandom(random.Random):
+    """Générateur qui n'active aucune règle"""
+
+    def random(self):
+        return 0.99
+
+
+class TestReformulationEngine:
+    """Tests pour le moteur de reformulation"""
+
+    def test_tables_compiled_once(self):
+        """Les tables sont compilées à la création du moteur, pas à chaque appel"""
+        assert reformulation_engine.basic.regex.pattern
+        assert len(reformulation_engine.basic.rules) >= len(SYNONYMS)
+
+    def test_synonym_first_occurrence_only(self):
+        """Seule la première occurrence d'un mot est remplacée"""
+        result = reformulation_engine.reformulate_sentence("Un résultat très net et très clair.", AlwaysRandom())
+        assert result == "Un résultat extrêmement net et très clair."
+
+    def test_anchored_transform(self):
+        """Les transformations de début de phrase ne s'appliquent qu'en tête"""
+        result = reformulation_engine.reformulate_sentence("Il faut lire ce texte.", AlwaysRandom())
+        assert result.startswith("Il convient de lire")
+        result = reformulation_engine.reformulate_sentence("Je pense qu'il faut lire.", AlwaysRandom())
+        assert "Il convient" not in result
+
+    def test_phrase_has_priority_over_word(self):
+        """Une expression est préférée au synonyme d'un de ses mots"""
+        result = reformulation_engine.reformulate_sentence("Ce résultat peut être amélioré.", AlwaysRandom())
+        assert "est susceptible d'être" in result
+
+    def test_no_rule_applied(self):
+        """Sans tirage favorable, la phrase est inchangée"""
+        sentence = "Cette méthode est très importante."
+        assert reformulation_engine.reformulate_sentence(sentence, NeverRandom()) == sentence
+
+    def test_aggressive_no_chained_replacements(self):
+        """Un synonyme introduit n'est pas remplacé à son tour"""
+        result = ReformulationEngine().reformulate_aggressive("L'usage de cet outil est simple.", AlwaysRandom())
+        assert "utilisation" in result
+        assert "emploi" not in result
+
+    def test_aggressive_structural_inversion(self):
+        """Les restructurations complètes restent appliquées"""
+        result = reformulation_engine.reformulate_aggressive("Grâce à ce modèle, nous gagnons du temps", AlwaysRandom())
+        assert result == "nous gagnons du temps du fait de ce modèle."
+
+    def test_text_ends_with_period(self):
+        """Le texte reformulé est nettoyé et terminé par un point"""
+        result = reformulation_engine.reformulate_text("Première phrase ici. Deuxième   phrase là", NeverRandom())
+        assert result == "Première phrase ici. Deuxième phrase là."
@@ -0,0 +1,120 @@
+"""
+Tests pour l'index BM25 local et les fournisseurs de recherche
+"""
+import sys
+import os
+from unittest.mock import patch
+
+import pytest
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import BM25Index, BM25SearchProvider, main
+
+DOCUMENTS = [
+    ("bio", "La photosynthèse permet aux plantes de transformer la lumière en énergie chimique."),
+    ("histoire", "La révolution industrielle transforme l'économie anglaise au dix-neuvième siècle."),
+    ("info", "Les algorithmes de tri ordonnent les éléments d'une liste par comparaisons successives."),
+]
+
+
+class TestBM25Index:
+    """Tests pour l'index inversé BM25"""
+
+    def test_ranking(self, tmp_path):
+        """Le document qui contient les termes rares de la requête arrive en tête"""
+        index = BM25Index(str(tmp_path))
+        assert index.add(DOCUMENTS) == 3
+        results = index.search("photosynthèse des plantes")
+        assert results[0][0] == "bio"
+        assert all(doc_id != "info" for doc_id, _ in results)
+
+    def test_no_match(self, tmp_path):
+        """Une requête sans terme connu ne renvoie rien"""
+        index = BM25Index(str(tmp_path))
+        index.add(DOCUMENTS)
+        assert index.search("quantique") == []
+
+    def test_incremental_segments_and_persistence(self, tmp_path):
+        """Les ajouts successifs créent des segments relus après redémarrage"""
+        index = BM25Index(str(tmp_path))
+        index.add(DOCUMENTS[:1])
+        index.add(DOCUMENTS[1:])
+        assert index.stats() == {"documents": 3, "segments": 2}
+        assert index.add(DOCUMENTS[:1]) == 0
+
+        reloaded = BM25Index(str(tmp_path))
+        assert reloaded.stats() == {"documents": 3, "segments": 2}
+        assert reloaded.search("algorithmes de tri")[0][0] == "info"
+        assert reloaded.get_text("histoire") == DOCUMENTS[1][1]
+
+    def test_compaction(self, tmp_path):
+        """Au-delà du nombre max de segments, l'index est fusionné sans perte"""
+        index = BM25Index(str(tmp_path), max_segments=2)
+        for document in DOCUMENTS:
+            index.add([document])
+        assert index.stats() == {"documents": 3, "segments": 1}
+        assert index.search("révolution industrielle")[0][0] == "histoire"
+        assert BM25Index(str(tmp_path)).stats()["documents"] == 3
+
+    def test_cli(self, tmp_path, capsys):
+        """La ligne de commande indexe un répertoire puis l'interroge"""
+        documents = tmp_path / "docs"
+        documents.mkdir()
+        for doc_id, text in DOCUMENTS:
+            (documents / f"{doc_id}.txt").write_text(text, encoding="utf-8")
+        index_dir = str(tmp_path / "index")
+        assert main(["index", "--index", index_dir, str(documents)]) == 0
+        assert main(["query", "--index", index_dir, "photosynthèse"]) == 0
+        assert "bio.txt" in capsys.readouterr().out
+
+
+class TestBM25Provider:
+    """Tests pour le pipeline d'analyse avec le fournisseur BM25"""
+
+    def test_provider_urls_and_texts(self, tmp_path):
+        """Les résultats sont des URLs bm25:// dont le texte est servi par l'index"""
+        index = BM25Index(str(tmp_path))
+        index.add(DOCUMENTS)
+        provider = BM25SearchProvider(index)
+        urls = provider.search("photosynthèse")
+        assert urls[0] == "bm25://bio"
+        assert provider.fetch(urls[0]) == DOCUMENTS[0][1]
+        assert provider.fetch("http://example.com") == ""
+
+    @patch('plagiat.google_search_serpapi')
+    def test_check_similarity_without_web(self, mock_search, tmp_path):
+        """L'analyse complète tourne sur l'index local, sans appel SerpAPI"""
+        import plagiat
+        index = BM25Index(str(tmp_path))
+        index.add(DOCUMENTS)
+        with patch.object(plagiat, 'score_pages', side_effect=lambda text, pages: [(u, 0.9) for u, _ in pages]):
+            score, sources = plagiat.check_similarity(
+                "La photosynthèse permet aux plantes de transformer la lumière.", None,
+                provider=BM25SearchProvider(index)
+            )
+        mock_search.assert_not_called()
+        assert sources[0]["url"] == "bm25://bio"
+        # Texte recopié mot pour mot : détecté par les empreintes avant le modèle
+        assert score == 100.0
+        assert sources[0]["copied_percent"] == 100.0
+
+    @patch('plagiat.google_search_serpapi')
+    def test_no_local_hit_is_not_plagiarism(self, mock_search, tmp_path):
+        """Sans résultat dans l'index local : score nul, jamais le score simulé"""
+        import plagiat
+        index = BM25Index(str(tmp_path))
+        index.add(DOCUMENTS)
+        score, sources = plagiat.check_similarity(
+            "Zorglub xylophone quantique: vortex galactique hyperbolique zébré.", None,
+            provider=BM25SearchProvider(index)
+        )
+        mock_search.assert_not_called()
+        assert (score, sources) == (0, [])
+
+    def test_unknown_provider(self):
+        """Un fournisseur inconnu est refusé"""
+        import plagiat
+        with pytest.raises(ValueError):
+            plagiat.get_search_provider(None, name="bing")
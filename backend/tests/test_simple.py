@@ -28,3 +28,17 @@ def test_reformulation_basic():
     except Exception as e:
         print(f"❌ Reformulation error: {e}")
         assert False, f"Reformulation failed: {e}"
+
+def test_lazy_heavy_imports():
+    """L'import de l'API ne charge pas les bibliothèques de ML"""
+    import os
+    import subprocess
+    import sys
+    code = (
+        "import sys, main; "
+        "print([m for m in ('torch', 'transformers', 'sentence_transformers', 'bs4', 'sklearn') if m in sys.modules])"
+    )
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=backend_dir)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("[]")
@@ -0,0 +1,118 @@
+"""
+Tests pour le service de traduction
+"""
+import time
+import sys
+import os
+from unittest.mock import patch
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import LRUCache
+from translation import TokenBucket, TranslationService, LocalBackend, GoogleBackend, create_backend
+
+
+def make_service(backend):
+    return TranslationService(backend, LRUCache(1024 * 1024, 60))
+
+
+class TestTokenBucket:
+    """Tests pour la limitation de débit"""
+
+    def test_burst_then_rate(self):
+        """La rafale passe immédiatement, la suite est étalée"""
+        bucket = TokenBucket(rate=20, burst=2)
+        start = time.monotonic()
+        for _ in range(4):
+            bucket.acquire()
+        elapsed = time.monotonic() - start
+        assert 0.08 <= elapsed < 0.5
+
+
+class TestTranslationService:
+    """Tests pour la traduction groupée et le cache"""
+
+    def test_batched_and_cached(self):
+        """Les phrases inconnues sont envoyées en un seul lot, puis servies par le cache"""
+        batches = []
+
+        def translate(sentences, source, target):
+            batches.append(list(sentences))
+            return [s.upper() for s in sentences]
+
+        service = make_service(LocalBackend(translate))
+        assert service.translate(["un", "deux"], "fr", "en") == ["UN", "DEUX"]
+        assert service.translate(["deux", "trois", "trois"], "fr", "en") == ["DEUX", "TROIS", "TROIS"]
+        assert batches == [["un", "deux"], ["trois"]]
+
+    def test_empty_translation_not_cached(self):
+        """Une traduction vide (échec du backend) est redemandée au prochain appel"""
+        batches = []
+
+        def translate(sentences, source, target):
+            batches.append(list(sentences))
+            return [""] * len(sentences) if len(batches) == 1 else [s.upper() for s in sentences]
+
+        service = make_service(LocalBackend(translate))
+        assert service.translate(["un"], "fr", "en") == [""]
+        assert service.translate(["un"], "fr", "en") == ["UN"]
+        assert batches == [["un"], ["un"]]
+
+    def test_cache_key_includes_direction(self):
+        """Le cache distingue la langue source et la langue cible"""
+        service = make_service(LocalBackend(lambda s, source, target: [f"{target}:{x}" for x in s]))
+        assert service.translate(["bonjour"], "fr", "en") == ["en:bonjour"]
+        assert service.translate(["bonjour"], "en", "fr") == ["fr:bonjour"]
+
+    def test_unknown_backend(self):
+        """Un backend inconnu est refusé"""
+        import pytest
+        with pytest.raises(ValueError):
+            create_backend("inconnu")
+
+
+class TestGoogleBackend:
+    """Tests pour le backend Google groupé"""
+
+    @patch('deep_translator.GoogleTranslator')
+    def test_one_request_per_batch(self, mock_translator):
+        """Plusieurs phrases partent dans une seule requête"""
+        mock_translator.return_value.translate.side_effect = lambda text: text.upper()
+        backend = GoogleBackend(TokenBucket(rate=100, burst=10))
+        assert backend.translate_batch(["un", "deux", "trois"], "fr", "en") == ["UN", "DEUX", "TROIS"]
+        assert mock_translator.return_value.translate.call_count == 1
+
+    @patch('deep_translator.GoogleTranslator')
+    def test_fallback_when_lines_merged(self, mock_translator):
+        """Si le service fusionne les lignes, chaque phrase est retraduite séparément"""
+        mock_translator.return_value.translate.side_effect = lambda text: text.replace("\n", " ").upper()
+        backend = GoogleBackend(TokenBucket(rate=100, burst=10))
+        assert backend.translate_batch(["un", "deux"], "fr", "en") == ["UN", "DEUX"]
+        assert mock_translator.return_value.translate.call_count == 3
+
+    @patch('deep_translator.GoogleTranslator')
+    def test_multiline_sentences_stay_aligned(self, mock_translator):
+        """Les phrases sur plusieurs lignes sont repliées sur une ligne avant l'envoi groupé"""
+        mock_translator.return_value.translate.side_effect = lambda text: text.upper()
+        backend = GoogleBackend(TokenBucket(rate=100, burst=10))
+        result = backend.translate_batch(["premier\nparagraphe", "deux", "trois\r\n  lignes"], "fr", "en")
+        assert result == ["PREMIER PARAGRAPHE", "DEUX", "TROIS LIGNES"]
+        assert mock_translator.return_value.translate.call_count == 1
+
+
+class TestOfflinePipeline:
+    """Pipeline de paraphrase IA complet sans réseau"""
+
+    @patch('plagiat.paraphrase_english_text')
+    @patch('plagiat.detect', return_value='fr')
+    def test_paraphrase_text_ai_with_local_backend(self, mock_detect, mock_paraphrase):
+        """Traduction aller-retour via un backend local"""
+        import plagiat
+
+        mock_paraphrase.side_effect = lambda text, max_sentences=None: "Rephrased " + text
+        backend = LocalBackend(lambda sentences, source, target: [f"[{target}] {s}" for s in sentences])
+        with patch.object(plagiat, 'translation_service', make_service(backend)):
+            result = plagiat.paraphrase_text_ai("Une première phrase en français. Une seconde phrase.")
+
+        assert result.startswith("[fr] Rephrased [en] Une première phrase")
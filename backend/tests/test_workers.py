@@ -0,0 +1,105 @@
+"""
+Tests pour le pool de processus des étapes gourmandes en CPU
+"""
+import asyncio
+import io
+import sys
+import os
+import time
+
+import pytest
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingestion import DocumentError
+from workers import CPUPool, extract_text
+
+
+def docx_data(text):
+    import docx
+    document = docx.Document()
+    document.add_paragraph(text)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+class TestThreadFallback:
+    """Sans processus configuré, les étapes tournent dans des threads"""
+
+    def test_call_and_run_inline(self):
+        pool = CPUPool(workers=0)
+        assert not pool.enabled
+        assert pool.call(extract_text, "a.docx", docx_data("Bonjour")) == "Bonjour"
+        assert asyncio.run(pool.run(extract_text, "a.docx", docx_data("Salut"))) == "Salut"
+        assert pool.stats() == {"submitted": 0, "completed": 0, "failed": 0, "in_flight": 0,
+                                "workers": 0, "queued": 0}
+
+
+class TestProcessPool:
+    """Tests avec de vrais processus de calcul"""
+
+    @pytest.fixture
+    def pool(self):
+        pool = CPUPool(workers=1)
+        yield pool
+        pool.shutdown()
+
+    def test_extraction_in_worker(self, pool):
+        """Un document est extrait dans un processus de calcul, de façon asynchrone"""
+        assert asyncio.run(pool.run(extract_text, "a.docx", docx_data("Texte du devoir"))) == "Texte du devoir"
+        assert pool.stats()["completed"] == 1
+
+    def test_errors_propagate(self, pool):
+        """Les erreurs de document remontent telles quelles"""
+        with pytest.raises(DocumentError):
+            pool.call(extract_text, "a.pdf", b"pas un pdf")
+        assert pool.stats()["failed"] == 1
+
+    def test_queue_depth(self, pool):
+        """Les étapes en attente d'un processus libre sont comptées"""
+        pool.call(time.sleep, 0)  # Démarrage du processus
+        futures = [pool.submit(time.sleep, 0.3) for _ in range(3)]
+        stats = pool.stats()
+        assert stats["in_flight"] == 3
+        assert stats["queued"] == 2
+        for future in futures:
+            future.result()
+
+    def test_warm_up_in_workers(self, pool):
+        """Chaque processus précharge les modèles demandés à son démarrage"""
+        futures = pool.start(["inconnu"])
+        assert len(futures) == 1
+        state = futures[0].result()
+        assert state["models"] == ["inconnu"]
+        assert state["state"] == "failed"  # Modèle inconnu : l'erreur est rapportée, le processus reste utilisable
+        assert pool.call(extract_text, "a.docx", docx_data("Texte")) == "Texte"
+
+
+class TestWarmUp:
+    """Préchargement des modèles au démarrage du serveur"""
+
+    def test_pool_enabled_skips_server_process(self, monkeypatch):
+        """Avec le pool actif, le serveur ne charge pas les modèles et /ready suit les processus"""
+        from concurrent.futures import Future
+        import plagiat
+
+        class FakePool:
+            enabled = True
+
+            def start(self, warmup):
+                self.futures = [Future(), Future()]
+                return self.futures
+
+        pool = FakePool()
+        monkeypatch.setattr(plagiat, "cpu_pool", pool)
+        monkeypatch.setattr(plagiat, "warmup_status", {"state": "idle", "models": [], "error": None})
+        monkeypatch.setattr(plagiat.model_registry, "preload",
+                            lambda name: pytest.fail("modèle chargé dans le processus du serveur"))
+        plagiat.start_warm_up(["sentence"])
+        assert plagiat.warmup_status["state"] == "running"
+        pool.futures[0].set_result({"state": "done", "error": None})
+        assert plagiat.warmup_status["state"] == "running"
+        pool.futures[1].set_result({"state": "failed", "error": "mémoire"})
+        assert plagiat.warmup_status == {"state": "failed", "models": ["sentence"], "error": "mémoire"}
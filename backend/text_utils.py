@@ -0,0 +1,94 @@
+"""
+Outils de découpage de texte partagés
+"""
+import re
+
+
+def split_sentences(text, min_length=15):
+    """Découpe un texte en phrases avec leurs positions : [(début, fin, phrase)]"""
+    spans = []
+    for match in re.finditer(r'[^.!?\n]+[.!?]*', text):
+        start, end = match.span()
+        # Retirer les espaces en bordure tout en conservant les positions exactes
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end - start >= min_length:
+            spans.append((start, end, text[start:end]))
+    return spans
+
+
+def split_paragraphs(text, min_words=30, max_words=150):
+    """
+    Découpe un texte en paragraphes de taille comparable : les paragraphes trop
+    courts (titres, listes) sont regroupés, les trop longs sont coupés en morceaux
+    """
+    paragraphs = []
+    current = []
+    for block in re.split(r'\n\s*\n|\n(?=\s*\S)', text):
+        words = block.split()
+        while len(words) > max_words:
+            paragraphs.append(" ".join(current + words[:max_words - len(current)]))
+            words = words[max_words - len(current):]
+            current = []
+        current.extend(words)
+        if len(current) >= min_words:
+            paragraphs.append(" ".join(current))
+            current = []
+    if current:
+        if paragraphs and len(current) < min_words // 2:
+            paragraphs[-1] += " " + " ".join(current)
+        else:
+            paragraphs.append(" ".join(current))
+    return paragraphs
+
+
+def split_chunks(text, max_chars=1500):
+    """
+    Découpe un texte en morceaux d'au plus `max_chars` caractères formés de paragraphes
+    entiers ; un paragraphe trop long est coupé entre deux phrases. Génère
+    (séparateur, morceau) où le séparateur précède le morceau dans le texte
+    reconstitué : "" au début, "\n\n" entre paragraphes, " " dans un paragraphe coupé.
+    """
+    current = []
+    size = 0
+    joiner = ""
+    for paragraph in re.split(r'\n\s*\n', text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        pieces = [paragraph] if len(paragraph) <= max_chars else _sentence_groups(paragraph, max_chars)
+        for number, piece in enumerate(pieces):
+            if current and (number > 0 or size + len(piece) > max_chars):
+                yield joiner, "\n\n".join(current)
+                joiner = " " if number > 0 else "\n\n"
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 2
+    if current:
+        yield joiner, "\n\n".join(current)
+
+
+def _sentence_groups(paragraph, max_chars):
+    """Coupe un paragraphe en groupes de phrases consécutives d'au plus `max_chars` caractères"""
+    groups = []
+    current = ""
+    for _, _, sentence in split_sentences(paragraph, min_length=1):
+        while len(sentence) > max_chars:
+            # Phrase démesurée (texte sans ponctuation) : coupe sur un espace
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                groups.append(current)
+                current = ""
+            groups.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            groups.append(current)
+            current = ""
+        current = f"{current} {sentence}" if current else sentence
+    if current:
+        groups.append(current)
+    return groups
+
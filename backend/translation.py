@@ -0,0 +1,135 @@
+"""
+Service de traduction : appels groupés, cache persistant et limitation de débit
+"""
+import os
+import threading
+import time
+
+from cache import LRUCache, DiskStore, content_hash, PAGE_CACHE_DIR
+
+# Backend de traduction : "google" (deep_translator) ou "local" (hors ligne)
+TRANSLATION_BACKEND = os.getenv("TRANSLATION_BACKEND", "google")
+# Débit maximal vers le service distant (requêtes par seconde) et rafale autorisée
+TRANSLATION_RATE = float(os.getenv("TRANSLATION_RATE", "5"))
+TRANSLATION_BURST = int(os.getenv("TRANSLATION_BURST", "5"))
+TRANSLATION_CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", "2592000"))
+TRANSLATION_CACHE_DIR = os.getenv("TRANSLATION_CACHE_DIR", PAGE_CACHE_DIR)
+
+# Limite de caractères d'une requête Google Translate
+MAX_BATCH_CHARS = 4500
+
+
+class TokenBucket:
+    """Limiteur de débit à seau de jetons (thread-safe)"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Attend qu'un jeton soit disponible puis le consomme"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class GoogleBackend:
+    """Traduction via Google Translate : plusieurs phrases par requête, une par ligne"""
+
+    def __init__(self, rate_limiter):
+        self.rate_limiter = rate_limiter
+
+    def _request(self, translator, text):
+        self.rate_limiter.acquire()
+        return translator.translate(text)
+
+    def translate_batch(self, sentences, source, target):
+        from deep_translator import GoogleTranslator
+
+        translator = GoogleTranslator(source=source, target=target)
+        # Une phrase par ligne : les retours à la ligne internes casseraient l'alignement
+        sentences = [" ".join(sentence.split()) for sentence in sentences]
+        results = []
+        for batch in _chunk_by_chars(sentences, MAX_BATCH_CHARS):
+            translated = (self._request(translator, "\n".join(batch)) or "").split("\n")
+            if len(translated) != len(batch):
+                # Le service a fusionné ou découpé des lignes : repli phrase par phrase
+                translated = [self._request(translator, sentence) for sentence in batch]
+            results.extend(t.strip() for t in translated)
+        return results
+
+
+class LocalBackend:
+    """
+    Traduction locale sans réseau, pour les tests et les déploiements hors ligne.
+    `translate(sentences, source, target)` renvoie les traductions ; par défaut
+    les phrases sont renvoyées telles quelles.
+    """
+
+    def __init__(self, translate=None):
+        self.translate = translate or (lambda sentences, source, target: list(sentences))
+
+    def translate_batch(self, sentences, source, target):
+        return list(self.translate(sentences, source, target))
+
+
+def _chunk_by_chars(sentences, max_chars):
+    batch, size = [], 0
+    for sentence in sentences:
+        if batch and size + len(sentence) + 1 > max_chars:
+            yield batch
+            batch, size = [], 0
+        batch.append(sentence)
+        size += len(sentence) + 1
+    if batch:
+        yield batch
+
+
+class TranslationService:
+    """Traduction de listes de phrases avec cache (source, cible, phrase)"""
+
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+
+    def translate(self, sentences, source, target):
+        """Traduit une liste de phrases ; seules les phrases absentes du cache sont envoyées"""
+        keys = [content_hash(f"{source}\x00{target}\x00{s}") for s in sentences]
+        results = [self.cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(s for s, r in zip(sentences, results) if r is None))
+        if missing:
+            translated = dict(zip(missing, self.backend.translate_batch(missing, source, target)))
+            for i, sentence in enumerate(sentences):
+                if results[i] is None:
+                    results[i] = translated[sentence]
+                    # Les traductions vides (échec du backend) ne sont pas mises en cache
+                    if results[i]:
+                        self.cache.set(keys[i], results[i])
+        return results
+
+
+def create_backend(name=None):
+    """Instancie le backend de traduction configuré"""
+    name = name or TRANSLATION_BACKEND
+    if name == "local":
+        return LocalBackend()
+    if name == "google":
+        return GoogleBackend(TokenBucket(TRANSLATION_RATE, TRANSLATION_BURST))
+    raise ValueError(f"Backend de traduction inconnu : {name}")
+
+
+_disk = DiskStore(os.path.join(TRANSLATION_CACHE_DIR, "translations.sqlite")) if TRANSLATION_CACHE_DIR else None
+translation_service = TranslationService(
+    create_backend(),
+    LRUCache(16 * 1024 * 1024, TRANSLATION_CACHE_TTL, _disk)
+)
@@ -0,0 +1,164 @@
+"""
+Pool de processus pour les étapes gourmandes en CPU (extraction des documents,
+reformulation, encodage) : elles s'exécutent hors du GIL du serveur, qui reste
+disponible pour /health et les petites requêtes pendant les gros envois
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Nombre de processus de calcul (0 = étapes exécutées dans le pool de threads du serveur).
+# Chaque processus charge ses propres modèles : prévoir la mémoire en conséquence.
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", "0"))
+
+_in_worker = False
+
+
+def _init_worker(warmup=()):
+    """Initialisation d'un processus de calcul (une fois par processus), modèles `warmup` préchargés"""
+    global _in_worker
+    _in_worker = True
+    print(f"Processus de calcul démarré (pid {os.getpid()})")
+    if warmup:
+        import plagiat
+        plagiat.warm_up_models(warmup)
+
+
+# Étapes exécutées dans les processus : fonctions de module (sérialisables).
+# Les modèles sont chargés à la première utilisation puis conservés par le
+# registre du processus, une seule fois par processus.
+
+def extract_pages(filename, data):
+    """Texte de chaque page d'un document (octets)"""
+    import io
+    from ingestion import iter_document
+    return list(iter_document(filename, io.BytesIO(data)))
+
+
+def extract_text(filename, data):
+    """Texte complet d'un document (octets)"""
+    return "".join(extract_pages(filename, data))
+
+
+def reformulate(text, use_ai, seed=None):
+    import plagiat
+    return plagiat.reformulate_text(text, use_ai=use_ai, seed=seed)
+
+
+def reformulate_chunk(chunk, use_ai, seed=None, index=0):
+    import plagiat
+    return plagiat.reformulate_chunk(chunk, use_ai=use_ai, seed=seed, index=index)
+
+
+def embed(texts):
+    import plagiat
+    return plagiat.encode_local(texts)
+
+
+def sentence_status():
+    """Backend d'inférence retenu pour MiniLM dans ce processus (modèle chargé si besoin)"""
+    import plagiat
+    with plagiat.load_sentence_model():
+        pass
+    return plagiat.inference.inference_status.get("sentence")
+
+
+def warmup_state():
+    """État du préchargement dans le processus de calcul"""
+    import plagiat
+    return dict(plagiat.warmup_status)
+
+
+class CPUPool:
+    """
+    Pool de processus créé à la première utilisation. Sans processus configuré
+    (ou dans un processus de calcul), les étapes s'exécutent dans des threads.
+    """
+
+    def __init__(self, workers=CPU_WORKERS):
+        self.workers = workers
+        self.warmup = ()
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "in_flight": 0}
+
+    @property
+    def enabled(self):
+        return self.workers > 0 and not _in_worker
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn : pas de fork d'un processus qui contient déjà des threads et torch
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.warmup,),
+                )
+            return self._executor
+
+    def start(self, warmup=()):
+        """
+        Démarre les processus ; chacun précharge les modèles `warmup` (y compris un
+        processus recréé après un incident). Retourne un Future par processus, avec
+        l'état de son préchargement.
+        """
+        self.warmup = tuple(warmup)
+        return [self.submit(warmup_state) for _ in range(self.workers)]
+
+    def submit(self, fn, *args):
+        """Soumet une étape au pool ; retourne un Future"""
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            # Un processus est mort (mémoire...) : le pool est recréé pour les appels suivants
+            self._reset()
+            future = self._get_executor().submit(fn, *args)
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["in_flight"] += 1
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        failed = future.cancelled() or future.exception() is not None
+        with self._lock:
+            self._stats["in_flight"] -= 1
+            self._stats["failed" if failed else "completed"] += 1
+
+    def _reset(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def call(self, fn, *args):
+        """Exécute une étape et attend son résultat (depuis un thread)"""
+        if not self.enabled:
+            return fn(*args)
+        return self.submit(fn, *args).result()
+
+    async def run(self, fn, *args):
+        """Exécute une étape sans bloquer la boucle d'événements"""
+        if not self.enabled:
+            from fastapi.concurrency import run_in_threadpool
+            return await run_in_threadpool(fn, *args)
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self):
+        """Processus configurés, étapes en cours et file d'attente"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["workers"] = self.workers if self.enabled else 0
+        stats["queued"] = max(0, stats["in_flight"] - stats["workers"]) if stats["workers"] else 0
+        return stats
+
+    def shutdown(self):
+        self._reset()
+
+
+cpu_pool = CPUPool()